@@ -5,6 +5,7 @@ import os
 import boto3
 
 sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+from backend.fault_injection import wrap_client
 
 # AWS Configuration
 AWS_ACCESS_KEY_ID = os.getenv('AWS_ACCESS_KEY_ID')
@@ -12,12 +13,12 @@ AWS_SECRET_ACCESS_KEY = os.getenv('AWS_SECRET_ACCESS_KEY')
 AWS_REGION = os.getenv('AWS_REGION', 'ap-south-1')
 S3_BUCKET_NAME = os.getenv('S3_BUCKET_NAME')
 
-s3 = boto3.client(
+s3 = wrap_client(boto3.client(
     's3',
     aws_access_key_id=AWS_ACCESS_KEY_ID,
     aws_secret_access_key=AWS_SECRET_ACCESS_KEY,
     region_name=AWS_REGION
-) if AWS_ACCESS_KEY_ID else None
+) if AWS_ACCESS_KEY_ID else None)
 
 def get_s3_object(key):
     """Get object from S3"""
@@ -27,11 +28,14 @@ def get_s3_object(key):
     except:
         return None
 
+# Cap on IDs accepted in one bulk check
+MAX_CHECK_IDS = 5000
+
 class handler(BaseHTTPRequestHandler):
     def _send_cors_headers(self):
         """Send CORS headers"""
         self.send_header('Access-Control-Allow-Origin', '*')
-        self.send_header('Access-Control-Allow-Methods', 'GET, OPTIONS')
+        self.send_header('Access-Control-Allow-Methods', 'GET, POST, OPTIONS')
         self.send_header('Access-Control-Allow-Headers', 'Content-Type, X-User-Email')
     
     def _send_response(self, status_code, data):
@@ -80,3 +84,46 @@ class handler(BaseHTTPRequestHandler):
         except Exception as e:
             print(f"Error checking duplicate: {e}")
             self._send_response(500, {'error': f'Server error: {str(e)}'})
+
+    def do_POST(self):
+        """Check many YouTube video IDs against one index load"""
+        try:
+            content_length = int(self.headers.get('Content-Length', 0))
+            try:
+                data = json.loads(self.rfile.read(content_length).decode('utf-8') or '{}')
+            except:
+                self._send_response(400, {'error': 'Invalid JSON data'})
+                return
+
+            video_ids = data.get('video_ids')
+            if not isinstance(video_ids, list) or not all(isinstance(v, str) for v in video_ids):
+                self._send_response(400, {'error': 'video_ids must be a list of strings'})
+                return
+            if len(video_ids) > MAX_CHECK_IDS:
+                self._send_response(400, {'error': f'At most {MAX_CHECK_IDS} video IDs per request'})
+                return
+
+            # One index load, then a hash probe per ID
+            owners = {}
+            index = get_s3_object('metadata/index.json') if s3 and video_ids else None
+            for item in (index or {}).get('items', []):
+                video_id = item.get('youtube_id')
+                if video_id and video_id not in owners:
+                    owners[video_id] = item
+
+            results = {}
+            for video_id in video_ids:
+                item = owners.get(video_id)
+                if item is None:
+                    results[video_id] = {'exists': False}
+                else:
+                    results[video_id] = {'exists': True, 'item_id': item.get('id'), 'owner': item.get('created_by')}
+
+            self._send_response(200, {
+                'results': results,
+                'existing': sum(r['exists'] for r in results.values())
+            })
+
+        except Exception as e:
+            print(f"Error checking duplicates: {e}")
+            self._send_response(500, {'error': f'Server error: {str(e)}'})
@@ -4,11 +4,17 @@ import sys
 import os
 import uuid
 from datetime import datetime
-import re
 import boto3
+from botocore.exceptions import ClientError
 from urllib.parse import urlparse
 
 sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+from backend.fault_injection import wrap_client
+from backend.idempotency import IdempotencyStore, body_fingerprint, validate_key
+from backend.key_layout import item_key, previous_item_key
+from backend.master_data import MASTER_DATA_KEY, MasterDataReloader, normalize_selection
+from backend.stats import STATS_KEY, advance_stats
+from backend.youtube import extract_youtube_id
 
 # AWS Configuration from environment variables
 AWS_ACCESS_KEY_ID = os.getenv('AWS_ACCESS_KEY_ID')
@@ -20,12 +26,12 @@ S3_BUCKET_NAME = os.getenv('S3_BUCKET_NAME')
 MAX_FILE_SIZE = 20 * 1024 * 1024
 
 # Initialize S3 client
-s3 = boto3.client(
+s3 = wrap_client(boto3.client(
     's3',
     aws_access_key_id=AWS_ACCESS_KEY_ID,
     aws_secret_access_key=AWS_SECRET_ACCESS_KEY,
     region_name=AWS_REGION
-) if AWS_ACCESS_KEY_ID else None
+) if AWS_ACCESS_KEY_ID else None)
 
 def get_s3_object(key):
     """Get object from S3"""
@@ -35,6 +41,21 @@ def get_s3_object(key):
     except:
         return None
 
+def get_s3_object_if_changed(key, etag=None):
+    """Get object from S3 unless it still has the given ETag"""
+    params = {'Bucket': S3_BUCKET_NAME, 'Key': key}
+    if etag:
+        params['IfNoneMatch'] = etag
+    try:
+        response = s3.get_object(**params)
+        return json.loads(response['Body'].read().decode('utf-8')), response.get('ETag')
+    except ClientError as e:
+        if e.response.get('Error', {}).get('Code') in ('NoSuchKey', '404'):
+            return None, None
+        return None, etag
+    except:
+        return None, etag
+
 def put_s3_object(key, data):
     """Put object to S3"""
     try:
@@ -49,6 +70,32 @@ def put_s3_object(key, data):
         print(f"S3 put error: {e}")
         return False
 
+def delete_s3_object(key):
+    """Delete object from S3"""
+    try:
+        s3.delete_object(Bucket=S3_BUCKET_NAME, Key=key)
+        return True
+    except Exception as e:
+        print(f"S3 delete error: {e}")
+        return False
+
+def get_item(item_id):
+    """Get an item object, from its previous key while keys are being migrated"""
+    item = get_s3_object(item_key(item_id))
+    previous = previous_item_key(item_id)
+    if item is None and previous:
+        item = get_s3_object(previous)
+    return item
+
+def save_item(item):
+    """Write an item object to its key, removing a copy left at its previous key"""
+    if not put_s3_object(item_key(item['id']), item):
+        return False
+    previous = previous_item_key(item['id'])
+    if previous:
+        delete_s3_object(previous)
+    return True
+
 def get_index():
     """Get or create index"""
     index = get_s3_object('metadata/index.json')
@@ -56,29 +103,46 @@ def get_index():
         index = {'items': [], 'updated_at': datetime.now().isoformat()}
     return index
 
-def update_index(index):
-    """Update index"""
+def update_index(index, removed=(), added=()):
+    """Update index, then bring the stats rollup up to it"""
+    before = index.get('updated_at')
     index['updated_at'] = datetime.now().isoformat()
-    return put_s3_object('metadata/index.json', index)
+    if not put_s3_object('metadata/index.json', index):
+        return False
+    # The binary snapshot is only written by the backend; drop it so readers don't try a stale one
+    delete_s3_object('metadata/index.snapshot')
+    put_s3_object(STATS_KEY, advance_stats(get_s3_object(STATS_KEY), index, before, removed, added))
+    return True
+
+# Pick up master data published from the admin endpoint without a redeploy: loaded
+# while the function starts, then revalidated off the request path at most once per
+# interval (a one-off thread, so nothing keeps polling between invocations)
+master_data_reloader = MasterDataReloader(
+    lambda etag: get_s3_object_if_changed(MASTER_DATA_KEY, etag) if s3 else (None, None),
+    interval=int(os.getenv('MASTER_DATA_REFRESH_SECONDS', '60'))
+)
+if s3:
+    master_data_reloader.refresh()
 
-def extract_youtube_id(url):
-    """Extract YouTube video ID"""
-    pattern = r'(?:youtube\.com\/(?:shorts\/|watch\?v=)|youtu\.be\/)([a-zA-Z0-9_-]{11})'
-    match = re.search(pattern, url)
-    return match.group(1) if match else None
+# Retried creates (Idempotency-Key) get the first response back
+idempotency_store = IdempotencyStore(get_s3_object, put_s3_object, delete_s3_object)
 
 class handler(BaseHTTPRequestHandler):
     def _send_cors_headers(self):
         """Send CORS headers"""
         self.send_header('Access-Control-Allow-Origin', '*')
         self.send_header('Access-Control-Allow-Methods', 'GET, POST, PUT, DELETE, OPTIONS')
-        self.send_header('Access-Control-Allow-Headers', 'Content-Type, X-User-Email')
+        self.send_header('Access-Control-Allow-Headers', 'Content-Type, X-User-Email, Idempotency-Key')
+        self.send_header('Access-Control-Expose-Headers', 'Idempotent-Replayed')
     
-    def _send_response(self, status_code, data):
+    def _send_response(self, status_code, data, headers=None):
         """Send JSON response"""
+        self.sent = (status_code, data)
         self.send_response(status_code)
         self._send_cors_headers()
         self.send_header('Content-type', 'application/json')
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
         self.end_headers()
         self.wfile.write(json.dumps(data).encode())
     
@@ -89,7 +153,42 @@ class handler(BaseHTTPRequestHandler):
         self.end_headers()
     
     def do_POST(self):
-        """Create new item"""
+        """Create new item, replaying the first response to a retry with the same Idempotency-Key"""
+        # Check content length
+        content_length = int(self.headers.get('Content-Length', 0))
+        
+        # Enforce 20MB limit
+        if content_length > MAX_FILE_SIZE:
+            self._send_response(413, {
+                'error': 'Request too large. Maximum 20MB allowed. Please use YouTube link instead of file upload.'
+            })
+            return
+        
+        # Read request body
+        body = self.rfile.read(content_length)
+
+        key = self.headers.get('Idempotency-Key')
+        if not key or not s3:
+            self._create_item(body)
+            return
+        error = validate_key(key)
+        if error:
+            self._send_response(400, {'error': error})
+            return
+
+        # Checked before the files are uploaded, so a retry never uploads again
+        user_email = self.headers.get('X-User-Email', 'anonymous@adda247.com')
+        fingerprint = body_fingerprint(body)
+        replay = idempotency_store.begin(user_email, key, fingerprint)
+        if replay is not None:
+            status, body, replayed = replay
+            self._send_response(status, body, {'Idempotent-Replayed': 'true'} if replayed else None)
+            return
+        self.sent = (500, None)
+        self._create_item(body)
+        idempotency_store.finish(user_email, key, *self.sent, fingerprint)
+
+    def _create_item(self, body):
         try:
             # Check S3 configuration
             if not s3:
@@ -98,19 +197,6 @@ class handler(BaseHTTPRequestHandler):
                 })
                 return
             
-            # Check content length
-            content_length = int(self.headers.get('Content-Length', 0))
-            
-            # Enforce 20MB limit
-            if content_length > MAX_FILE_SIZE:
-                self._send_response(413, {
-                    'error': 'Request too large. Maximum 20MB allowed. Please use YouTube link instead of file upload.'
-                })
-                return
-            
-            # Read request body
-            body = self.rfile.read(content_length)
-            
             # Parse JSON data
             try:
                 data = json.loads(body.decode('utf-8'))
@@ -134,6 +220,14 @@ class handler(BaseHTTPRequestHandler):
                 })
                 return
             
+            # Validate against master data
+            master_data_reloader.refresh_in_background()
+            try:
+                vertical, exam, subject = normalize_selection(vertical, exam, data.get('subject', '').strip())
+            except ValueError as e:
+                self._send_response(400, {'error': str(e)})
+                return
+            
             if not verification_link:
                 self._send_response(400, {
                     'error': 'YouTube link is required'
@@ -167,7 +261,7 @@ class handler(BaseHTTPRequestHandler):
                 'contentType': content_type,
                 'vertical': vertical,
                 'exam': exam,
-                'subject': data.get('subject', ''),
+                'subject': subject,
                 'status': status,
                 'contentSubcategory': data.get('contentSubcategory', ''),
                 'driveLink': data.get('driveLink', ''),
@@ -179,9 +273,9 @@ class handler(BaseHTTPRequestHandler):
             }
             
             # Save to S3
-            put_s3_object(f"metadata/items/{item_id}.json", item)
+            save_item(item)
             index['items'].append(item)
-            update_index(index)
+            update_index(index, added=[item])
             
             # Success response
             self._send_response(201, {'item': item, 'message': 'Item created successfully'})
@@ -224,7 +318,7 @@ class handler(BaseHTTPRequestHandler):
             user_email = self.headers.get('X-User-Email', 'anonymous@adda247.com')
             
             # Get existing item
-            existing_item = get_s3_object(f"metadata/items/{item_id}.json")
+            existing_item = get_item(item_id)
             if not existing_item:
                 self._send_response(404, {'error': 'Item not found'})
                 return
@@ -236,11 +330,25 @@ class handler(BaseHTTPRequestHandler):
                 })
                 return
             
+            old_item = dict(existing_item)
+            
+            # Validate against master data when the selection changes
+            vertical = data.get('vertical', existing_item.get('vertical'))
+            exam = data.get('exam', existing_item.get('exam'))
+            subject = data.get('subject', existing_item.get('subject'))
+            if any(field in data for field in ('vertical', 'exam', 'subject')):
+                master_data_reloader.refresh_in_background()
+                try:
+                    vertical, exam, subject = normalize_selection(vertical or '', exam or '', subject or '')
+                except ValueError as e:
+                    self._send_response(400, {'error': str(e)})
+                    return
+            
             # Update item fields
             existing_item.update({
-                'vertical': data.get('vertical', existing_item.get('vertical')),
-                'exam': data.get('exam', existing_item.get('exam')),
-                'subject': data.get('subject', existing_item.get('subject')),
+                'vertical': vertical,
+                'exam': exam,
+                'subject': subject,
                 'contentType': data.get('contentType', existing_item.get('contentType')),
                 'status': data.get('status', existing_item.get('status')),
                 'contentSubcategory': data.get('contentSubcategory', existing_item.get('contentSubcategory')),
@@ -255,15 +363,20 @@ class handler(BaseHTTPRequestHandler):
                 existing_item['youtube_id'] = youtube_id
             
             # Save to S3
-            put_s3_object(f"metadata/items/{item_id}.json", existing_item)
+            save_item(existing_item)
             
             # Update index
             index = get_index()
+            removed = []
             for i, item in enumerate(index.get('items', [])):
                 if item.get('id') == item_id:
                     index['items'][i] = existing_item
+                    removed = [old_item]
                     break
-            update_index(index)
+            else:
+                # The item object exists, so put it back in an index that lost it
+                index.setdefault('items', []).append(existing_item)
+            update_index(index, removed=removed, added=[existing_item])
             
             # Success response
             self._send_response(200, {'item': existing_item, 'message': 'Item updated successfully'})
@@ -295,7 +408,7 @@ class handler(BaseHTTPRequestHandler):
             user_email = self.headers.get('X-User-Email', 'anonymous@adda247.com')
             
             # Get existing item
-            existing_item = get_s3_object(f"metadata/items/{item_id}.json")
+            existing_item = get_item(item_id)
             if not existing_item:
                 self._send_response(404, {'error': 'Item not found'})
                 return
@@ -308,15 +421,14 @@ class handler(BaseHTTPRequestHandler):
                 return
             
             # Delete from S3
-            try:
-                s3.delete_object(Bucket=S3_BUCKET_NAME, Key=f"metadata/items/{item_id}.json")
-            except:
-                pass
+            for key in (item_key(item_id), previous_item_key(item_id)):
+                if key:
+                    delete_s3_object(key)
             
             # Update index
             index = get_index()
             index['items'] = [item for item in index.get('items', []) if item.get('id') != item_id]
-            update_index(index)
+            update_index(index, removed=[existing_item])
             
             # Success response
             self._send_response(200, {'message': 'Item deleted successfully'})
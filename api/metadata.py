@@ -4,8 +4,11 @@ import sys
 import os
 from urllib.parse import parse_qs, urlparse
 import boto3
+from botocore.exceptions import ClientError
 
 sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+from backend.fault_injection import wrap_client
+from backend.item_store import CachedItemStore
 
 # AWS Configuration
 AWS_ACCESS_KEY_ID = os.getenv('AWS_ACCESS_KEY_ID')
@@ -13,20 +16,30 @@ AWS_SECRET_ACCESS_KEY = os.getenv('AWS_SECRET_ACCESS_KEY')
 AWS_REGION = os.getenv('AWS_REGION', 'ap-south-1')
 S3_BUCKET_NAME = os.getenv('S3_BUCKET_NAME')
 
-s3 = boto3.client(
+s3 = wrap_client(boto3.client(
     's3',
     aws_access_key_id=AWS_ACCESS_KEY_ID,
     aws_secret_access_key=AWS_SECRET_ACCESS_KEY,
     region_name=AWS_REGION
-) if AWS_ACCESS_KEY_ID else None
+) if AWS_ACCESS_KEY_ID else None)
 
-def get_s3_object(key):
-    """Get object from S3"""
+def get_s3_object_if_changed(key, etag=None):
+    """Get object from S3 unless it still has the given ETag"""
+    params = {'Bucket': S3_BUCKET_NAME, 'Key': key}
+    if etag:
+        params['IfNoneMatch'] = etag
     try:
-        response = s3.get_object(Bucket=S3_BUCKET_NAME, Key=key)
-        return json.loads(response['Body'].read().decode('utf-8'))
+        response = s3.get_object(**params)
+        return json.loads(response['Body'].read().decode('utf-8')), response.get('ETag')
+    except ClientError as e:
+        if e.response.get('Error', {}).get('Code') in ('NoSuchKey', '404'):
+            return None, None
+        return None, etag
     except:
-        return None
+        return None, etag
+
+# Kept across invocations of a warm instance; an unchanged index is neither downloaded nor parsed again
+items_store = CachedItemStore(lambda etag: get_s3_object_if_changed('metadata/index.json', etag))
 
 class handler(BaseHTTPRequestHandler):
     def _send_cors_headers(self):
@@ -54,22 +67,11 @@ class handler(BaseHTTPRequestHandler):
             subject = params.get('subject', [''])[0]
             content_type = params.get('contentType', [''])[0]
             
-            # Get items from S3
+            # Get items from S3, building dicts only for the matching rows
             items = []
             if s3:
-                index = get_s3_object('metadata/index.json')
-                if index and 'items' in index:
-                    items = index['items']
-                    
-                    # Apply filters
-                    if vertical:
-                        items = [item for item in items if item.get('vertical', '') == vertical]
-                    if exam:
-                        items = [item for item in items if item.get('exam', '') == exam]
-                    if subject:
-                        items = [item for item in items if item.get('subject', '') == subject]
-                    if content_type:
-                        items = [item for item in items if item.get('contentType', '') == content_type]
+                store = items_store.get()
+                items = store.rows(store.select(vertical=vertical, exam=exam, subject=subject, contentType=content_type))
             
             # Send response
             self.send_response(200)
@@ -2,10 +2,52 @@ from http.server import BaseHTTPRequestHandler
 import json
 import sys
 import os
+import boto3
+from botocore.exceptions import ClientError
 
 # Add backend to path
 sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+from backend.fault_injection import wrap_client
 from backend.master_data import get_all_verticals, get_exams_by_vertical, get_subjects_by_vertical, get_content_subcategories
+from backend.master_data import MASTER_DATA_KEY, MasterDataReloader, get_version
+
+# AWS Configuration
+AWS_ACCESS_KEY_ID = os.getenv('AWS_ACCESS_KEY_ID')
+AWS_SECRET_ACCESS_KEY = os.getenv('AWS_SECRET_ACCESS_KEY')
+AWS_REGION = os.getenv('AWS_REGION', 'ap-south-1')
+S3_BUCKET_NAME = os.getenv('S3_BUCKET_NAME')
+
+s3 = wrap_client(boto3.client(
+    's3',
+    aws_access_key_id=AWS_ACCESS_KEY_ID,
+    aws_secret_access_key=AWS_SECRET_ACCESS_KEY,
+    region_name=AWS_REGION
+) if AWS_ACCESS_KEY_ID else None)
+
+def get_s3_object_if_changed(key, etag=None):
+    """Get object from S3 unless it still has the given ETag"""
+    params = {'Bucket': S3_BUCKET_NAME, 'Key': key}
+    if etag:
+        params['IfNoneMatch'] = etag
+    try:
+        response = s3.get_object(**params)
+        return json.loads(response['Body'].read().decode('utf-8')), response.get('ETag')
+    except ClientError as e:
+        if e.response.get('Error', {}).get('Code') in ('NoSuchKey', '404'):
+            return None, None
+        return None, etag
+    except:
+        return None, etag
+
+# Pick up master data published from the admin endpoint without a redeploy: loaded
+# while the function starts, then revalidated off the request path at most once per
+# interval (a one-off thread, so nothing keeps polling between invocations)
+master_data_reloader = MasterDataReloader(
+    lambda etag: get_s3_object_if_changed(MASTER_DATA_KEY, etag) if s3 else (None, None),
+    interval=int(os.getenv('MASTER_DATA_REFRESH_SECONDS', '60'))
+)
+if s3:
+    master_data_reloader.refresh()
 
 class handler(BaseHTTPRequestHandler):
     def _send_cors_headers(self):
@@ -23,6 +65,7 @@ class handler(BaseHTTPRequestHandler):
     def do_GET(self):
         """Get dropdown options"""
         try:
+            master_data_reloader.refresh_in_background()
             # Get verticals
             verticals = get_all_verticals()
             
@@ -43,7 +86,8 @@ class handler(BaseHTTPRequestHandler):
                 'verticals': verticals,
                 'categories_by_vertical': categories_by_vertical,
                 'subjects_by_vertical': subjects_by_vertical,
-                'content_subcategories': content_subcategories
+                'content_subcategories': content_subcategories,
+                'version': get_version()
             }
             
             # Send success response
@@ -0,0 +1,100 @@
+from http.server import BaseHTTPRequestHandler
+import json
+import sys
+import os
+import boto3
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+from backend.fault_injection import wrap_client
+from backend.youtube import MAX_LINKS, LINK_ITEM_FIELDS, parse_links, split_links
+
+# AWS Configuration
+AWS_ACCESS_KEY_ID = os.getenv('AWS_ACCESS_KEY_ID')
+AWS_SECRET_ACCESS_KEY = os.getenv('AWS_SECRET_ACCESS_KEY')
+AWS_REGION = os.getenv('AWS_REGION', 'ap-south-1')
+S3_BUCKET_NAME = os.getenv('S3_BUCKET_NAME')
+
+s3 = wrap_client(boto3.client(
+    's3',
+    aws_access_key_id=AWS_ACCESS_KEY_ID,
+    aws_secret_access_key=AWS_SECRET_ACCESS_KEY,
+    region_name=AWS_REGION
+) if AWS_ACCESS_KEY_ID else None)
+
+def get_s3_object(key):
+    """Get object from S3"""
+    try:
+        response = s3.get_object(Bucket=S3_BUCKET_NAME, Key=key)
+        return json.loads(response['Body'].read().decode('utf-8'))
+    except:
+        return None
+
+class handler(BaseHTTPRequestHandler):
+    def _send_cors_headers(self):
+        """Send CORS headers"""
+        self.send_header('Access-Control-Allow-Origin', '*')
+        self.send_header('Access-Control-Allow-Methods', 'POST, OPTIONS')
+        self.send_header('Access-Control-Allow-Headers', 'Content-Type, X-User-Email')
+
+    def _send_response(self, status_code, data):
+        """Send JSON response"""
+        self.send_response(status_code)
+        self._send_cors_headers()
+        self.send_header('Content-type', 'application/json')
+        self.end_headers()
+        self.wfile.write(json.dumps(data).encode())
+
+    def do_OPTIONS(self):
+        """Handle OPTIONS request"""
+        self.send_response(200)
+        self._send_cors_headers()
+        self.end_headers()
+
+    def do_POST(self):
+        """Normalise pasted links and flag the ones already in the index"""
+        try:
+            content_length = int(self.headers.get('Content-Length', 0))
+            try:
+                data = json.loads(self.rfile.read(content_length).decode('utf-8') or '{}')
+            except:
+                self._send_response(400, {'error': 'Invalid JSON data'})
+                return
+
+            links = data.get('links')
+            if links is None:
+                links = split_links(data.get('text', ''))
+            if not isinstance(links, list):
+                self._send_response(400, {'error': 'links must be a list'})
+                return
+            if len(links) > MAX_LINKS:
+                self._send_response(400, {'error': f'At most {MAX_LINKS} links per request'})
+                return
+
+            results = parse_links(links)
+
+            # One index read and one pass over it for the whole batch
+            wanted = {r['youtube_id'] for r in results if r['valid']}
+            found = {}
+            index = get_s3_object('metadata/index.json') if s3 and wanted else None
+            for item in (index or {}).get('items', []):
+                video_id = item.get('youtube_id')
+                if video_id in wanted and video_id not in found:
+                    found[video_id] = item
+
+            for result in results:
+                item = found.get(result['youtube_id'])
+                result['exists'] = item is not None
+                if item is not None:
+                    result['item'] = {k: item.get(k) for k in LINK_ITEM_FIELDS}
+
+            self._send_response(200, {
+                'results': results,
+                'total': len(results),
+                'valid': sum(r['valid'] for r in results),
+                'existing': sum(r['exists'] for r in results),
+                'repeated': sum('repeat_of' in r for r in results)
+            })
+
+        except Exception as e:
+            print(f"Error parsing links: {e}")
+            self._send_response(500, {'error': f'Server error: {str(e)}'})
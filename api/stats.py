@@ -0,0 +1,77 @@
+from http.server import BaseHTTPRequestHandler
+import json
+import sys
+import os
+from urllib.parse import parse_qs, urlparse
+import boto3
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+from backend.fault_injection import wrap_client
+from backend.stats import STATS_KEY, DIMENSIONS, build_stats, summarize
+
+# AWS Configuration
+AWS_ACCESS_KEY_ID = os.getenv('AWS_ACCESS_KEY_ID')
+AWS_SECRET_ACCESS_KEY = os.getenv('AWS_SECRET_ACCESS_KEY')
+AWS_REGION = os.getenv('AWS_REGION', 'ap-south-1')
+S3_BUCKET_NAME = os.getenv('S3_BUCKET_NAME')
+
+s3 = wrap_client(boto3.client(
+    's3',
+    aws_access_key_id=AWS_ACCESS_KEY_ID,
+    aws_secret_access_key=AWS_SECRET_ACCESS_KEY,
+    region_name=AWS_REGION
+) if AWS_ACCESS_KEY_ID else None)
+
+def get_s3_object(key):
+    """Get object from S3"""
+    try:
+        response = s3.get_object(Bucket=S3_BUCKET_NAME, Key=key)
+        return json.loads(response['Body'].read().decode('utf-8'))
+    except:
+        return None
+
+class handler(BaseHTTPRequestHandler):
+    def _send_cors_headers(self):
+        """Send CORS headers"""
+        self.send_header('Access-Control-Allow-Origin', '*')
+        self.send_header('Access-Control-Allow-Methods', 'GET, OPTIONS')
+        self.send_header('Access-Control-Allow-Headers', 'Content-Type, X-User-Email')
+
+    def _send_response(self, status_code, data):
+        """Send JSON response"""
+        self.send_response(status_code)
+        self._send_cors_headers()
+        self.send_header('Content-type', 'application/json')
+        self.end_headers()
+        self.wfile.write(json.dumps(data).encode())
+
+    def do_OPTIONS(self):
+        """Handle OPTIONS request"""
+        self.send_response(200)
+        self._send_cors_headers()
+        self.end_headers()
+
+    def do_GET(self):
+        """Get submission counts for dashboard tiles and pivots"""
+        try:
+            parsed = urlparse(self.path)
+            params = parse_qs(parsed.query)
+
+            group_by = [g.strip() for g in params.get('group_by', [''])[0].split(',') if g.strip()]
+            filters = {dim: params.get(dim, [''])[0] for dim in DIMENSIONS}
+
+            # One small object; the index is only counted before the first write or backfill
+            stats = None
+            if s3:
+                stats = get_s3_object(STATS_KEY)
+                if stats is None:
+                    index = get_s3_object('metadata/index.json') or {}
+                    stats = build_stats(index.get('items', []))
+            if stats is None:
+                stats = build_stats([])
+
+            self._send_response(200, summarize(stats, group_by, filters))
+
+        except Exception as e:
+            print(f"Error loading stats: {e}")
+            self._send_response(500, {'error': f'Failed to load stats: {str(e)}'})
@@ -1,16 +1,27 @@
 import os
 import json
 import uuid
-import time
 import hashlib
+import time
 from datetime import datetime
 from functools import wraps
-from werkzeug.utils import secure_filename
-from flask import Flask, request, jsonify
+from flask import Flask, request, jsonify, g, Response, make_response
 from flask_cors import CORS
-import boto3
 from dotenv import load_dotenv
-from master_data import get_all_verticals, get_exams_by_vertical, get_subjects_by_vertical, get_content_subcategories
+from master_data import get_all_verticals, get_exams_by_vertical, get_subjects_by_vertical, get_content_subcategories, normalize_selection, normalize_vertical
+from master_data import MASTER_DATA_KEY, MasterDataReloader, build_document, current_document, install_document, get_version
+from idempotency import IdempotencyStore, form_fingerprint, validate_key
+from item_replica import COLUMNS as REPLICA_COLUMNS, get_replica
+from stats import DIMENSIONS, summarize
+from storage import (
+    S3_BUCKET_NAME, get_s3_object, get_s3_object_if_changed, put_s3_object, upload_file_to_s3,
+    attach_stored_file, file_name, item_files, parse_file_hashes, release_file, stored_files, save_item, remove_item,
+    delete_object, generate_download_url, get_index, update_index, get_stats, record_stats, rebuild_stats,
+    get_item, get_items
+)
+from metrics import finish_request, render, start_request, timed_stage
+import profiling
+from youtube import MAX_LINKS, LINK_ITEM_FIELDS, extract_youtube_id, parse_links, split_links
 
 load_dotenv('../.env.local')
 
@@ -23,28 +34,23 @@ CORS(app, resources={
     r"/api/*": {
         "origins": "*",
         "methods": ["GET", "POST", "PUT", "DELETE", "OPTIONS"],
-        "allow_headers": ["Content-Type", "X-User-Email"],
-        "expose_headers": ["Content-Type"],
+        "allow_headers": ["Content-Type", "X-User-Email", "X-Profile", "Idempotency-Key"],
+        "expose_headers": ["Content-Type", "Server-Timing", "Idempotent-Replayed"],
         "supports_credentials": False,
         "max_age": 3600
     }
 })
 
 # Config
-AWS_ACCESS_KEY_ID = os.getenv('AWS_ACCESS_KEY_ID')
-AWS_SECRET_ACCESS_KEY = os.getenv('AWS_SECRET_ACCESS_KEY')
-AWS_REGION = os.getenv('AWS_REGION', 'ap-south-1')
-S3_BUCKET_NAME = os.getenv('S3_BUCKET_NAME')
-S3_ENDPOINT = os.getenv('S3_ENDPOINT', None)
-
-# S3 client
-s3 = boto3.client(
-    's3',
-    aws_access_key_id=AWS_ACCESS_KEY_ID,
-    aws_secret_access_key=AWS_SECRET_ACCESS_KEY,
-    region_name=AWS_REGION,
-    endpoint_url=S3_ENDPOINT
-)
+ADMIN_EMAILS = {e.strip().lower() for e in os.getenv('ADMIN_EMAILS', '').split(',') if e.strip()}
+MASTER_DATA_REFRESH_SECONDS = int(os.getenv('MASTER_DATA_REFRESH_SECONDS', '60'))
+MAX_CHECK_IDS = 5000
+# Most file hashes one /api/files/check request may ask about
+MAX_CHECK_FILES = 100
+MAX_BATCH_ITEMS = 1000
+# Equality filters accepted by /api/metadata and /api/export
+METADATA_FILTERS = ('vertical', 'category', 'subcategory', 'exam', 'subject', 'status', 'contentType', 'created_by')
+ALLOWED_DOMAINS = ('adda247.com', 'addaeducation.com', 'studyiq.com')
 
 # Password helpers
 def hash_password(password):
@@ -55,6 +61,10 @@ def verify_password(password, hashed):
     """Verify password against hash"""
     return hash_password(password) == hashed
 
+def is_allowed_email(email):
+    """Check the email belongs to one of the company domains"""
+    return any(email.endswith(f'@{domain}') for domain in ALLOWED_DOMAINS)
+
 # Auth decorator
 def require_auth(f):
     @wraps(f)
@@ -64,76 +74,149 @@ def require_auth(f):
             return jsonify({'error': 'User email required'}), 401
         
         # Validate email domain
-        allowed_domains = ['adda247.com', 'addaeducation.com', 'studyiq.com']
-        if not any(user_email.endswith(f'@{domain}') for domain in allowed_domains):
+        if not is_allowed_email(user_email):
             return jsonify({'error': 'Invalid email domain'}), 401
         
         request.user_email = user_email
         return f(*args, **kwargs)
     return decorated
 
-# S3 helpers
-def get_s3_object(key):
-    """Get object from S3"""
-    try:
-        response = s3.get_object(Bucket=S3_BUCKET_NAME, Key=key)
-        return json.loads(response['Body'].read().decode('utf-8'))
-    except s3.exceptions.NoSuchKey:
-        return None
-    except Exception as e:
-        print(f"S3 get error: {e}")
-        return None
+def require_admin(f):
+    @wraps(f)
+    @require_auth
+    def decorated(*args, **kwargs):
+        if request.user_email.lower() not in ADMIN_EMAILS:
+            return jsonify({'error': 'Admin access required'}), 403
+        return f(*args, **kwargs)
+    return decorated
 
-def put_s3_object(key, data):
-    """Put object to S3"""
-    try:
-        s3.put_object(
-            Bucket=S3_BUCKET_NAME,
-            Key=key,
-            Body=json.dumps(data, indent=2),
-            ContentType='application/json'
-        )
-        return True
-    except Exception as e:
-        print(f"S3 put error: {e}")
-        return False
+# Retried creates (Idempotency-Key) get the first response back
+idempotency_store = IdempotencyStore(get_s3_object, put_s3_object, delete_object)
 
-def upload_file_to_s3(file, item_id, user_name):
-    """Upload file to S3 - No size limit"""
-    try:
-        filename = secure_filename(file.filename)
-        timestamp = int(time.time())
-        key = f"files/{user_name}/{item_id}/{timestamp}_{filename}"
-        
-        # Multipart upload for large files (handles unlimited size)
-        s3.upload_fileobj(
-            file,
-            S3_BUCKET_NAME,
-            key,
-            ExtraArgs={'ContentType': file.content_type or 'application/octet-stream'},
-            Config=boto3.s3.transfer.TransferConfig(
-                multipart_threshold=1024 * 25,  # 25MB
-                max_concurrency=10,
-                multipart_chunksize=1024 * 25,
-                use_threads=True
-            )
+def file_size(file):
+    """Size of an uploaded file, leaving its stream where it was"""
+    position = file.stream.tell()
+    file.stream.seek(0, os.SEEK_END)
+    size = file.stream.tell()
+    file.stream.seek(position)
+    return size
+
+def idempotent(f):
+    """Honour an Idempotency-Key header, replaying the first response to a retry
+
+    The key is checked before the files are uploaded, so a retry never
+    uploads them again. A different request under the same key gets 422.
+    """
+    @wraps(f)
+    def decorated(*args, **kwargs):
+        key = request.headers.get('Idempotency-Key')
+        if not key:
+            return f(*args, **kwargs)
+        error = validate_key(key)
+        if error:
+            return jsonify({'error': error}), 400
+
+        fingerprint = form_fingerprint(
+            request.form.items(multi=True),
+            [(name, file.filename, file_size(file)) for name, file in request.files.items(multi=True)]
         )
-        return key
-    except Exception as e:
-        print(f"S3 upload error: {e}")
-        return None
+        replay = idempotency_store.begin(request.user_email, key, fingerprint)
+        if replay is not None:
+            status, body, replayed = replay
+            return jsonify(body), status, {'Idempotent-Replayed': 'true'} if replayed else {}
+        try:
+            response = make_response(f(*args, **kwargs))
+        except Exception:
+            idempotency_store.finish(request.user_email, key, 500, None)
+            raise
+        idempotency_store.finish(request.user_email, key, response.status_code, response.get_json(silent=True), fingerprint)
+        return response
+    return decorated
+
+# Master data published to storage replaces the built-in dict; lookups stay in memory.
+# warm_up loads it; start_background_tasks keeps it fresh in each server process.
+master_data_reloader = MasterDataReloader(
+    lambda etag: get_s3_object_if_changed(MASTER_DATA_KEY, etag),
+    interval=MASTER_DATA_REFRESH_SECONDS
+)
+
+# Warm start: what a cold worker would otherwise do on its first request
+_warm_state = {'ready': False}
+
+def warm_up():
+    """Load master data and the index replica, and compile the URL map
+
+    gunicorn runs this in the master before forking (preload_app), so
+    workers start with the work done and share its pages copy-on-write;
+    without preload each worker runs it before taking requests.
+    """
+    started = time.perf_counter()
+    if S3_BUCKET_NAME:
+        master_data_reloader.refresh()
+    replica = get_replica()
+    app.url_map.bind('localhost').match('/api/options')
+    _warm_state.update({
+        'ready': True,
+        'warm_up_seconds': round(time.perf_counter() - started, 3),
+        'index_updated_at': replica.updated_at,
+        'master_data_version': get_version()
+    })
+    return _warm_state
 
-def get_index():
-    """Get or create index"""
-    index = get_s3_object('metadata/index.json')
-    if index is None:
-        index = {'items': [], 'updated_at': datetime.now().isoformat()}
-    return index
+def start_background_tasks():
+    """Start the master data reloader thread in a serving process
 
-def update_index(index):
-    """Update index atomically"""
-    index['updated_at'] = datetime.now().isoformat()
-    return put_s3_object('metadata/index.json', index)
+    Called by gunicorn in each worker and by the dev server, not at
+    import, so processes forked from a worker (the Excel parse pool)
+    and one-off scripts don't poll storage.
+    """
+    if S3_BUCKET_NAME:
+        master_data_reloader.start()
+
+def stats_summary(group_by, filters):
+    """Summarize the stats rollup; before the first write or backfill, count the replica"""
+    stats = get_stats()
+    if stats is None:
+        return get_replica().summarize(group_by, filters)
+    return summarize(stats, group_by, filters)
+
+def find_youtube_ids(video_ids):
+    """Get {youtube_id: item} for the IDs already in the index"""
+    return get_replica().find_many('youtube_id', video_ids)
+
+def query_metadata(args, user_email):
+    """Run a /api/metadata query on the replica; returns (body, status)"""
+    filters = {field: args.get(field, '') for field in METADATA_FILTERS}
+    if args.get('user_only', 'false').lower() == 'true':
+        filters['created_by'] = user_email
+    
+    sort = args.get('sort', '')
+    if sort and sort not in REPLICA_COLUMNS:
+        return {'error': f'Cannot sort by {sort}'}, 400
+    try:
+        limit = int(args['limit']) if 'limit' in args else None
+        offset = int(args.get('offset', 0))
+    except ValueError:
+        return {'error': 'limit and offset must be integers'}, 400
+    range_args = {'created_from': args.get('created_from', ''), 'created_to': args.get('created_to', '')}
+    
+    replica = get_replica()
+    
+    # Filter
+    with timed_stage('filter'):
+        items = replica.select(filters, sort=sort, descending=args.get('order') == 'desc',
+                               limit=limit, offset=offset, **range_args)
+    
+    body = {'items': items}
+    if limit is not None:
+        body['total'] = replica.count(filters, **range_args)
+    return body, 200
+
+def replay_write(before, index, saved, removed=(), added=()):
+    """Apply an index write this process made to its SQLite replica and the stats rollup"""
+    if saved:
+        get_replica(refresh=False).apply(before, index.get('updated_at'), removed, added)
+        record_stats(index, before, removed, added)
 
 # User management
 def get_user(name):
@@ -151,6 +234,53 @@ def save_user(name, password_hash):
     }
     return put_s3_object(f"users/{name_key}.json", user_data)
 
+# Request metrics
+@app.before_request
+def start_timing():
+    g.timing_token = start_request()
+    g.start_time = time.perf_counter()
+
+@app.after_request
+def add_server_timing(response):
+    if 'timing_token' not in g:
+        return response
+    route = request.url_rule.rule if request.url_rule else 'unmatched'
+    seconds = time.perf_counter() - g.pop('start_time')
+    response.headers['Server-Timing'] = finish_request(g.pop('timing_token'), request.method, route, response.status_code, seconds)
+    return response
+
+# Profiling (off unless PROFILE_REQUESTS is set or an admin sends X-Profile)
+@app.before_request
+def start_profile():
+    if profiling.PROFILE_REQUESTS or profiling.PROFILE_HEADER in request.headers:
+        if profiling.PROFILE_REQUESTS or request.headers.get('X-User-Email', '').lower() in ADMIN_EMAILS:
+            g.profile = profiling.start()
+
+@app.after_request
+def finish_profile(response):
+    handle = g.pop('profile', None)
+    if handle:
+        route = request.url_rule.rule if request.url_rule else 'unmatched'
+        profiling.finish(handle, request.method, route, request.full_path.rstrip('?'), response.status_code)
+    return response
+
+@app.teardown_request
+def abandon_profile(error=None):
+    handle = g.pop('profile', None)
+    if handle:
+        profiling.abandon(handle)
+
+@app.route('/metrics', methods=['GET'])
+def metrics():
+    """Prometheus scrape endpoint"""
+    data, content_type = render()
+    return data, 200, {'Content-Type': content_type}
+
+@app.route('/api/ready', methods=['GET'])
+def ready():
+    """Readiness probe: 200 once warm_up has run in this process"""
+    return jsonify(_warm_state), 200 if _warm_state['ready'] else 503
+
 # Routes
 # Simplified auth - no signup/login needed
 # Authentication is handled via X-User-Email header in require_auth decorator
@@ -178,60 +308,121 @@ def get_options():
         'verticals': verticals,
         'categories_by_vertical': categories_by_vertical,
         'subjects_by_vertical': subjects_by_vertical,
-        'content_subcategories': content_subcategories
+        'content_subcategories': content_subcategories,
+        'version': get_version()
     })
 
 @app.route('/api/metadata', methods=['GET'])
 @require_auth
 def get_metadata():
     """Get filtered items"""
-    vertical = request.args.get('vertical', '')
-    category = request.args.get('category', '')
-    subcategory = request.args.get('subcategory', '')
-    user_only = request.args.get('user_only', 'false').lower() == 'true'
-    
-    index = get_index()
-    items = index.get('items', [])
-    
-    # Filter
-    filtered = []
-    for item in items:
-        if vertical and item.get('vertical') != vertical:
-            continue
-        if category and item.get('category') != category:
-            continue
-        if subcategory and item.get('subcategory') != subcategory:
-            continue
-        if user_only and item.get('created_by') != request.user_email:
-            continue
-        filtered.append(item)
-    
-    return jsonify({'items': filtered})
-
-def extract_youtube_id(url):
-    """Extract YouTube video ID from URL using regex"""
-    import re
-    # Matches youtube.com/watch?v=, youtube.com/shorts/, youtu.be/
-    pattern = r'(?:youtube\.com\/(?:shorts\/|watch\?v=)|youtu\.be\/)([a-zA-Z0-9_-]{11})'
-    match = re.search(pattern, url)
-    return match.group(1) if match else None
+    body, status = query_metadata(request.args, request.user_email)
+    return jsonify(body), status
 
 @app.route('/api/check-duplicate/<video_id>', methods=['GET'])
 @require_auth
 def check_duplicate(video_id):
     """Check if YouTube video ID already exists"""
-    index = get_index()
-    items = index.get('items', [])
-    
-    for item in items:
-        item_video_id = item.get('youtube_id')
-        if item_video_id == video_id:
-            return jsonify({'exists': True, 'item': item})
+    item = find_youtube_ids([video_id]).get(video_id)
+    if item is not None:
+        return jsonify({'exists': True, 'item': item})
     
     return jsonify({'exists': False})
 
+@app.route('/api/check-duplicate', methods=['POST'])
+@require_auth
+def check_duplicates():
+    """Check many YouTube video IDs against one index load"""
+    data = request.get_json(silent=True) or {}
+    video_ids = data.get('video_ids')
+    if not isinstance(video_ids, list) or not all(isinstance(v, str) for v in video_ids):
+        return jsonify({'error': 'video_ids must be a list of strings'}), 400
+    if len(video_ids) > MAX_CHECK_IDS:
+        return jsonify({'error': f'At most {MAX_CHECK_IDS} video IDs per request'}), 400
+
+    found = find_youtube_ids(video_ids)
+
+    results = {}
+    for video_id in video_ids:
+        item = found.get(video_id)
+        if item is None:
+            results[video_id] = {'exists': False}
+        else:
+            results[video_id] = {'exists': True, 'item_id': item.get('id'), 'owner': item.get('created_by')}
+
+    return jsonify({'results': results, 'existing': len(found)})
+
+def file_hashes(form):
+    """(video, files) the client referenced by SHA-256 instead of sending them
+
+    Each is a list of (sha256, filename) from the videoFileSha256 and
+    fileSha256 fields. Raises ValueError for a bad hash or one that isn't
+    stored (the client should send that file).
+    """
+    video = parse_file_hashes(form.getlist('videoFileSha256'))[:1]
+    files = parse_file_hashes(form.getlist('fileSha256'))
+    wanted = [sha256 for sha256, _ in video + files]
+    stored = set(stored_files(wanted))
+    unknown = [sha256 for sha256 in dict.fromkeys(wanted) if sha256 not in stored]
+    if unknown:
+        raise ValueError(f"Files not stored yet, send them instead: {', '.join(unknown)}")
+    return video, files
+
+@app.route('/api/files/check', methods=['POST'])
+@require_auth
+def check_files():
+    """Which files (by SHA-256) are already stored and can be referenced instead of uploaded"""
+    data = request.get_json(silent=True) or {}
+    hashes = data.get('sha256')
+    if not isinstance(hashes, list) or not all(isinstance(h, str) for h in hashes):
+        return jsonify({'error': 'sha256 must be a list of strings'}), 400
+    if len(hashes) > MAX_CHECK_FILES:
+        return jsonify({'error': f'At most {MAX_CHECK_FILES} hashes per request'}), 400
+    try:
+        hashes = [sha256 for sha256, _ in parse_file_hashes(hashes)]
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+
+    stored = set(stored_files(hashes))
+    return jsonify({
+        'stored': [h for h in dict.fromkeys(hashes) if h in stored],
+        'missing': [h for h in dict.fromkeys(hashes) if h not in stored]
+    })
+
+@app.route('/api/parse-links', methods=['POST'])
+@require_auth
+def parse_links_route():
+    """Normalise pasted links and flag the ones already in the index"""
+    data = request.get_json(silent=True) or {}
+    links = data.get('links')
+    if links is None:
+        links = split_links(data.get('text') or request.form.get('text', ''))
+    if not isinstance(links, list):
+        return jsonify({'error': 'links must be a list'}), 400
+    if len(links) > MAX_LINKS:
+        return jsonify({'error': f'At most {MAX_LINKS} links per request'}), 400
+
+    results = parse_links(links)
+
+    # One pass over the index for the whole batch
+    found = find_youtube_ids([r['youtube_id'] for r in results if r['valid']])
+    for result in results:
+        item = found.get(result['youtube_id'])
+        result['exists'] = item is not None
+        if item is not None:
+            result['item'] = {k: item.get(k) for k in LINK_ITEM_FIELDS}
+
+    return jsonify({
+        'results': results,
+        'total': len(results),
+        'valid': sum(r['valid'] for r in results),
+        'existing': sum(r['exists'] for r in results),
+        'repeated': sum('repeat_of' in r for r in results)
+    })
+
 @app.route('/api/item', methods=['POST'])
 @require_auth
+@idempotent
 def create_item():
     """Create new item"""
     # Get form data
@@ -245,16 +436,27 @@ def create_item():
     content_subcategory = request.form.get('contentSubcategory', '').strip()
     
     # Validate email domain
-    allowed_domains = ['adda247.com', 'addaeducation.com', 'studyiq.com']
-    if not any(email.endswith(f'@{domain}') for domain in allowed_domains):
+    if not is_allowed_email(email):
         return jsonify({'error': 'Only adda247.com, addaeducation.com, studyiq.com emails are allowed'}), 400
     
     if not vertical or not content_type or not exam or not status:
         return jsonify({'error': 'All required fields must be filled'}), 400
     
+    # Validate against master data
+    try:
+        vertical, exam, subject = normalize_selection(vertical, exam, subject)
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    
+    # Files already stored can be referenced by hash instead of sent
+    try:
+        video_hashes, hashes = file_hashes(request.form)
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+
     # If status is "Re-edit", video file is required
     video_file = request.files.get('videoFile')
-    if status == 'Re-edit' and not video_file:
+    if status == 'Re-edit' and not video_file and not video_hashes:
         return jsonify({'error': 'Video file is required for Re-edit status'}), 400
     
     # Extract YouTube ID from verification link (if provided)
@@ -265,10 +467,9 @@ def create_item():
             return jsonify({'error': 'Invalid YouTube URL'}), 400
         
         # Check for duplicate
-        index = get_index()
-        for item in index.get('items', []):
-            if item.get('youtube_id') == youtube_id:
-                return jsonify({'error': f'This video already exists! Uploaded by: {item.get("created_by")}'}), 409
+        existing = find_youtube_ids([youtube_id]).get(youtube_id)
+        if existing is not None:
+            return jsonify({'error': f'This video already exists! Uploaded by: {existing.get("created_by")}'}), 409
     
     # Create item
     item_id = str(uuid.uuid4())
@@ -290,12 +491,18 @@ def create_item():
     }
     
     # Handle video file upload (for Re-edit status)
+    for sha256, filename in video_hashes:
+        item['videoFile'] = attach_stored_file(sha256, item_id, filename, request.user_email)
     if video_file and video_file.filename:
         video_key = upload_file_to_s3(video_file, item_id, request.user_email)
         if video_key:
             item['videoFile'] = video_key
     
     # Handle other file uploads
+    for sha256, filename in hashes:
+        key = attach_stored_file(sha256, item_id, filename, request.user_email)
+        if key:
+            item['files'].append(key)
     files = request.files.getlist('files')
     for file in files:
         if file.filename:
@@ -304,12 +511,13 @@ def create_item():
                 item['files'].append(key)
     
     # Save item metadata
-    put_s3_object(f"metadata/items/{item_id}.json", item)
+    save_item(item)
     
     # Update index
     index = get_index()
+    before = index.get('updated_at')
     index['items'].append(item)
-    update_index(index)
+    replay_write(before, index, update_index(index), added=[item])
     
     return jsonify({'item': item}), 201
 
@@ -318,7 +526,7 @@ def create_item():
 def update_item(item_id):
     """Update item"""
     # Get existing item
-    item = get_s3_object(f"metadata/items/{item_id}.json")
+    item = get_item(item_id)
     if not item:
         return jsonify({'error': 'Item not found'}), 404
     
@@ -326,11 +534,20 @@ def update_item(item_id):
     if item.get('created_by') != request.user_email:
         return jsonify({'error': 'Not authorized'}), 403
     
+    old_item = dict(item)
+    
     # Update fields
     if 'title' in request.form:
         item['title'] = request.form['title'].strip()
-    if 'vertical' in request.form:
-        item['vertical'] = request.form['vertical'].strip()
+    # Validate against master data when the selection changes
+    if any(field in request.form for field in ('vertical', 'exam', 'subject')):
+        try:
+            item['vertical'], item['exam'], item['subject'] = normalize_selection(
+                request.form.get('vertical', item.get('vertical') or '').strip(),
+                request.form.get('exam', item.get('exam') or '').strip(),
+                request.form.get('subject', item.get('subject') or '').strip())
+        except ValueError as e:
+            return jsonify({'error': str(e)}), 400
     if 'category' in request.form:
         item['category'] = request.form['category'].strip()
     if 'subcategory' in request.form:
@@ -341,8 +558,16 @@ def update_item(item_id):
         item['links'] = [l.strip() for l in request.form['links'].split(',') if l.strip()]
     if 'tags' in request.form:
         item['tags'] = [t.strip() for t in request.form['tags'].split(',') if t.strip()]
+    try:
+        _, hashes = file_hashes(request.form)
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
     
     # Handle new file uploads
+    for sha256, filename in hashes:
+        key = attach_stored_file(sha256, item_id, filename, request.user_email)
+        if key:
+            item['files'].append(key)
     files = request.files.getlist('files')
     for file in files:
         if file.filename:
@@ -353,15 +578,21 @@ def update_item(item_id):
     item['updated_at'] = datetime.now().isoformat()
     
     # Save item
-    put_s3_object(f"metadata/items/{item_id}.json", item)
+    save_item(item)
     
     # Update index
     index = get_index()
+    before = index.get('updated_at')
+    removed = []
     for i, idx_item in enumerate(index['items']):
         if idx_item['id'] == item_id:
             index['items'][i] = item
+            removed = [old_item]
             break
-    update_index(index)
+    else:
+        # The item object exists, so put it back in an index that lost it
+        index['items'].append(item)
+    replay_write(before, index, update_index(index), removed=removed, added=[item])
     
     return jsonify({'item': item})
 
@@ -370,7 +601,7 @@ def update_item(item_id):
 def delete_item(item_id):
     """Delete item"""
     # Get item
-    item = get_s3_object(f"metadata/items/{item_id}.json")
+    item = get_item(item_id)
     if not item:
         return jsonify({'error': 'Item not found'}), 404
     
@@ -378,36 +609,44 @@ def delete_item(item_id):
     if item.get('created_by') != request.user_email:
         return jsonify({'error': 'Not authorized'}), 403
     
-    # Delete files from S3
-    for file_key in item.get('files', []):
-        try:
-            s3.delete_object(Bucket=S3_BUCKET_NAME, Key=file_key)
-        except Exception as e:
-            print(f"Error deleting file {file_key}: {e}")
+    # Release files (deleted once no other item uses them)
+    for file_key in item_files(item):
+        release_file(file_key, item_id)
     
     # Delete metadata
-    try:
-        s3.delete_object(Bucket=S3_BUCKET_NAME, Key=f"metadata/items/{item_id}.json")
-    except Exception as e:
-        print(f"Error deleting metadata: {e}")
+    remove_item(item_id)
     
     # Update index
     index = get_index()
+    before = index.get('updated_at')
     index['items'] = [i for i in index['items'] if i['id'] != item_id]
-    update_index(index)
+    replay_write(before, index, update_index(index), removed=[item])
     
     return jsonify({'message': 'Item deleted'}), 200
 
+@app.route('/api/items/batch', methods=['POST'])
+@require_auth
+def get_items_batch():
+    """Get full item records for many ids, fetched concurrently"""
+    data = request.get_json(silent=True) or {}
+    ids = data.get('ids')
+    if not isinstance(ids, list) or not all(isinstance(i, str) for i in ids):
+        return jsonify({'error': 'ids must be a list of strings'}), 400
+    if len(ids) > MAX_BATCH_ITEMS:
+        return jsonify({'error': f'At most {MAX_BATCH_ITEMS} ids per request'}), 400
+
+    found = get_items(ids)
+    return jsonify({
+        'items': [found[i] for i in dict.fromkeys(ids) if i in found],
+        'missing': [i for i in dict.fromkeys(ids) if i not in found]
+    })
+
 @app.route('/api/item/<item_id>/download/<path:file_key>', methods=['GET'])
 @require_auth
 def download_file(item_id, file_key):
     """Generate presigned URL for file download"""
     try:
-        url = s3.generate_presigned_url(
-            'get_object',
-            Params={'Bucket': S3_BUCKET_NAME, 'Key': file_key},
-            ExpiresIn=3600
-        )
+        url = generate_download_url(file_key, filename=file_name(file_key, item_id))
         return jsonify({'url': url})
     except Exception as e:
         return jsonify({'error': str(e)}), 500
@@ -431,14 +670,20 @@ def bulk_upload():
     reader = csv.DictReader(StringIO(content))
     
     items_created = []
+    rejected = []
     index = get_index()
+    before = index.get('updated_at')
     
-    for row in reader:
+    for line, row in enumerate(reader, start=2):
+        vertical = normalize_vertical(row.get('vertical') or '')
+        if not vertical:
+            rejected.append({'row': line, 'error': f"Unknown vertical: {(row.get('vertical') or '').strip()}"})
+            continue
         item_id = str(uuid.uuid4())
         item = {
             'id': item_id,
             'title': row.get('title', '').strip(),
-            'vertical': row.get('vertical', '').strip(),
+            'vertical': vertical,
             'category': row.get('category', '').strip(),
             'subcategory': row.get('subcategory', '').strip(),
             'notes': row.get('notes', '').strip(),
@@ -449,14 +694,14 @@ def bulk_upload():
             'created_at': datetime.now().isoformat()
         }
         
-        if item['title'] and item['vertical']:
-            put_s3_object(f"metadata/items/{item_id}.json", item)
+        if item['title']:
+            save_item(item)
             index['items'].append(item)
             items_created.append(item)
     
-    update_index(index)
+    replay_write(before, index, update_index(index), added=items_created)
     
-    return jsonify({'items_created': len(items_created), 'items': items_created}), 201
+    return jsonify({'items_created': len(items_created), 'items': items_created, 'rejected': rejected}), 201
 
 @app.route('/api/export', methods=['GET'])
 @require_auth
@@ -465,23 +710,12 @@ def export_csv():
     import csv
     from io import StringIO
     
-    vertical = request.args.get('vertical', '')
-    category = request.args.get('category', '')
-    subcategory = request.args.get('subcategory', '')
-    
-    index = get_index()
-    items = index.get('items', [])
+    filters = {field: request.args.get(field, '') for field in METADATA_FILTERS}
     
     # Filter
-    filtered = []
-    for item in items:
-        if vertical and item.get('vertical') != vertical:
-            continue
-        if category and item.get('category') != category:
-            continue
-        if subcategory and item.get('subcategory') != subcategory:
-            continue
-        filtered.append(item)
+    with timed_stage('filter'):
+        items = get_replica().select(filters, created_from=request.args.get('created_from', ''),
+                                     created_to=request.args.get('created_to', ''))
     
     # Generate CSV
     output = StringIO()
@@ -489,7 +723,7 @@ def export_csv():
     writer = csv.DictWriter(output, fieldnames=fieldnames)
     writer.writeheader()
     
-    for item in filtered:
+    for item in items:
         writer.writerow({
             'id': item.get('id', ''),
             'title': item.get('title', ''),
@@ -509,5 +743,90 @@ def export_csv():
         'Content-Disposition': 'attachment; filename=export.csv'
     }
 
+@app.route('/api/stats', methods=['GET'])
+@require_auth
+def get_stats_summary():
+    """Get submission counts for dashboard tiles and pivots"""
+    group_by = [g.strip() for g in request.args.get('group_by', '').split(',') if g.strip()]
+    filters = {dim: request.args.get(dim, '') for dim in DIMENSIONS}
+    
+    return jsonify(stats_summary(group_by, filters))
+
+@app.route('/api/admin/master-data', methods=['GET'])
+@require_admin
+def get_master_data():
+    """Get the master data currently in use"""
+    return jsonify(current_document())
+
+@app.route('/api/admin/master-data', methods=['PUT'])
+@require_admin
+def publish_master_data():
+    """Publish a new master data version to storage"""
+    data = request.get_json(silent=True) or {}
+    
+    stored = get_s3_object(MASTER_DATA_KEY) or {}
+    version = max(stored.get('version', 0), get_version()) + 1
+    try:
+        document = build_document(
+            data.get('master_data'),
+            data.get('content_subcategories', list(get_content_subcategories())),
+            version,
+            published_by=request.user_email
+        )
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    
+    # Keep every version, then move the pointer other processes revalidate against
+    if not put_s3_object(f"config/master_data/v{version}.json", document):
+        return jsonify({'error': 'Failed to save master data'}), 500
+    if not put_s3_object(MASTER_DATA_KEY, document):
+        return jsonify({'error': 'Failed to publish master data'}), 500
+    install_document(document)
+    
+    return jsonify({'version': version, 'published_at': document['published_at']}), 201
+
+@app.route('/api/admin/profiles', methods=['GET'])
+@require_admin
+def list_profiles():
+    """Slowest profiled requests kept by this process"""
+    return jsonify({'profiles': profiling.list_profiles(), 'keep': profiling.PROFILE_KEEP})
+
+@app.route('/api/admin/profiles', methods=['DELETE'])
+@require_admin
+def clear_profiles():
+    """Drop kept profiles"""
+    profiling.clear()
+    return jsonify({'message': 'Profiles cleared'})
+
+@app.route('/api/admin/profiles/<int:profile_id>', methods=['GET'])
+@require_admin
+def download_profile(profile_id):
+    """Download a profile as speedscope JSON (default), pstats or a text report"""
+    entry = profiling.get_profile(profile_id)
+    if entry is None:
+        return jsonify({'error': 'Profile not found (it may have been evicted)'}), 404
+
+    fmt = request.args.get('format', 'speedscope')
+    if fmt == 'pstats':
+        return Response(profiling.to_pstats(entry), mimetype='application/octet-stream',
+                        headers={'Content-Disposition': f'attachment; filename=profile-{profile_id}.prof'})
+    if fmt == 'text':
+        return Response(profiling.top_functions(entry), mimetype='text/plain')
+    if fmt != 'speedscope':
+        return jsonify({'error': 'format must be speedscope, pstats or text'}), 400
+    return Response(json.dumps(profiling.to_speedscope(entry)), mimetype='application/json',
+                    headers={'Content-Disposition': f'attachment; filename=profile-{profile_id}.speedscope.json'})
+
+@app.cli.command('rebuild-stats')
+def rebuild_stats_command():
+    """Rebuild the stats rollup from the index (backfill)"""
+    count = rebuild_stats()
+    if count is None:
+        print("Failed to save stats")
+        raise SystemExit(1)
+    print(f"Rebuilt stats from {count} items")
+
 if __name__ == '__main__':
+    warm_up()
+    start_background_tasks()
     app.run(debug=True, port=5001)
@@ -0,0 +1,432 @@
+"""ASGI variant of the API
+
+Run with: uvicorn asgi:app --app-dir backend
+
+The busy routes are served natively: storage calls run on a dedicated
+thread pool so the event loop never blocks on S3, and a request that
+needs several objects fetches them concurrently. One process can keep
+hundreds of requests in flight, bounded by ASGI_IO_THREADS and
+S3_MAX_POOL_CONNECTIONS rather than by the worker count. Every other
+route (exports, bulk upload, admin, downloads, /metrics) falls through
+to the Flask app, so behaviour stays identical.
+"""
+import asyncio
+import contextlib
+import contextvars
+import json
+import os
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from functools import wraps
+from a2wsgi import WSGIMiddleware
+from starlette.applications import Starlette
+from starlette.middleware import Middleware
+from starlette.middleware.cors import CORSMiddleware
+from starlette.responses import JSONResponse
+from starlette.routing import Mount, Route
+from master_data import (
+    get_all_verticals, get_exams_by_vertical, get_subjects_by_vertical, get_content_subcategories,
+    get_version, normalize_selection
+)
+from stats import DIMENSIONS
+from storage import get_item, upload_file_to_s3, get_index, update_index
+from storage import attach_stored_file, item_files, release_file, remove_item, save_item
+from metrics import finish_request, start_request
+from youtube import MAX_LINKS, LINK_ITEM_FIELDS, extract_youtube_id, parse_links, split_links
+from app import app as flask_app, file_hashes, find_youtube_ids, idempotency_store, is_allowed_email, start_background_tasks, stats_summary, warm_up, query_metadata, replay_write, MAX_CHECK_IDS
+from idempotency import form_fingerprint, validate_key
+
+# Threads for blocking storage calls (the default executor only has cpu_count + 4)
+ASGI_IO_THREADS = int(os.getenv('ASGI_IO_THREADS', '64'))
+
+_io_pool = ThreadPoolExecutor(max_workers=ASGI_IO_THREADS, thread_name_prefix='storage')
+
+async def run_io(func, *args):
+    """Run a blocking storage call on the I/O pool, keeping context variables (metrics)"""
+    context = contextvars.copy_context()
+    return await asyncio.get_running_loop().run_in_executor(_io_pool, lambda: context.run(func, *args))
+
+async def commit_items(removed=(), added=()):
+    """Apply item changes to the index, read just before the write
+
+    As in the Flask handlers, nothing read before a (possibly long) upload
+    is written back, so changes other requests made meanwhile are kept.
+    Items in both removed and added are replaced in place, and added items
+    the index lost are appended; removed only counts items it still had.
+    """
+    index = await run_io(get_index)
+    before = index.get('updated_at')
+    present = {i['id'] for i in index['items']}
+    removed = [item for item in removed if item['id'] in present]
+    changed = {item['id']: item for item in added}
+    gone = {item['id'] for item in removed} - set(changed)
+    items = [changed.pop(i['id'], i) for i in index['items'] if i['id'] not in gone]
+    index['items'] = items + list(changed.values())
+    await run_io(replay_write, before, index, await run_io(update_index, index), removed, added)
+
+def timed(path, handler):
+    """Record request metrics and a Server-Timing header, as the Flask hooks do"""
+    rule = path.replace('{', '<').replace('}', '>')
+
+    @wraps(handler)
+    async def endpoint(request):
+        token = start_request()
+        start = time.perf_counter()
+        response = await handler(request)
+        seconds = time.perf_counter() - start
+        response.headers['Server-Timing'] = finish_request(token, request.method, rule, response.status_code, seconds)
+        return response
+    return endpoint
+
+def route(path, handler, method):
+    return Route(path, timed(path, handler), methods=[method])
+
+def error(message, status):
+    return JSONResponse({'error': message}, status_code=status)
+
+# Auth decorator (same rules as app.require_auth)
+def require_auth(handler):
+    @wraps(handler)
+    async def decorated(request):
+        user_email = request.headers.get('X-User-Email')
+        if not user_email:
+            return error('User email required', 401)
+
+        # Validate email domain
+        if not is_allowed_email(user_email):
+            return error('Invalid email domain', 401)
+
+        request.state.user_email = user_email
+        return await handler(request)
+    return decorated
+
+def idempotent(handler):
+    """Honour an Idempotency-Key header (same rules as app.idempotent)"""
+    @wraps(handler)
+    async def decorated(request):
+        key = request.headers.get('Idempotency-Key')
+        if not key:
+            return await handler(request)
+        message = validate_key(key)
+        if message:
+            return error(message, 400)
+
+        user_email = request.state.user_email
+        form = await request.form()
+        fingerprint = form_fingerprint(
+            [(name, value) for name, value in form.multi_items() if isinstance(value, str)],
+            [(name, value.filename, value.size) for name, value in form.multi_items() if not isinstance(value, str)]
+        )
+        replay = await run_io(idempotency_store.begin, user_email, key, fingerprint)
+        if replay is not None:
+            status, body, replayed = replay
+            return JSONResponse(body, status_code=status, headers={'Idempotent-Replayed': 'true'} if replayed else None)
+        try:
+            response = await handler(request)
+        except Exception:
+            await run_io(idempotency_store.finish, user_email, key, 500, None)
+            raise
+        await run_io(idempotency_store.finish, user_email, key, response.status_code, json.loads(response.body), fingerprint)
+        return response
+    return decorated
+
+class _Upload:
+    """Give a Starlette UploadFile the FileStorage attributes upload_file_to_s3 uses"""
+
+    def __init__(self, upload):
+        self.filename = upload.filename
+        self.content_type = upload.content_type
+        self.stream = upload.file
+
+    def read(self, *args):
+        return self.stream.read(*args)
+
+# Routes
+@require_auth
+async def get_options(request):
+    """Get dropdown options from master data"""
+    verticals = get_all_verticals()
+    return JSONResponse({
+        'verticals': verticals,
+        'categories_by_vertical': {v: get_exams_by_vertical(v) for v in verticals},
+        'subjects_by_vertical': {v: get_subjects_by_vertical(v) for v in verticals},
+        'content_subcategories': get_content_subcategories(),
+        'version': get_version()
+    })
+
+@require_auth
+async def get_metadata(request):
+    """Get filtered items"""
+    body, status = await run_io(query_metadata, request.query_params, request.state.user_email)
+    return JSONResponse(body, status_code=status)
+
+@require_auth
+async def check_duplicate(request):
+    """Check if YouTube video ID already exists"""
+    video_id = request.path_params['video_id']
+    item = (await run_io(find_youtube_ids, [video_id])).get(video_id)
+    if item is not None:
+        return JSONResponse({'exists': True, 'item': item})
+    return JSONResponse({'exists': False})
+
+def _text(form, name):
+    value = form.get(name)
+    return value.strip() if isinstance(value, str) else ''
+
+async def _json_body(request):
+    try:
+        data = await request.json()
+    except ValueError:
+        return {}
+    return data if isinstance(data, dict) else {}
+
+@require_auth
+async def check_duplicates(request):
+    """Check many YouTube video IDs against one index load"""
+    data = await _json_body(request)
+    video_ids = data.get('video_ids')
+    if not isinstance(video_ids, list) or not all(isinstance(v, str) for v in video_ids):
+        return error('video_ids must be a list of strings', 400)
+    if len(video_ids) > MAX_CHECK_IDS:
+        return error(f'At most {MAX_CHECK_IDS} video IDs per request', 400)
+
+    found = await run_io(find_youtube_ids, video_ids)
+    results = {}
+    for video_id in video_ids:
+        item = found.get(video_id)
+        if item is None:
+            results[video_id] = {'exists': False}
+        else:
+            results[video_id] = {'exists': True, 'item_id': item.get('id'), 'owner': item.get('created_by')}
+    return JSONResponse({'results': results, 'existing': len(found)})
+
+@require_auth
+async def parse_links_route(request):
+    """Normalise pasted links and flag the ones already in the index"""
+    data = await _json_body(request)
+    links = data.get('links')
+    if links is None:
+        links = split_links(data.get('text', ''))
+    if not isinstance(links, list):
+        return error('links must be a list', 400)
+    if len(links) > MAX_LINKS:
+        return error(f'At most {MAX_LINKS} links per request', 400)
+
+    results = parse_links(links)
+    found = await run_io(find_youtube_ids, [r['youtube_id'] for r in results if r['valid']])
+    for result in results:
+        item = found.get(result['youtube_id'])
+        result['exists'] = item is not None
+        if item is not None:
+            result['item'] = {k: item.get(k) for k in LINK_ITEM_FIELDS}
+
+    return JSONResponse({
+        'results': results,
+        'total': len(results),
+        'valid': sum(r['valid'] for r in results),
+        'existing': sum(r['exists'] for r in results),
+        'repeated': sum('repeat_of' in r for r in results)
+    })
+
+@require_auth
+@idempotent
+async def create_item(request):
+    """Create new item"""
+    user_email = request.state.user_email
+    form = await request.form()
+    field = lambda name: _text(form, name)
+
+    email = field('email')
+    verification_link = field('verificationLink')
+    content_type = field('contentType')
+    vertical = field('vertical')
+    exam = field('exam')
+    subject = field('subject')
+    status = field('status')
+    content_subcategory = field('contentSubcategory')
+
+    if not is_allowed_email(email):
+        return error('Only adda247.com, addaeducation.com, studyiq.com emails are allowed', 400)
+
+    if not vertical or not content_type or not exam or not status:
+        return error('All required fields must be filled', 400)
+
+    # Validate against master data
+    try:
+        vertical, exam, subject = normalize_selection(vertical, exam, subject)
+    except ValueError as e:
+        return error(str(e), 400)
+
+    # Files already stored can be referenced by hash instead of sent
+    try:
+        video_hashes, hashes = await run_io(file_hashes, form)
+    except ValueError as e:
+        return error(str(e), 400)
+
+    video_file = form.get('videoFile')
+    video_file = video_file if getattr(video_file, 'filename', None) else None
+    if status == 'Re-edit' and not video_file and not video_hashes:
+        return error('Video file is required for Re-edit status', 400)
+
+    youtube_id = None
+    if verification_link:
+        youtube_id = extract_youtube_id(verification_link)
+        if not youtube_id:
+            return error('Invalid YouTube URL', 400)
+
+        existing = (await run_io(find_youtube_ids, [youtube_id])).get(youtube_id)
+        if existing is not None:
+            return error(f'This video already exists! Uploaded by: {existing.get("created_by")}', 409)
+
+    item_id = str(uuid.uuid4())
+    item = {
+        'id': item_id,
+        'email': email,
+        'verificationLink': verification_link or '',
+        'youtube_id': youtube_id,
+        'contentType': content_type,
+        'vertical': vertical,
+        'exam': exam,
+        'subject': subject,
+        'status': status,
+        'contentSubcategory': content_subcategory,
+        'files': [],
+        'videoFile': None,
+        'created_by': user_email,
+        'created_at': datetime.now().isoformat()
+    }
+
+    # Reference hashed files and upload the rest concurrently
+    uploads = [f for f in form.getlist('files') if getattr(f, 'filename', None)]
+    keys = await asyncio.gather(
+        *[run_io(attach_stored_file, sha256, item_id, filename, user_email) for sha256, filename in video_hashes + hashes],
+        *[run_io(upload_file_to_s3, _Upload(f), item_id, user_email) for f in ([video_file] if video_file else []) + uploads]
+    )
+    hashed, uploaded = keys[:len(video_hashes) + len(hashes)], keys[len(video_hashes) + len(hashes):]
+    if video_hashes:
+        item['videoFile'] = hashed[0]
+        hashed = hashed[1:]
+    if video_file:
+        item['videoFile'] = uploaded[0]
+        uploaded = uploaded[1:]
+    item['files'] = [key for key in hashed + uploaded if key]
+
+    await asyncio.gather(run_io(save_item, item), commit_items(added=[item]))
+
+    return JSONResponse({'item': item}, status_code=201)
+
+@require_auth
+async def update_item(request):
+    """Update item"""
+    item_id = request.path_params['item_id']
+    user_email = request.state.user_email
+    form = await request.form()
+
+    item = await run_io(get_item, item_id)
+    if not item:
+        return error('Item not found', 404)
+
+    # Check ownership
+    if item.get('created_by') != user_email:
+        return error('Not authorized', 403)
+
+    old_item = dict(item)
+
+    # Update fields
+    for name in ('title', 'category', 'subcategory', 'notes'):
+        if name in form:
+            item[name] = _text(form, name)
+    # Validate against master data when the selection changes
+    if any(field in form for field in ('vertical', 'exam', 'subject')):
+        try:
+            item['vertical'], item['exam'], item['subject'] = normalize_selection(*(
+                _text(form, field) if field in form else (item.get(field) or '').strip()
+                for field in ('vertical', 'exam', 'subject')))
+        except ValueError as e:
+            return error(str(e), 400)
+    if 'links' in form:
+        item['links'] = [l.strip() for l in _text(form, 'links').split(',') if l.strip()]
+    if 'tags' in form:
+        item['tags'] = [t.strip() for t in _text(form, 'tags').split(',') if t.strip()]
+    try:
+        _, hashes = await run_io(file_hashes, form)
+    except ValueError as e:
+        return error(str(e), 400)
+
+    uploads = [f for f in form.getlist('files') if getattr(f, 'filename', None)]
+    keys = await asyncio.gather(
+        *[run_io(attach_stored_file, sha256, item_id, filename, user_email) for sha256, filename in hashes],
+        *[run_io(upload_file_to_s3, _Upload(f), item_id, user_email) for f in uploads]
+    )
+    item.setdefault('files', []).extend(key for key in keys if key)
+
+    item['updated_at'] = datetime.now().isoformat()
+
+    await asyncio.gather(run_io(save_item, item), commit_items(removed=[old_item], added=[item]))
+
+    return JSONResponse({'item': item})
+
+@require_auth
+async def delete_item(request):
+    """Delete item"""
+    item_id = request.path_params['item_id']
+
+    item = await run_io(get_item, item_id)
+    if not item:
+        return error('Item not found', 404)
+
+    # Check ownership
+    if item.get('created_by') != request.state.user_email:
+        return error('Not authorized', 403)
+
+    # Release files, delete metadata and update the index together
+    await asyncio.gather(
+        *[run_io(release_file, key, item_id) for key in item_files(item)],
+        run_io(remove_item, item_id),
+        commit_items(removed=[item])
+    )
+
+    return JSONResponse({'message': 'Item deleted'})
+
+@require_auth
+async def get_stats_summary(request):
+    """Get submission counts for dashboard tiles and pivots"""
+    params = request.query_params
+    group_by = [g.strip() for g in params.get('group_by', '').split(',') if g.strip()]
+    filters = {dim: params.get(dim, '') for dim in DIMENSIONS}
+
+    return JSONResponse(await run_io(stats_summary, group_by, filters))
+
+routes = [
+    route('/api/options', get_options, 'GET'),
+    route('/api/metadata', get_metadata, 'GET'),
+    route('/api/check-duplicate/{video_id}', check_duplicate, 'GET'),
+    route('/api/check-duplicate', check_duplicates, 'POST'),
+    route('/api/parse-links', parse_links_route, 'POST'),
+    route('/api/item', create_item, 'POST'),
+    route('/api/item/{item_id}', update_item, 'PUT'),
+    route('/api/item/{item_id}', delete_item, 'DELETE'),
+    route('/api/stats', get_stats_summary, 'GET'),
+    # Everything else is served by the Flask app
+    Mount('/', app=WSGIMiddleware(flask_app, workers=ASGI_IO_THREADS)),
+]
+
+@contextlib.asynccontextmanager
+async def lifespan(app):
+    # Take requests (and report ready on /api/ready) only once warm
+    await run_io(warm_up)
+    start_background_tasks()
+    yield
+
+app = Starlette(routes=routes, lifespan=lifespan, middleware=[
+    Middleware(
+        CORSMiddleware,
+        allow_origins=['*'],
+        allow_methods=['GET', 'POST', 'PUT', 'DELETE', 'OPTIONS'],
+        allow_headers=['Content-Type', 'X-User-Email', 'X-Profile', 'Idempotency-Key'],
+        expose_headers=['Content-Type', 'Server-Timing', 'Idempotent-Replayed'],
+        max_age=3600
+    )
+])
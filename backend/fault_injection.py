@@ -0,0 +1,160 @@
+"""Storage client wrapper that injects latency and errors, for offline performance tests
+
+Wraps anything with the boto3 S3 calls the code uses (a boto3 client,
+LocalS3Client, MemoryS3Client). Set STORAGE_FAULTS to a JSON config file
+and the backend (storage.make_client) and the api/*.py handlers wrap
+their clients with it:
+
+    {
+      "seed": 7,
+      "operations": {
+        "*": {"latency_ms": {"dist": "lognormal", "median": 15, "p99": 120}},
+        "get_object": {
+          "prefix": "metadata/",
+          "latency_ms": {"dist": "uniform", "min": 5, "max": 40, "spike": {"rate": 0.01, "ms": 1500}},
+          "errors": [{"rate": 0.02, "code": "SlowDown", "status": 503}]
+        },
+        "put_object": {
+          "max_per_second": 50,
+          "errors": [{"rate": 0.01, "code": "InternalError", "status": 500, "after": true}]
+        }
+      }
+    }
+
+Operations are client method names (get_object, head_object, put_object,
+upload_fileobj, copy_object, delete_object, list_objects_v2); "*" applies to those
+without their own entry. Per operation:
+
+- latency_ms: fixed {"ms"}, uniform {"min", "max"}, normal {"mean",
+  "stddev"} or lognormal {"median", "p99"}, each with an optional spike
+  {"rate", "ms"} added to that share of calls.
+- errors: a ClientError with that code and HTTP status is raised for
+  that share of calls. With "after": true the call still reaches storage
+  and the error replaces its response, like a write that landed but
+  whose reply was lost.
+- max_per_second: calls over this rate fail with SlowDown (503), as S3
+  throttles a prefix.
+- prefix: only keys starting with it are affected.
+
+Errors are raised outside the boto3 client, so they are not retried by
+botocore; the code sees them as if its retries had run out.
+"""
+import json
+import math
+import os
+import random
+import threading
+import time
+from botocore.exceptions import ClientError
+
+OPERATIONS = ('get_object', 'head_object', 'put_object', 'upload_fileobj', 'copy_object', 'delete_object', 'list_objects_v2')
+_API_NAMES = {
+    'get_object': 'GetObject', 'head_object': 'HeadObject', 'put_object': 'PutObject',
+    'upload_fileobj': 'PutObject', 'copy_object': 'CopyObject', 'delete_object': 'DeleteObject',
+    'list_objects_v2': 'ListObjectsV2',
+}
+# Position of Key for calls that also take it positionally: upload_fileobj(Fileobj, Bucket, Key)
+_KEY_POSITIONS = {'upload_fileobj': 2}
+
+def _error(code, status, operation):
+    return ClientError({
+        'Error': {'Code': code, 'Message': f'Injected {code}'},
+        'ResponseMetadata': {'HTTPStatusCode': status}
+    }, _API_NAMES.get(operation, operation))
+
+class FaultInjectingClient:
+    """Delegates to client, adding the configured latency and errors to each call"""
+
+    def __init__(self, client, config):
+        self.client = client
+        self.operations = config.get('operations', {})
+        self.random = random.Random(config.get('seed'))
+        self.lock = threading.Lock()
+        self.windows = {}
+        # Injected faults by (operation, kind), for benchmark reports
+        self.injected = {}
+
+    def _rule(self, operation, key):
+        rule = self.operations.get(operation, self.operations.get('*'))
+        if rule is None or not (key or '').startswith(rule.get('prefix', '')):
+            return None
+        return rule
+
+    def _count(self, operation, kind):
+        with self.lock:
+            self.injected[(operation, kind)] = self.injected.get((operation, kind), 0) + 1
+
+    def _latency(self, spec):
+        with self.lock:
+            dist = spec.get('dist', 'fixed')
+            if dist == 'uniform':
+                ms = self.random.uniform(spec['min'], spec['max'])
+            elif dist == 'normal':
+                ms = self.random.gauss(spec['mean'], spec['stddev'])
+            elif dist == 'lognormal':
+                # sigma puts the given p99 at z = 2.326
+                sigma = math.log(spec['p99'] / spec['median']) / 2.326
+                ms = self.random.lognormvariate(math.log(spec['median']), sigma)
+            else:
+                ms = spec.get('ms', 0)
+            spike = spec.get('spike')
+            if spike and self.random.random() < spike['rate']:
+                ms += spike['ms']
+        return max(ms, 0) / 1000
+
+    def _throttled(self, operation, limit):
+        """True when this call goes over limit calls in the current second"""
+        now = int(time.monotonic())
+        with self.lock:
+            second, calls = self.windows.get(operation, (now, 0))
+            if second != now:
+                second, calls = now, 0
+            self.windows[operation] = (second, calls + 1)
+            return calls >= limit
+
+    def _pick_error(self, rule):
+        with self.lock:
+            for error in rule.get('errors', []):
+                if self.random.random() < error['rate']:
+                    return error
+        return None
+
+    def _key(self, operation, args, kwargs):
+        position = _KEY_POSITIONS.get(operation)
+        if position is not None and len(args) > position:
+            return args[position]
+        return kwargs.get('Key', kwargs.get('Prefix'))
+
+    def _call(self, operation, method, args, kwargs):
+        rule = self._rule(operation, self._key(operation, args, kwargs))
+        if rule is None:
+            return method(*args, **kwargs)
+        if 'latency_ms' in rule:
+            time.sleep(self._latency(rule['latency_ms']))
+        if 'max_per_second' in rule and self._throttled(operation, rule['max_per_second']):
+            self._count(operation, 'SlowDown')
+            raise _error('SlowDown', 503, operation)
+        error = self._pick_error(rule)
+        if error is None:
+            return method(*args, **kwargs)
+        self._count(operation, error['code'])
+        if error.get('after'):
+            method(*args, **kwargs)
+        raise _error(error['code'], error.get('status', 500), operation)
+
+    def __getattr__(self, name):
+        attr = getattr(self.client, name)
+        if name not in OPERATIONS:
+            return attr
+        return lambda *args, **kwargs: self._call(name, attr, args, kwargs)
+
+def load_config(path):
+    with open(path) as f:
+        return json.load(f)
+
+def wrap_client(client, path=None):
+    """client wrapped with the faults in path (default STORAGE_FAULTS), or client as is"""
+    path = path or os.getenv('STORAGE_FAULTS')
+    if not path or client is None:
+        return client
+    return FaultInjectingClient(client, load_config(path))
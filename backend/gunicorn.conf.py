@@ -0,0 +1,40 @@
+"""Gunicorn settings (loaded automatically from backend/)
+
+Workers share Prometheus metrics through files in PROMETHEUS_MULTIPROC_DIR,
+which is emptied when the server starts.
+
+The app is preloaded and warmed up in the master (GUNICORN_PRELOAD), so
+a new or recycled worker forks with master data, the storage client and
+the index replica ready, and its first request costs what any other does.
+"""
+import gc
+import os
+import shutil
+import tempfile
+
+os.environ.setdefault('PROMETHEUS_MULTIPROC_DIR', os.path.join(tempfile.gettempdir(), 'ytsprint-metrics'))
+
+preload_app = os.getenv('GUNICORN_PRELOAD', 'true').lower() not in ('0', 'false', 'no')
+
+def on_starting(server):
+    path = os.environ['PROMETHEUS_MULTIPROC_DIR']
+    shutil.rmtree(path, ignore_errors=True)
+    os.makedirs(path, exist_ok=True)
+
+def when_ready(server):
+    if server.cfg.preload_app:
+        from app import warm_up
+        state = warm_up()
+        server.log.info("Warmed up in %.3fs", state['warm_up_seconds'])
+        # Keep warm objects out of the collector so it never dirties their pages
+        gc.freeze()
+
+def post_worker_init(worker):
+    from app import start_background_tasks, warm_up
+    if not worker.cfg.preload_app:
+        warm_up()
+    start_background_tasks()
+
+def child_exit(server, worker):
+    from prometheus_client import multiprocess
+    multiprocess.mark_process_dead(worker.pid)
@@ -0,0 +1,114 @@
+"""Hedged calls: send a second copy of a slow call and use whichever answers first
+
+A call that hasn't answered within the `percentile` latency of recent
+calls gets a duplicate. Hedges are capped at `budget` of all calls: each
+call earns `budget` tokens and a hedge spends one, so a slow backend
+sees at most that much extra load.
+
+A forked child (a gunicorn worker of a preloaded master) inherits the
+pool object but none of its threads, so every hedger gets a new pool and
+lock after fork.
+"""
+import contextvars
+import os
+import threading
+import time
+import weakref
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from metrics import HEDGES
+
+# Latencies seen before the percentile replaces min_delay
+MIN_SAMPLES = 20
+# Recompute the delay every this many new latencies
+UPDATE_EVERY = 20
+
+_hedgers = weakref.WeakSet()
+
+def _reset_after_fork():
+    for hedger in list(_hedgers):
+        hedger._reset()
+
+os.register_at_fork(after_in_child=_reset_after_fork)
+
+class Hedger:
+    """Runs calls with a hedge; one per kind of call so latencies are comparable
+
+    answers are exception types that count as a reply (e.g. a 304 or 404
+    from S3): the first call to return or raise one of them wins. Other
+    errors wait for the other copy.
+    """
+
+    def __init__(self, name, percentile=95, min_delay=0.02, budget=0.05, burst=10, window=1000,
+                 workers=64, answers=()):
+        self.name = name
+        self.percentile = percentile
+        self.min_delay = min_delay
+        self.budget = budget
+        self.burst = burst
+        self.answers = answers
+        self.delay = min_delay
+        self._latencies = deque(maxlen=window)
+        self._new = 0
+        self._tokens = 1.0
+        self._workers = workers
+        self._reset()
+        _hedgers.add(self)
+
+    def _reset(self):
+        self._lock = threading.Lock()
+        self._pool = ThreadPoolExecutor(max_workers=self._workers, thread_name_prefix=f'hedge-{self.name}')
+
+    def _observe(self, seconds):
+        with self._lock:
+            self._latencies.append(seconds)
+            self._new += 1
+            if self._new >= UPDATE_EVERY and len(self._latencies) >= MIN_SAMPLES:
+                ordered = sorted(self._latencies)
+                at = min(len(ordered) - 1, int(len(ordered) * self.percentile / 100))
+                self.delay = max(self.min_delay, ordered[at])
+                self._new = 0
+
+    def _timed(self, func, args):
+        start = time.perf_counter()
+        try:
+            return func(*args)
+        finally:
+            self._observe(time.perf_counter() - start)
+
+    def _submit(self, func, args):
+        # Each copy runs in its own copy of the caller's context (request metrics)
+        return self._pool.submit(contextvars.copy_context().run, self._timed, func, args)
+
+    def _spend(self):
+        with self._lock:
+            if self._tokens >= 1:
+                self._tokens -= 1
+                return True
+            return False
+
+    def _answered(self, future):
+        error = future.exception()
+        return error is None or isinstance(error, self.answers)
+
+    def run(self, func, *args):
+        with self._lock:
+            self._tokens = min(self.burst, self._tokens + self.budget)
+        primary = self._submit(func, args)
+        if wait([primary], timeout=self.delay).done:
+            return primary.result()
+        if not self._spend():
+            HEDGES.labels(self.name, 'over_budget').inc()
+            return primary.result()
+
+        hedge = self._submit(func, args)
+        pending = {primary, hedge}
+        while pending:
+            done, pending = wait(pending, return_when=FIRST_COMPLETED)
+            for future in (primary, hedge):
+                if future in done and self._answered(future):
+                    HEDGES.labels(self.name, 'won' if future is hedge else 'lost').inc()
+                    return future.result()
+        # Neither answered: report the original call's error
+        HEDGES.labels(self.name, 'lost').inc()
+        return primary.result()
@@ -0,0 +1,102 @@
+"""Idempotency keys for POST /api/item
+
+A client that retries a create sends the same Idempotency-Key header.
+The first request claims the key by storing a pending record under
+idempotency/; when it succeeds the record keeps its response, and a
+retry gets that response back instead of uploading the files and
+writing the index again. A retry that arrives while the first request
+is still running gets 409 and can try again later. Failed requests
+release the key so a retry runs normally. Records keep a fingerprint of
+the request, and reusing a key for a different request gets 422.
+
+Records are kept IDEMPOTENCY_TTL_SECONDS (add an S3 lifecycle rule on the
+prefix to delete them). Keys are per user. Claiming is check-then-write,
+so two attempts sent at the same instant can both run; retries after a
+timeout, the case this is for, always see the first claim.
+
+Storage is passed in as get/put/delete callables, so the Flask backend
+and the Vercel function share this module with their own clients.
+"""
+import hashlib
+import json
+import os
+import time
+from datetime import datetime
+
+IDEMPOTENCY_PREFIX = 'idempotency/'
+IDEMPOTENCY_TTL_SECONDS = int(os.getenv('IDEMPOTENCY_TTL_SECONDS', str(24 * 3600)))
+# A request still pending after this long is taken to have died (uploads can be large)
+IDEMPOTENCY_PENDING_SECONDS = int(os.getenv('IDEMPOTENCY_PENDING_SECONDS', '3600'))
+MAX_KEY_LENGTH = 255
+
+def validate_key(key):
+    """Error message for an unusable key, or None"""
+    if len(key) > MAX_KEY_LENGTH or not key.isprintable() or not key.strip():
+        return f'Idempotency-Key must be 1-{MAX_KEY_LENGTH} printable characters'
+    return None
+
+def form_fingerprint(fields, files):
+    """Fingerprint a form post from its (name, value) fields and (name, filename, size) files"""
+    parts = [sorted(map(list, fields)), sorted(map(list, files))]
+    return hashlib.sha256(json.dumps(parts).encode('utf-8')).hexdigest()
+
+def body_fingerprint(body):
+    """Fingerprint a request from its raw body"""
+    return hashlib.sha256(body).hexdigest()
+
+def record_key(user_email, key):
+    digest = hashlib.sha256(f"{user_email.lower()}\n{key}".encode('utf-8')).hexdigest()
+    return f"{IDEMPOTENCY_PREFIX}{digest}.json"
+
+class IdempotencyStore:
+    """Claims keys and keeps responses in object storage"""
+
+    def __init__(self, get, put, delete, ttl=IDEMPOTENCY_TTL_SECONDS, pending=IDEMPOTENCY_PENDING_SECONDS):
+        self.get = get
+        self.put = put
+        self.delete = delete
+        self.ttl = ttl
+        self.pending = pending
+
+    def begin(self, user_email, key, fingerprint=None):
+        """Claim key for a request
+
+        Returns None when the request should run, or (status, body,
+        replayed) to send instead: the stored response of the first
+        request, a 409 while it is still running, or a 422 when the first
+        request had a different fingerprint.
+        """
+        path = record_key(user_email, key)
+        now = time.time()
+        record = self.get(path)
+        if record and record.get('expires_at', 0) > now:
+            if fingerprint and record.get('fingerprint') not in (None, fingerprint):
+                return 422, {'error': 'Idempotency-Key was already used for a different request'}, False
+            if record.get('state') == 'done':
+                return record['status'], record['body'], True
+            if now - record.get('started_at', 0) < self.pending:
+                return 409, {'error': 'A request with this Idempotency-Key is still in progress'}, False
+        self.put(path, {
+            'state': 'pending',
+            'fingerprint': fingerprint,
+            'started_at': now,
+            'expires_at': now + self.ttl,
+            'created_at': datetime.now().isoformat()
+        })
+        return None
+
+    def finish(self, user_email, key, status, body, fingerprint=None):
+        """Keep a successful response for retries; release the key otherwise"""
+        path = record_key(user_email, key)
+        if 200 <= status < 300:
+            now = time.time()
+            self.put(path, {
+                'state': 'done',
+                'fingerprint': fingerprint,
+                'status': status,
+                'body': body,
+                'expires_at': now + self.ttl,
+                'created_at': datetime.now().isoformat()
+            })
+        else:
+            self.delete(path)
@@ -0,0 +1,119 @@
+"""Binary snapshot of the index, written next to metadata/index.json
+
+Layout: a fixed header (magic, format version, length of the meta block),
+a msgpack meta block, then a msgpack columnar body. The meta block holds
+the item count, the index's other top-level fields and the ETag S3 gave
+the JSON body the snapshot was made from (and that body's MD5), so a
+reader can check that the snapshot matches the JSON before decoding the
+body.
+
+The body stores each field as one column. String columns with few
+distinct values (vertical, exam, status, ...) are dictionary-encoded as
+an integer array, so they are stored and decoded once per value rather
+than once per item. Items with the same keys share a "shape", and each
+item records its shape, so items come back with exactly their own keys.
+
+Readers return None for a newer format version, so older code falls
+back to the JSON until it is upgraded.
+"""
+import struct
+import sys
+from array import array
+import msgpack
+
+MAGIC = b'YTSN'
+VERSION = 1
+HEADER = struct.Struct('>4sHI')
+
+def _codes(values):
+    """Pick an unsigned array type that fits the values"""
+    return array('H' if len(values) < 1 << 16 else 'I', values)
+
+def _encode_column(values):
+    """Dictionary-encode string columns with repeated values, keep others as a list"""
+    if len(values) > 1 and all(v is None or type(v) is str for v in values):
+        table = list(dict.fromkeys(values))
+        if len(table) * 4 <= len(values):
+            index = {v: i for i, v in enumerate(table)}
+            codes = _codes([index[v] for v in values])
+            return {'table': table, 'type': codes.typecode, 'codes': codes.tobytes()}
+    return {'values': values}
+
+def _decode_column(column, byteorder):
+    if 'values' in column:
+        return column['values']
+    codes = array(column['type'])
+    codes.frombytes(column['codes'])
+    if byteorder != sys.byteorder:
+        codes.byteswap()
+    return list(map(column['table'].__getitem__, codes))
+
+def encode(index, source_md5=None, source_etag=None):
+    """Encode an index document"""
+    items = index.get('items', [])
+    shapes = {}
+    shape_ids = []
+    fields = {}
+    for item in items:
+        shape = tuple(item)
+        shape_ids.append(shapes.setdefault(shape, len(shapes)))
+        for field in shape:
+            fields.setdefault(field, [])
+        for field, value in item.items():
+            fields[field].append(value)
+
+    meta = {
+        'count': len(items),
+        'document': {k: v for k, v in index.items() if k != 'items'},
+        'source_md5': source_md5,
+        'source_etag': source_etag,
+    }
+    shape_codes = _codes(shape_ids)
+    body = {
+        'byteorder': sys.byteorder,
+        'shapes': [list(shape) for shape in shapes],
+        'shape_type': shape_codes.typecode,
+        'shape_ids': shape_codes.tobytes(),
+        'columns': {field: _encode_column(values) for field, values in fields.items()},
+    }
+    meta_bytes = msgpack.packb(meta, use_bin_type=True)
+    return HEADER.pack(MAGIC, VERSION, len(meta_bytes)) + meta_bytes + msgpack.packb(body, use_bin_type=True)
+
+def read_meta(data):
+    """Meta block of a snapshot, or None if data is not a snapshot this code can read"""
+    if len(data) < HEADER.size:
+        return None
+    magic, version, meta_length = HEADER.unpack_from(data)
+    if magic != MAGIC or version > VERSION:
+        return None
+    return msgpack.unpackb(data[HEADER.size:HEADER.size + meta_length], raw=False)
+
+def decode(data, meta=None):
+    """Decode a snapshot into an index document (None if unreadable)"""
+    meta = meta or read_meta(data)
+    if meta is None:
+        return None
+    _, _, meta_length = HEADER.unpack_from(data)
+    body = msgpack.unpackb(memoryview(data)[HEADER.size + meta_length:], raw=False)
+
+    byteorder = body['byteorder']
+    columns = {field: iter(_decode_column(column, byteorder)) for field, column in body['columns'].items()}
+    shapes = [(tuple(shape), [columns[field] for field in shape]) for shape in body['shapes']]
+
+    if len(shapes) == 1:
+        # Common case: every item has the same keys
+        keys, values = shapes[0]
+        items = [dict(zip(keys, row)) for row in zip(*values)] if keys else [{} for _ in range(meta['count'])]
+    else:
+        shape_ids = array(body['shape_type'])
+        shape_ids.frombytes(body['shape_ids'])
+        if byteorder != sys.byteorder:
+            shape_ids.byteswap()
+        items = []
+        for shape_id in shape_ids:
+            keys, values = shapes[shape_id]
+            items.append(dict(zip(keys, [next(v) for v in values])))
+
+    index = dict(meta['document'])
+    index['items'] = items
+    return index
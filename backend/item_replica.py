@@ -0,0 +1,294 @@
+"""Host-wide SQLite replica of the item index
+
+All worker processes on a host share one SQLite file (WAL mode) holding
+the index, with the filterable fields as indexed columns and the full
+item as JSON. Filters, sorting, created_at range scans and duplicate
+lookups run as indexed queries. Workers read the file through mmap, so
+the pages live once in the OS page cache however many workers there are,
+and no worker holds a Python copy of the items.
+
+The replica follows the index. refresh() revalidates it by ETag, and
+apply() replays a worker's own writes. Whichever worker sees a new index
+first reloads it in one transaction. The others find the new version in
+the meta table and only revalidate; readers keep the previous version
+until that transaction commits. Every load or replay bumps the
+generation counter in the meta table.
+
+Within a process one thread refreshes at a time. Readers arriving while
+it runs use the version already loaded (stale-while-revalidate) instead
+of each fetching the index again.
+"""
+import hashlib
+import json
+import os
+import sqlite3
+import tempfile
+import threading
+from storage import (
+    LOCAL_STORAGE_DIR, S3_BUCKET_NAME, S3_ENDPOINT, STORAGE_BACKEND, SingleFlight, get_index_if_changed
+)
+from stats import DIMENSIONS
+
+ITEM_REPLICA_DIR = os.getenv('ITEM_REPLICA_DIR', os.path.join(tempfile.gettempdir(), 'ytsprint-replica'))
+# Bytes of the file each worker maps instead of reading through its own cache
+ITEM_REPLICA_MMAP_BYTES = int(os.getenv('ITEM_REPLICA_MMAP_BYTES', str(1 << 30)))
+
+# Bump when the table layout changes; older files are rebuilt
+SCHEMA_VERSION = '1'
+
+# Item fields kept as columns (everything is also in the JSON document)
+COLUMNS = ('id', 'youtube_id', 'vertical', 'exam', 'subject', 'status', 'contentType', 'contentSubcategory',
+           'category', 'subcategory', 'created_by', 'created_at')
+INDEXED = ('id', 'youtube_id', 'vertical', 'exam', 'subject', 'status', 'contentType', 'created_by', 'created_at')
+
+# Stats dimensions as SQL expressions
+_DIMENSION_SQL = {dim: 'substr(created_at, 1, 10)' if dim == 'day' else dim for dim in DIMENSIONS}
+
+_TABLE = f"CREATE TABLE items (row INTEGER PRIMARY KEY, {', '.join(f'{c} TEXT NOT NULL' for c in COLUMNS)}, doc TEXT NOT NULL)"
+_INDEXES = [f"CREATE INDEX items_{c} ON items ({c})" for c in INDEXED]
+_INSERT = f"INSERT INTO items ({', '.join(COLUMNS)}, doc) VALUES ({', '.join('?' * (len(COLUMNS) + 1))})"
+
+# Bound parameters per IN (...) lookup
+_LOOKUP_CHUNK = 500
+
+_refreshes = SingleFlight('replica-refresh')
+
+def _columns(item):
+    return [str(item.get(c) or '') for c in COLUMNS] + [json.dumps(item, separators=(',', ':'))]
+
+def _where(filters, created_from='', created_to=''):
+    """SQL WHERE clause and parameters; falsy filter values are ignored"""
+    clauses, params = [], []
+    for field, value in filters.items():
+        if not value:
+            continue
+        if field in _DIMENSION_SQL or field in COLUMNS:
+            clauses.append(f"{_DIMENSION_SQL.get(field, field)} = ?")
+        else:
+            # Fields outside the columns are matched in the document
+            clauses.append("json_extract(doc, ?) = ?")
+            params.append(f'$."{field}"')
+        params.append(value)
+    if created_from:
+        clauses.append("created_at >= ?")
+        params.append(created_from)
+    if created_to:
+        clauses.append("created_at < ?")
+        params.append(created_to)
+    return (' WHERE ' + ' AND '.join(clauses)) if clauses else '', params
+
+class ItemReplica:
+    """SQLite copy of the index shared by the processes on this host"""
+
+    def __init__(self, path=None):
+        self.path = path or os.path.join(ITEM_REPLICA_DIR, f"items-{_source_id()}.sqlite3")
+        self.pid = os.getpid()
+        self.local = threading.local()
+        os.makedirs(os.path.dirname(self.path), exist_ok=True)
+
+        def statements(db):
+            db.execute("CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT)")
+            if self._meta(db).get('schema') != SCHEMA_VERSION:
+                self._load(db, {'items': []}, None)
+                db.execute("INSERT OR REPLACE INTO meta VALUES ('schema', ?)", (SCHEMA_VERSION,))
+        self._write(statements)
+
+    def connect(self):
+        """This thread's connection"""
+        db = getattr(self.local, 'db', None)
+        if db is None:
+            db = sqlite3.connect(self.path, timeout=60, isolation_level=None, check_same_thread=False)
+            db.execute('PRAGMA journal_mode=WAL')
+            # A throwaway copy: durability is the index's job
+            db.execute('PRAGMA synchronous=OFF')
+            db.execute(f'PRAGMA mmap_size={ITEM_REPLICA_MMAP_BYTES}')
+            self.local.db = db
+        return db
+
+    def remove(self):
+        for suffix in ('', '-wal', '-shm'):
+            try:
+                os.remove(self.path + suffix)
+            except FileNotFoundError:
+                pass
+
+    def _write(self, statements):
+        """Run statements(db) in a write transaction (one writer per host at a time)"""
+        db = self.connect()
+        db.execute('BEGIN IMMEDIATE')
+        try:
+            result = statements(db)
+            db.execute('COMMIT')
+        except Exception:
+            db.execute('ROLLBACK')
+            raise
+        return result
+
+    def _meta(self, db=None):
+        return dict((db or self.connect()).execute("SELECT key, value FROM meta"))
+
+    def _set_version(self, db, etag, updated_at, bump=True):
+        meta = self._meta(db)
+        values = {'etag': etag, 'updated_at': updated_at}
+        if bump:
+            values['generation'] = str(int(meta.get('generation') or 0) + 1)
+        db.executemany("INSERT OR REPLACE INTO meta VALUES (?, ?)", values.items())
+
+    def _load(self, db, index, etag):
+        """Replace the contents with an index document
+
+        The table is recreated and indexed after the insert, which is
+        several times faster than maintaining the indexes row by row.
+        """
+        db.execute('DROP TABLE IF EXISTS items')
+        db.execute(_TABLE)
+        db.executemany(_INSERT, (_columns(item) for item in index.get('items', [])))
+        for statement in _INDEXES:
+            db.execute(statement)
+        self._set_version(db, etag, index.get('updated_at'))
+
+    def load(self, index, etag=None):
+        self._write(lambda db: self._load(db, index, etag))
+
+    @property
+    def generation(self):
+        """Counter bumped by every load or replayed write"""
+        return int(self._meta().get('generation') or 0)
+
+    @property
+    def updated_at(self):
+        return self._meta().get('updated_at')
+
+    def refresh(self, wait=True):
+        """Bring the replica up to date with the stored index
+
+        Concurrent calls share one refresh. With wait=False a caller finds
+        a refresh already running returns at once, keeping the version
+        loaded before it (unless nothing has been loaded yet).
+        """
+        if not wait and _refreshes.running(self.path) and self.updated_at:
+            return self
+        _refreshes.do(self.path, self._refresh)
+        return self
+
+    def _refresh(self):
+        known = self._meta()
+        index, etag = get_index_if_changed(known.get('etag'))
+        if index is None and (etag is not None or known.get('etag') is None):
+            return
+
+        def statements(db):
+            # Another worker may have loaded this version while we fetched it
+            meta = self._meta(db)
+            if index is None:
+                if meta.get('etag') is not None:
+                    self._load(db, {'items': []}, None)
+            elif index.get('updated_at') and index.get('updated_at') == meta.get('updated_at'):
+                self._set_version(db, etag, meta.get('updated_at'), bump=False)
+            else:
+                self._load(db, index, etag)
+        self._write(statements)
+
+    def apply(self, before, after, removed=(), added=()):
+        """Replay a write made to the index
+
+        before and after are the index's updated_at around the write. The
+        change is only applied when the replica held the `before` version;
+        otherwise the next refresh reloads.
+        """
+        added_ids = {item.get('id') for item in added}
+
+        def statements(db):
+            meta = self._meta(db)
+            if not before or before != meta.get('updated_at'):
+                return False
+            for item in removed:
+                if item.get('id') not in added_ids:
+                    db.execute('DELETE FROM items WHERE id = ?', (str(item.get('id') or ''),))
+            for item in added:
+                values = _columns(item)
+                cursor = db.execute(f"UPDATE items SET {', '.join(f'{c} = ?' for c in COLUMNS)}, doc = ? WHERE id = ?",
+                                    values + [values[0]])
+                if not cursor.rowcount:
+                    db.execute(_INSERT, values)
+            self._set_version(db, meta.get('etag'), after)
+            return True
+        return self._write(statements)
+
+    def find_many(self, field, values):
+        """Get {value: first item} for the values present (field must be a column)"""
+        if field not in COLUMNS:
+            raise ValueError(f"Not a replica column: {field}")
+        values = list(dict.fromkeys(v for v in values if v))
+        found = {}
+        db = self.connect()
+        for i in range(0, len(values), _LOOKUP_CHUNK):
+            chunk = values[i:i + _LOOKUP_CHUNK]
+            rows = db.execute(f"SELECT {field}, doc FROM items WHERE {field} IN ({', '.join('?' * len(chunk))}) "
+                              f"ORDER BY row", chunk)
+            for value, doc in rows:
+                if value not in found:
+                    found[value] = json.loads(doc)
+        return found
+
+    def select(self, filters=None, sort=None, descending=False, created_from='', created_to='', limit=None, offset=0):
+        """Items matching every filter, in index order unless sorted by a column"""
+        where, params = _where(filters or {}, created_from, created_to)
+        order = f"{sort} {'DESC' if descending else 'ASC'}, row" if sort in COLUMNS else 'row'
+        sql = f"SELECT doc FROM items{where} ORDER BY {order}"
+        if limit is not None:
+            sql += ' LIMIT ? OFFSET ?'
+            params += [int(limit), int(offset)]
+        return [json.loads(doc) for (doc,) in self.connect().execute(sql, params)]
+
+    def count(self, filters=None, created_from='', created_to=''):
+        where, params = _where(filters or {}, created_from, created_to)
+        return self.connect().execute(f"SELECT COUNT(*) FROM items{where}", params).fetchone()[0]
+
+    def summarize(self, group_by=None, filters=None):
+        """Counts in the shape of stats.summarize, computed from the items"""
+        group_by = [dim for dim in (group_by or []) if dim in DIMENSIONS]
+        filters = {dim: value for dim, value in (filters or {}).items() if dim in DIMENSIONS and value}
+        where, params = _where(filters)
+        db = self.connect()
+
+        # One read transaction, so every count sees the same version
+        db.execute('BEGIN')
+        try:
+            by = {}
+            for dim in DIMENSIONS:
+                expr = _DIMENSION_SQL[dim]
+                by[dim] = dict(db.execute(f"SELECT {expr}, COUNT(*) FROM items{where} GROUP BY {expr}", params))
+            result = {'total': self.count(filters), 'by': by, 'updated_at': self.updated_at}
+
+            if group_by:
+                exprs = ', '.join(_DIMENSION_SQL[dim] for dim in group_by)
+                rows = db.execute(f"SELECT {exprs}, COUNT(*) AS n FROM items{where} GROUP BY {exprs} "
+                                  f"ORDER BY n DESC, {exprs}", params)
+                result['groups'] = [{**dict(zip(group_by, row[:-1])), 'count': row[-1]} for row in rows]
+        finally:
+            db.execute('COMMIT')
+        return result
+
+def _source_id():
+    """Short id of the configured storage, so different buckets never share a file"""
+    source = f"{STORAGE_BACKEND}:{S3_ENDPOINT}:{S3_BUCKET_NAME}"
+    if STORAGE_BACKEND == 'local':
+        source += f":{os.path.abspath(LOCAL_STORAGE_DIR)}"
+    return hashlib.sha1(source.encode()).hexdigest()[:12]
+
+_replica = None
+_replica_lock = threading.Lock()
+
+def get_replica(refresh=True):
+    """The host's replica, refreshed against the stored index unless refresh is False
+
+    Requests don't queue behind a refresh another thread is running; they
+    read the version it is replacing.
+    """
+    global _replica
+    with _replica_lock:
+        if _replica is None or _replica.pid != os.getpid():
+            _replica = ItemReplica()
+        replica = _replica
+    return replica.refresh(wait=False) if refresh else replica
@@ -0,0 +1,190 @@
+"""Column-wise in-memory store for index items
+
+Items are held one column per field instead of one dict per item.
+Categorical fields are dictionary-encoded into integer arrays and
+per-item strings (ids, links, timestamps) are kept in plain lists, so
+dicts only exist for the rows a request returns.
+
+The backend queries its SQLite replica (item_replica.py). The api/*.py
+functions have no local database and keep the index in an ItemStore
+between invocations of a warm instance (CachedItemStore).
+"""
+import sys
+import threading
+from array import array
+
+try:
+    from master_data import get_code_tables, get_content_subcategories
+except ImportError:
+    # Imported as backend.item_store by the api/*.py functions
+    from backend.master_data import get_code_tables, get_content_subcategories
+
+# Fields with a small closed set of values, stored as integer codes
+CATEGORICAL_FIELDS = ('vertical', 'exam', 'subject', 'status', 'contentType', 'contentSubcategory', 'email', 'created_by')
+
+# Other known fields, mostly unique per item, stored as plain lists
+STRING_FIELDS = ('id', 'verificationLink', 'youtube_id', 'videoFile', 'driveLink', 'created_at', 'updated_at')
+
+# Output order when a row is materialised (matches create_item)
+FIELDS = ('id', 'email', 'verificationLink', 'youtube_id', 'contentType', 'vertical', 'exam', 'subject',
+          'status', 'contentSubcategory', 'files', 'videoFile', 'driveLink', 'created_by', 'created_at', 'updated_at')
+
+# Placeholder for fields an item does not have
+MISSING = object()
+
+_NO_FILES = ()
+
+def _intern(value):
+    return sys.intern(value) if type(value) is str else value
+
+class Dictionary:
+    """Maps each distinct value of a column to a small integer code"""
+
+    def __init__(self, seed=()):
+        self.values = [MISSING]
+        self.codes = {}
+        for value in seed:
+            self.encode(value)
+
+    def encode(self, value):
+        """Get the code for a value, adding it if unseen"""
+        code = self.codes.get(value)
+        if code is None:
+            code = len(self.values)
+            value = _intern(value)
+            self.values.append(value)
+            self.codes[value] = code
+        return code
+
+    def lookup(self, value):
+        """Get the code for a value, or None if no row has it"""
+        return self.codes.get(value)
+
+def _seeds():
+    """Seed dictionaries from master data so codes are stable across stores
+
+    Vertical, exam and subject codes are the master data codes plus one
+    (code 0 means the field is missing).
+    """
+    verticals, exams, subjects = get_code_tables()
+    return {
+        'vertical': verticals,
+        'exam': exams,
+        'subject': subjects,
+        'status': ['Draft', 'Pending', 'Final', 'Published', 'Re-edit'],
+        'contentType': ['Content', 'Exam_Information', 'Motivational_or_Fun'],
+        'contentSubcategory': ['', *get_content_subcategories()],
+    }
+
+class ItemStore:
+    """Columnar store of index items"""
+
+    def __init__(self):
+        seeds = _seeds()
+        self.dictionaries = {field: Dictionary(seeds.get(field, ())) for field in CATEGORICAL_FIELDS}
+        self.columns = {field: array('I') for field in CATEGORICAL_FIELDS}
+        for field in STRING_FIELDS:
+            self.columns[field] = []
+        self.columns['files'] = []
+        # row -> dict of fields outside the known schema (legacy items)
+        self.extras = {}
+        self.size = 0
+
+    @classmethod
+    def from_items(cls, items):
+        """Build a store from a list of item dicts"""
+        store = cls()
+        for item in items:
+            store.append(item)
+        return store
+
+    def __len__(self):
+        return self.size
+
+    def append(self, item):
+        """Add an item and return its row number"""
+        row = self.size
+        for field in CATEGORICAL_FIELDS:
+            value = item.get(field, MISSING)
+            code = 0 if value is MISSING else self.dictionaries[field].encode(value)
+            self.columns[field].append(code)
+        for field in STRING_FIELDS:
+            self.columns[field].append(item.get(field, MISSING))
+        files = item.get('files', MISSING)
+        if isinstance(files, list):
+            files = tuple(_intern(f) for f in files) if files else _NO_FILES
+        self.columns['files'].append(files)
+
+        extra = {k: v for k, v in item.items() if k not in self.columns}
+        if extra:
+            self.extras[row] = extra
+        self.size += 1
+        return row
+
+    def value(self, field, row):
+        """Get a single field of a row (MISSING if absent)"""
+        if field in self.dictionaries:
+            return self.dictionaries[field].values[self.columns[field][row]]
+        if field in self.columns:
+            return self.columns[field][row]
+        return self.extras.get(row, {}).get(field, MISSING)
+
+    def row(self, row):
+        """Materialise one row as an item dict"""
+        item = {}
+        for field in FIELDS:
+            value = self.value(field, row)
+            if value is MISSING:
+                continue
+            item[field] = list(value) if field == 'files' and isinstance(value, tuple) else value
+        item.update(self.extras.get(row, {}))
+        return item
+
+    def rows(self, indexes=None):
+        """Materialise rows (all rows if indexes is None)"""
+        if indexes is None:
+            indexes = range(self.size)
+        return [self.row(i) for i in indexes]
+
+    def select(self, **filters):
+        """Get row numbers where every field equals the given value
+
+        Falsy filter values are ignored, matching the API's optional filters.
+        """
+        rows = range(self.size)
+        for field, value in filters.items():
+            if not value:
+                continue
+            if field in self.dictionaries:
+                code = self.dictionaries[field].lookup(value)
+                if code is None:
+                    return []
+                column = self.columns[field]
+                rows = [i for i in rows if column[i] == code]
+            else:
+                rows = [i for i in rows if self.value(field, i) == value]
+        return list(rows)
+
+class CachedItemStore:
+    """An ItemStore of the index, rebuilt only when the index changes
+
+    fetch(etag) must return (index, etag) like get_s3_object_if_changed:
+    index is None when unchanged, unreadable, or missing (etag None).
+    """
+
+    def __init__(self, fetch):
+        self.fetch = fetch
+        self.etag = None
+        self.store = ItemStore()
+        self._lock = threading.Lock()
+
+    def get(self):
+        """Revalidate with the ETag and return the current store"""
+        with self._lock:
+            index, etag = self.fetch(self.etag)
+            if index is not None:
+                self.store = ItemStore.from_items(index.get('items', []))
+                self.etag = etag
+            elif etag is None:
+                self.store, self.etag = ItemStore(), None
+            return self.store
@@ -0,0 +1,57 @@
+"""Where item objects live in the bucket
+
+KEY_LAYOUT=flat (the default) keeps every item at
+metadata/items/<id>.json. KEY_LAYOUT=hashed spreads them over hash
+partitions, metadata/items/<pp>/<id>.json, where pp is the first
+KEY_HASH_CHARS hex characters of the id's MD5. S3 scales request rates
+per prefix and answers a burst on one with SlowDown; the partitions give
+it 16**KEY_HASH_CHARS prefixes to split a bulk import over.
+
+Changing the layout of a bucket that already has items:
+
+1. Deploy with the new KEY_LAYOUT. While KEY_LAYOUT_PREVIOUS names the
+   old one (flat, by default, once KEY_LAYOUT is hashed) an item missing
+   at its new key is read from its old key, and writes delete the old
+   copy.
+2. Run migrate_keys.py to move the rest.
+3. Set KEY_LAYOUT_PREVIOUS=none to stop looking at old keys.
+
+Uploaded files are content-addressed (files/sha256/<hash>), so their keys
+already start with a hash and are the same in both layouts.
+
+Only the standard library is used, so the api/*.py functions share it.
+"""
+import hashlib
+import os
+
+LAYOUTS = ('flat', 'hashed')
+ITEMS_PREFIX = 'metadata/items/'
+
+KEY_LAYOUT = os.getenv('KEY_LAYOUT', 'flat').lower()
+KEY_HASH_CHARS = int(os.getenv('KEY_HASH_CHARS', '2'))
+KEY_LAYOUT_PREVIOUS = os.getenv('KEY_LAYOUT_PREVIOUS', 'none' if KEY_LAYOUT == 'flat' else 'flat').lower()
+
+for _layout in (KEY_LAYOUT, KEY_LAYOUT_PREVIOUS):
+    if _layout not in LAYOUTS + ('none',):
+        raise ValueError(f"Unknown key layout: {_layout} (expected {', '.join(LAYOUTS)})")
+
+def partition(item_id):
+    return hashlib.md5(item_id.encode('utf-8')).hexdigest()[:KEY_HASH_CHARS]
+
+def item_key(item_id, layout=None):
+    """Key of an item object in layout (default KEY_LAYOUT)"""
+    if (layout or KEY_LAYOUT) == 'hashed':
+        return f"{ITEMS_PREFIX}{partition(item_id)}/{item_id}.json"
+    return f"{ITEMS_PREFIX}{item_id}.json"
+
+def previous_item_key(item_id):
+    """Key the item may still have in the layout being migrated from, or None"""
+    if KEY_LAYOUT_PREVIOUS in ('none', KEY_LAYOUT):
+        return None
+    return item_key(item_id, KEY_LAYOUT_PREVIOUS)
+
+def item_id_of(key):
+    """Id of the item stored at key, in any layout, or None for other keys"""
+    if not key.startswith(ITEMS_PREFIX) or not key.endswith('.json'):
+        return None
+    return key[len(ITEMS_PREFIX):-len('.json')].rsplit('/', 1)[-1]
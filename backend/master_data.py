@@ -1,4 +1,8 @@
 """Master data for verticals, exams, and subjects"""
+import threading
+import time
+from datetime import datetime
+from types import MappingProxyType
 
 MASTER_DATA = {
     "Bank Pre": {
@@ -90,41 +94,267 @@ MASTER_DATA = {
     }
 }
 
+# Content sub-categories for when Content Type is "Content"
+CONTENT_SUBCATEGORIES = [
+    "Conceptual Insights",
+    "Tips & Tricks / Shortcuts",
+    "PYQs / Practice Questions",
+    "Science / GK Facts"
+]
+
+# Compiled lookups
+#
+# MASTER_DATA is compiled once at import into frozen structures so request
+# handlers never scan or sort lists. Integer codes follow first appearance
+# in MASTER_DATA, so they stay stable as long as new verticals, exams and
+# subjects are appended rather than inserted.
+#
+# A newer version published to storage (MASTER_DATA_KEY) replaces the
+# compiled snapshot in one assignment; the built-in dict is the fallback,
+# and is installed again if the stored copy is deleted.
+
+MASTER_DATA_KEY = "config/master_data.json"
+
+def _unique(values):
+    return tuple(dict.fromkeys(values))
+
+def _validate(master_data, content_subcategories):
+    if not isinstance(master_data, dict) or not master_data:
+        raise ValueError("master_data must be a non-empty object of verticals")
+    for vertical, data in master_data.items():
+        if not isinstance(data, dict):
+            raise ValueError(f"{vertical}: expected an object with exams and subjects")
+        for field in ("exams", "subjects"):
+            values = data.get(field, [])
+            if not isinstance(values, list) or not all(isinstance(v, str) and v.strip() for v in values):
+                raise ValueError(f"{vertical}: {field} must be a list of names")
+    if not isinstance(content_subcategories, list) or not all(isinstance(c, str) for c in content_subcategories):
+        raise ValueError("content_subcategories must be a list of names")
+
+def _compile(master_data, content_subcategories=CONTENT_SUBCATEGORIES, version=0):
+    _validate(master_data, content_subcategories)
+    verticals = tuple(master_data)
+    exams_by_vertical = {v: tuple(d.get("exams", [])) for v, d in master_data.items()}
+    subjects_by_vertical = {v: tuple(d.get("subjects", [])) for v, d in master_data.items()}
+    exams = _unique(e for v in verticals for e in exams_by_vertical[v])
+    subjects = _unique(s for v in verticals for s in subjects_by_vertical[v])
+    return {
+        "verticals": verticals,
+        "exams": exams,
+        "subjects": subjects,
+        "vertical_codes": MappingProxyType({v: i for i, v in enumerate(verticals)}),
+        "exam_codes": MappingProxyType({e: i for i, e in enumerate(exams)}),
+        "subject_codes": MappingProxyType({s: i for i, s in enumerate(subjects)}),
+        "exams_by_vertical": MappingProxyType(exams_by_vertical),
+        "subjects_by_vertical": MappingProxyType(subjects_by_vertical),
+        "exam_sets": MappingProxyType({v: frozenset(e) for v, e in exams_by_vertical.items()}),
+        "subject_sets": MappingProxyType({v: frozenset(s) for v, s in subjects_by_vertical.items()}),
+        # Lower-cased, whitespace-collapsed spelling -> canonical spelling
+        "vertical_names": MappingProxyType({_fold(v): v for v in verticals}),
+        "exam_names": MappingProxyType({
+            v: MappingProxyType({_fold(e): e for e in exams_by_vertical[v]}) for v in verticals
+        }),
+        "subject_names": MappingProxyType({
+            v: MappingProxyType({_fold(s): s for s in subjects_by_vertical[v]}) for v in verticals
+        }),
+        "all_exams": tuple(e for v in verticals for e in exams_by_vertical[v]),
+        "all_subjects": tuple(sorted(subjects)),
+        "content_subcategories": tuple(content_subcategories),
+        "version": version,
+    }
+
+def _fold(name):
+    return " ".join(str(name).split()).lower()
+
+_compiled = _compile(MASTER_DATA)
+
 def get_all_verticals():
     """Get list of all verticals"""
-    return list(MASTER_DATA.keys())
+    return _compiled["verticals"]
 
 def get_exams_by_vertical(vertical):
     """Get exams for a specific vertical"""
-    return MASTER_DATA.get(vertical, {}).get("exams", [])
+    return _compiled["exams_by_vertical"].get(vertical, ())
 
 def get_subjects_by_vertical(vertical):
     """Get subjects for a specific vertical"""
-    return MASTER_DATA.get(vertical, {}).get("subjects", [])
+    return _compiled["subjects_by_vertical"].get(vertical, ())
 
 def get_all_exams():
     """Get all exams across verticals"""
-    all_exams = []
-    for data in MASTER_DATA.values():
-        all_exams.extend(data.get("exams", []))
-    return all_exams
+    return _compiled["all_exams"]
 
 def get_all_subjects():
     """Get all unique subjects"""
-    all_subjects = set()
-    for data in MASTER_DATA.values():
-        all_subjects.update(data.get("subjects", []))
-    return sorted(list(all_subjects))
-
-# Content sub-categories for when Content Type is "Content"
-CONTENT_SUBCATEGORIES = [
-    "Conceptual Insights",
-    "Tips & Tricks / Shortcuts",
-    "PYQs / Practice Questions",
-    "Science / GK Facts"
-]
+    return _compiled["all_subjects"]
 
 def get_content_subcategories():
     """Get content sub-categories"""
-    return CONTENT_SUBCATEGORIES
+    return _compiled["content_subcategories"]
+
+def get_version():
+    """Get the version of the master data in use (0 is the built-in dict)"""
+    return _compiled["version"]
+
+def get_code_tables():
+    """Get (verticals, exams, subjects) ordered by integer code"""
+    return _compiled["verticals"], _compiled["exams"], _compiled["subjects"]
+
+def vertical_code(vertical):
+    """Get the integer code of a vertical, or None"""
+    return _compiled["vertical_codes"].get(vertical)
+
+def exam_code(exam):
+    """Get the integer code of an exam, or None"""
+    return _compiled["exam_codes"].get(exam)
+
+def subject_code(subject):
+    """Get the integer code of a subject, or None"""
+    return _compiled["subject_codes"].get(subject)
+
+def is_valid_exam(vertical, exam):
+    """Check an exam belongs to a vertical"""
+    return exam in _compiled["exam_sets"].get(vertical, ())
+
+def is_valid_subject(vertical, subject):
+    """Check a subject belongs to a vertical"""
+    return subject in _compiled["subject_sets"].get(vertical, ())
+
+def normalize_vertical(vertical):
+    """Get the canonical spelling of a vertical, or None if unknown"""
+    return _compiled["vertical_names"].get(_fold(vertical))
+
+def normalize_selection(vertical, exam, subject=""):
+    """Validate a vertical/exam/subject choice and return canonical spellings
+
+    Matching ignores case and extra whitespace. An empty subject is allowed.
+    Raises ValueError naming the first field that does not match.
+    """
+    canonical_vertical = normalize_vertical(vertical)
+    if canonical_vertical is None:
+        raise ValueError(f"Unknown vertical: {vertical}")
+    canonical_exam = _compiled["exam_names"][canonical_vertical].get(_fold(exam))
+    if canonical_exam is None:
+        raise ValueError(f"Exam '{exam}' is not part of {canonical_vertical}")
+    canonical_subject = ""
+    if subject:
+        canonical_subject = _compiled["subject_names"][canonical_vertical].get(_fold(subject))
+        if canonical_subject is None:
+            raise ValueError(f"Subject '{subject}' is not part of {canonical_vertical}")
+    return canonical_vertical, canonical_exam, canonical_subject
+
+# Versioned master data in storage
+
+def build_document(master_data, content_subcategories, version, published_by=""):
+    """Build a storable master data document, raising ValueError if invalid"""
+    _compile(master_data, content_subcategories, version)
+    return {
+        "version": version,
+        "master_data": master_data,
+        "content_subcategories": content_subcategories,
+        "published_by": published_by,
+        "published_at": datetime.now().isoformat()
+    }
+
+def current_document():
+    """Get the master data in use as a storable document"""
+    return {
+        "version": _compiled["version"],
+        "master_data": {
+            v: {"exams": list(_compiled["exams_by_vertical"][v]), "subjects": list(_compiled["subjects_by_vertical"][v])}
+            for v in _compiled["verticals"]
+        },
+        "content_subcategories": list(_compiled["content_subcategories"])
+    }
+
+def install_document(document):
+    """Switch to the master data in a stored document
+
+    Raises ValueError (and keeps the current data) if the document is invalid.
+    """
+    global _compiled
+    if not isinstance(document, dict):
+        raise ValueError("master data document must be an object")
+    _compiled = _compile(
+        document.get("master_data"),
+        document.get("content_subcategories", CONTENT_SUBCATEGORIES),
+        document.get("version", 0)
+    )
+
+class MasterDataReloader:
+    """Keeps master data in sync with the copy in storage
+
+    fetch(etag) must return (document, etag) like get_s3_object_if_changed:
+    document is None when unchanged, unreadable, or missing (etag None).
+    Lookups never wait on it; they always read the last installed snapshot.
+    Long-running servers call start() once per process. Short-lived ones
+    (the api/*.py functions) refresh() while loading and call
+    refresh_in_background() on each request, which never waits on it.
+    """
+
+    def __init__(self, fetch, interval=60):
+        self.fetch = fetch
+        self.interval = interval
+        self.etag = None
+        self.checked_at = None
+        self._refreshing = None
+        self._stop = threading.Event()
+        self._thread = None
+
+    def refresh(self):
+        """Revalidate once; returns True if different master data was installed"""
+        self.checked_at = time.monotonic()
+        try:
+            document, etag = self.fetch(self.etag)
+        except Exception as e:
+            print(f"Master data refresh error: {e}")
+            return False
+        if document is None:
+            if etag is None and self.etag is not None:
+                # The stored copy was deleted: go back to the built-in dict
+                install_document({"master_data": MASTER_DATA, "version": 0})
+                self.etag = None
+                return True
+            return False
+        try:
+            install_document(document)
+        except ValueError as e:
+            print(f"Ignoring invalid master data: {e}")
+            return False
+        self.etag = etag
+        return True
+
+    def refresh_in_background(self):
+        """Revalidate in a one-off thread if the last check is over interval seconds old
+
+        Returns at once; the caller keeps the installed snapshot. With
+        interval 0 nothing is fetched after the first check.
+        """
+        if self.checked_at is not None and (self.interval <= 0 or time.monotonic() - self.checked_at < self.interval):
+            return None
+        if self._refreshing is not None and self._refreshing.is_alive():
+            return None
+        # Counts as checked now, so concurrent requests don't start another
+        self.checked_at = time.monotonic()
+        self._refreshing = threading.Thread(target=self.refresh, name="master-data-refresh", daemon=True)
+        self._refreshing.start()
+        return self._refreshing
+
+    def start(self):
+        """Refresh in a background thread every interval seconds
+
+        Nothing is fetched until the first interval has passed, so call
+        refresh() first to load now.
+        """
+        # A forked child inherits the thread object but not the thread
+        if self.interval > 0 and (self._thread is None or not self._thread.is_alive()):
+            self._thread = threading.Thread(target=self._run, name="master-data-reloader", daemon=True)
+            self._thread.start()
+        return self
+
+    def stop(self):
+        self._stop.set()
 
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            self.refresh()
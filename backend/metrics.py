@@ -0,0 +1,113 @@
+"""Prometheus metrics and per-request Server-Timing
+
+Process-wide timings go to Prometheus histograms. Under gunicorn set
+PROMETHEUS_MULTIPROC_DIR (gunicorn.conf.py does) so every worker writes
+to shared files and /metrics aggregates them. The same timings are also
+collected per request and sent back as a Server-Timing header.
+"""
+import os
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from prometheus_client import (
+    CONTENT_TYPE_LATEST, CollectorRegistry, Counter, Gauge, Histogram, REGISTRY, generate_latest, multiprocess
+)
+
+# Seconds; S3 round trips are tens of ms, index loads can take seconds
+BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30)
+
+REQUEST_SECONDS = Histogram(
+    'ytsprint_request_seconds', 'Request latency by route',
+    ['method', 'route', 'status'], buckets=BUCKETS
+)
+S3_SECONDS = Histogram(
+    'ytsprint_s3_seconds', 'Storage call latency',
+    ['operation', 'outcome'], buckets=BUCKETS
+)
+STAGE_SECONDS = Histogram(
+    'ytsprint_stage_seconds', 'Time spent in named stages (JSON parse, filtering, index load)',
+    ['stage'], buckets=BUCKETS
+)
+S3_BYTES = Counter('ytsprint_s3_bytes', 'Bytes moved to and from storage', ['direction'])
+COALESCED_CALLS = Counter('ytsprint_coalesced_calls', 'Calls that shared the result of an identical call in flight', ['flight'])
+HEDGES = Counter(
+    'ytsprint_s3_hedges', 'Hedged storage calls: won (the second copy answered first), lost, or over_budget (not sent)',
+    ['object', 'outcome']
+)
+FILE_UPLOADS = Counter(
+    'ytsprint_file_uploads', 'Files attached to items: stored (bytes uploaded), deduplicated (already stored) or referenced (by hash, no bytes sent)',
+    ['result']
+)
+INDEX_ITEMS = Gauge('ytsprint_index_items', 'Items in the last index read or written', multiprocess_mode='livemax')
+INDEX_BYTES = Gauge('ytsprint_index_bytes', 'Size of the last index read or written', multiprocess_mode='livemax')
+
+# Stage timings of the current request, None outside a request
+_request_timings = ContextVar('request_timings', default=None)
+
+def _record(name, seconds):
+    timings = _request_timings.get()
+    if timings is not None:
+        timings.append((name, seconds))
+
+def _outcome(error):
+    code = getattr(error, 'response', {}).get('Error', {}).get('Code')
+    if code in ('304', 'NotModified'):
+        return 'not_modified'
+    if code in ('NoSuchKey', '404'):
+        return 'missing'
+    return 'error'
+
+@contextmanager
+def timed_s3(operation):
+    """Time a storage call, labelled ok, not_modified, missing or error"""
+    start = time.perf_counter()
+    outcome = 'ok'
+    try:
+        yield
+    except Exception as e:
+        outcome = _outcome(e)
+        raise
+    finally:
+        seconds = time.perf_counter() - start
+        S3_SECONDS.labels(operation, outcome).observe(seconds)
+        _record(f"s3-{operation}", seconds)
+
+@contextmanager
+def timed_stage(stage):
+    """Time a named stage of request handling"""
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        seconds = time.perf_counter() - start
+        STAGE_SECONDS.labels(stage).observe(seconds)
+        _record(stage, seconds)
+
+def start_request():
+    """Start collecting Server-Timing entries for this request"""
+    return _request_timings.set([])
+
+def finish_request(token, method, route, status, seconds):
+    """Record the request and return its Server-Timing header value"""
+    REQUEST_SECONDS.labels(method, route, str(status)).observe(seconds)
+    timings = _request_timings.get() or []
+    _request_timings.reset(token)
+
+    # Repeated stages (several S3 GETs) are summed into one entry
+    totals = {}
+    for name, stage_seconds in timings:
+        count, total = totals.get(name, (0, 0.0))
+        totals[name] = (count + 1, total + stage_seconds)
+    entries = [f'{name};dur={total * 1000:.1f}' + (f';desc="x{count}"' if count > 1 else '')
+               for name, (count, total) in totals.items()]
+    entries.append(f'total;dur={seconds * 1000:.1f}')
+    return ', '.join(entries)
+
+def render():
+    """Metrics in Prometheus text format, aggregated across workers when multiprocess"""
+    if os.getenv('PROMETHEUS_MULTIPROC_DIR'):
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+    else:
+        registry = REGISTRY
+    return generate_latest(registry), CONTENT_TYPE_LATEST
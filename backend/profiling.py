@@ -0,0 +1,161 @@
+"""Opt-in request profiling
+
+A profiled request runs under cProfile. The slowest PROFILE_KEEP profiles
+are kept in memory (per process) and can be downloaded as pstats or as
+speedscope JSON (https://www.speedscope.app). Only one request is
+profiled at a time; requests arriving meanwhile run unprofiled.
+"""
+import os
+import io
+import cProfile
+import heapq
+import itertools
+import marshal
+import pstats
+import threading
+import time
+from datetime import datetime
+
+# Profile every request (otherwise only admin requests with the X-Profile header)
+PROFILE_REQUESTS = os.getenv('PROFILE_REQUESTS', '').lower() in ('1', 'true', 'yes')
+PROFILE_KEEP = int(os.getenv('PROFILE_KEEP', '20'))
+PROFILE_HEADER = 'X-Profile'
+
+_active = threading.Lock()
+_lock = threading.Lock()
+_ids = itertools.count(1)
+# Min-heap of (seconds, id, entry): the fastest kept profile is evicted first
+_profiles = []
+
+def start():
+    """Start profiling the current request, or return None if another one is being profiled"""
+    if not _active.acquire(blocking=False):
+        return None
+    profiler = cProfile.Profile()
+    try:
+        profiler.enable()
+    except Exception:
+        _active.release()
+        return None
+    return profiler, time.perf_counter()
+
+def abandon(handle):
+    """Stop profiling without keeping the profile (request failed before finish)"""
+    handle[0].disable()
+    _active.release()
+
+def finish(handle, method, route, path, status):
+    """Stop profiling and keep the profile if it is among the slowest"""
+    profiler, started = handle
+    profiler.disable()
+    _active.release()
+    seconds = time.perf_counter() - started
+
+    entry = {
+        'id': next(_ids),
+        'method': method,
+        'route': route,
+        'path': path,
+        'status': status,
+        'seconds': round(seconds, 6),
+        'recorded_at': datetime.now().isoformat(),
+        'stats': pstats.Stats(profiler).stats
+    }
+    with _lock:
+        if len(_profiles) < PROFILE_KEEP:
+            heapq.heappush(_profiles, (seconds, entry['id'], entry))
+        elif _profiles and seconds > _profiles[0][0]:
+            heapq.heapreplace(_profiles, (seconds, entry['id'], entry))
+
+def list_profiles():
+    """Kept profiles, slowest first, without their stats"""
+    with _lock:
+        entries = [entry for _, _, entry in sorted(_profiles, reverse=True)]
+    return [{k: v for k, v in entry.items() if k != 'stats'} for entry in entries]
+
+def get_profile(profile_id):
+    """Get a kept profile by id, or None"""
+    with _lock:
+        for _, _, entry in _profiles:
+            if entry['id'] == profile_id:
+                return entry
+    return None
+
+def clear():
+    """Drop all kept profiles"""
+    with _lock:
+        _profiles.clear()
+
+def to_pstats(entry):
+    """Profile as a .prof file (load with pstats.Stats or snakeviz)"""
+    return marshal.dumps(entry['stats'])
+
+def top_functions(entry, limit=25):
+    """Text report of the functions with the most cumulative time"""
+    out = io.StringIO()
+    stats = pstats.Stats(stream=out)
+    stats.stats = entry['stats']
+    stats.get_top_level_stats()
+    stats.sort_stats('cumulative').print_stats(limit)
+    return out.getvalue()
+
+def _frame_name(func):
+    filename, line, name = func
+    return name if filename == '~' else f"{name} ({os.path.basename(filename)}:{line})"
+
+def to_speedscope(entry, max_depth=64, max_samples=50000):
+    """Profile as speedscope JSON
+
+    cProfile keeps caller/callee totals rather than samples, so stacks are
+    rebuilt by walking the call graph from its roots and weighting each
+    stack by the self time the function spent when called from its parent.
+    Deep or very branchy graphs are cut at max_depth/max_samples.
+    """
+    stats = entry['stats']
+    callees = {}
+    for func, (cc, nc, tt, ct, callers) in stats.items():
+        for caller, edge in callers.items():
+            callees.setdefault(caller, []).append((func, edge))
+
+    frames = []
+    frame_index = {}
+    def frame(func):
+        if func not in frame_index:
+            frame_index[func] = len(frames)
+            filename, line, name = func
+            frames.append({'name': _frame_name(func), 'file': filename, 'line': line})
+        return frame_index[func]
+
+    samples = []
+    weights = []
+    def walk(func, stack, self_time, seen):
+        stack = stack + [frame(func)]
+        if self_time > 0:
+            samples.append(stack)
+            weights.append(self_time)
+        if len(stack) >= max_depth or len(samples) >= max_samples:
+            return
+        for callee, edge in callees.get(func, ()):
+            if callee in seen:
+                continue
+            walk(callee, stack, edge[2], seen | {callee})
+
+    for func, (cc, nc, tt, ct, callers) in stats.items():
+        if not callers:
+            walk(func, [], tt, {func})
+
+    return {
+        '$schema': 'https://www.speedscope.app/file-format-schema.json',
+        'name': f"{entry['method']} {entry['path']} ({entry['seconds'] * 1000:.0f} ms)",
+        'exporter': 'yt-sprint',
+        'shared': {'frames': frames},
+        'profiles': [{
+            'type': 'sampled',
+            'name': f"{entry['method']} {entry['route']}",
+            'unit': 'seconds',
+            'startValue': 0,
+            'endValue': sum(weights),
+            'samples': samples,
+            'weights': weights
+        }]
+    }
@@ -0,0 +1,118 @@
+"""Submission counters rolled up per vertical, exam, subject, status, content type, creator and day
+
+The rollup (STATS_KEY) is updated after every index write with the items
+it changed, and records the index version (`index_updated_at`) it counts.
+When that isn't the version the write started from (the first write, or
+one that raced another) the rollup is recounted from the written index,
+so it never drifts further than the index itself.
+"""
+from datetime import datetime
+
+STATS_KEY = 'metadata/stats.json'
+
+# Order matters: cell keys are the dimension values joined in this order
+DIMENSIONS = ('vertical', 'exam', 'subject', 'status', 'contentType', 'created_by', 'day')
+
+CELL_SEPARATOR = '\t'
+
+def empty_stats():
+    """Return a rollup with no submissions counted"""
+    return {
+        'total': 0,
+        'by': {dim: {} for dim in DIMENSIONS},
+        'cells': {},
+        'updated_at': datetime.now().isoformat()
+    }
+
+def item_dimensions(item):
+    """Get the dimension values an item is counted under"""
+    values = []
+    for dim in DIMENSIONS:
+        if dim == 'day':
+            value = (item.get('created_at') or '')[:10]
+        else:
+            value = item.get(dim) or ''
+        values.append(str(value))
+    return tuple(values)
+
+def _bump(counts, key, delta):
+    count = counts.get(key, 0) + delta
+    if count > 0:
+        counts[key] = count
+    else:
+        counts.pop(key, None)
+
+def apply_item(stats, item, delta):
+    """Add (delta=1) or remove (delta=-1) an item from the rollup in place"""
+    values = item_dimensions(item)
+    stats['total'] = max(stats.get('total', 0) + delta, 0)
+    by = stats.setdefault('by', {})
+    for dim, value in zip(DIMENSIONS, values):
+        _bump(by.setdefault(dim, {}), value, delta)
+    _bump(stats.setdefault('cells', {}), CELL_SEPARATOR.join(values), delta)
+    return stats
+
+def build_stats(items):
+    """Build a rollup from scratch (used for backfill)"""
+    stats = empty_stats()
+    for item in items:
+        apply_item(stats, item, 1)
+    return stats
+
+def advance_stats(stats, index, before, removed=(), added=()):
+    """The rollup for index, just written over the version updated at before
+
+    Applies removed/added to stats when it counts that version; otherwise
+    (stats None, or another write got in between) recounts index.
+    """
+    if stats is None or not before or stats.get('index_updated_at') != before:
+        stats = build_stats(index.get('items', []))
+    else:
+        for item in removed:
+            apply_item(stats, item, -1)
+        for item in added:
+            apply_item(stats, item, 1)
+    stats['index_updated_at'] = index.get('updated_at')
+    stats['updated_at'] = datetime.now().isoformat()
+    return stats
+
+def summarize(stats, group_by=None, filters=None):
+    """Summarize the rollup for the dashboard
+
+    Without filters or group_by this only returns the precomputed totals.
+    Otherwise the cells are scanned once to apply filters and group counts.
+    """
+    group_by = [dim for dim in (group_by or []) if dim in DIMENSIONS]
+    filters = {dim: value for dim, value in (filters or {}).items() if dim in DIMENSIONS and value}
+
+    if not group_by and not filters:
+        return {
+            'total': stats.get('total', 0),
+            'by': stats.get('by', {}),
+            'updated_at': stats.get('updated_at')
+        }
+
+    positions = {dim: i for i, dim in enumerate(DIMENSIONS)}
+    total = 0
+    by = {dim: {} for dim in DIMENSIONS}
+    groups = {}
+    for cell, count in stats.get('cells', {}).items():
+        values = cell.split(CELL_SEPARATOR)
+        if any(values[positions[dim]] != value for dim, value in filters.items()):
+            continue
+        total += count
+        for dim, value in zip(DIMENSIONS, values):
+            by[dim][value] = by[dim].get(value, 0) + count
+        if group_by:
+            group_key = tuple(values[positions[dim]] for dim in group_by)
+            groups[group_key] = groups.get(group_key, 0) + count
+
+    result = {'total': total, 'by': by, 'updated_at': stats.get('updated_at')}
+    if group_by:
+        rows = []
+        for group_key, count in sorted(groups.items(), key=lambda g: (-g[1], g[0])):
+            row = dict(zip(group_by, group_key))
+            row['count'] = count
+            rows.append(row)
+        result['groups'] = rows
+    return result
@@ -0,0 +1,821 @@
+"""Object storage helpers shared by the backend and tools
+
+Objects live in S3 by default. STORAGE_BACKEND=local keeps them in a
+directory instead (LOCAL_STORAGE_DIR), for development, tests and
+offline imports, and STORAGE_BACKEND=memory keeps them in process
+memory. All go through the same client calls.
+"""
+import os
+import io
+import copy
+import json
+import hashlib
+import tempfile
+import threading
+import time
+import contextvars
+from collections import OrderedDict
+from concurrent.futures import Future, ThreadPoolExecutor
+from datetime import datetime
+from urllib.parse import quote
+from werkzeug.utils import secure_filename
+import boto3
+from boto3.s3.transfer import TransferConfig
+from botocore.config import Config
+from botocore.exceptions import ClientError
+from dotenv import load_dotenv
+import index_snapshot
+from stats import STATS_KEY, advance_stats, build_stats
+from fault_injection import wrap_client
+from hedge import Hedger
+from key_layout import ITEMS_PREFIX, item_id_of, item_key, previous_item_key
+from metrics import COALESCED_CALLS, FILE_UPLOADS, INDEX_BYTES, INDEX_ITEMS, S3_BYTES, timed_s3, timed_stage
+
+load_dotenv('../.env.local')
+
+# Config
+AWS_ACCESS_KEY_ID = os.getenv('AWS_ACCESS_KEY_ID')
+AWS_SECRET_ACCESS_KEY = os.getenv('AWS_SECRET_ACCESS_KEY')
+AWS_REGION = os.getenv('AWS_REGION', 'ap-south-1')
+S3_BUCKET_NAME = os.getenv('S3_BUCKET_NAME')
+S3_ENDPOINT = os.getenv('S3_ENDPOINT', None)
+STORAGE_BACKEND = os.getenv('STORAGE_BACKEND', 's3')
+# Concurrent S3 connections per process (boto3 defaults to 10)
+S3_MAX_POOL_CONNECTIONS = int(os.getenv('S3_MAX_POOL_CONNECTIONS', '50'))
+LOCAL_STORAGE_DIR = os.getenv('LOCAL_STORAGE_DIR', os.path.join(os.path.dirname(__file__), '..', 'local-storage'))
+
+INDEX_KEY = 'metadata/index.json'
+INDEX_SNAPSHOT_KEY = 'metadata/index.snapshot'
+# Write and prefer the binary index snapshot (index_snapshot.py)
+INDEX_SNAPSHOT = os.getenv('INDEX_SNAPSHOT', '1').lower() not in ('0', 'false', 'no', '')
+# After finding no snapshot, read the JSON index directly for this long
+INDEX_SNAPSHOT_RETRY_SECONDS = float(os.getenv('INDEX_SNAPSHOT_RETRY_SECONDS', '60'))
+# Parallel GETs per get_items call, and item objects cached per process (0 = no cache)
+ITEM_FETCH_WORKERS = int(os.getenv('ITEM_FETCH_WORKERS', '16'))
+ITEM_CACHE_SIZE = int(os.getenv('ITEM_CACHE_SIZE', '0'))
+# Identical concurrent GET/HEAD calls in a process share one request
+SINGLE_FLIGHT = os.getenv('SINGLE_FLIGHT', '1').lower() not in ('0', 'false', 'no', '')
+# Hedged GETs of the hot index objects (hedge.py), off by default
+S3_HEDGE = os.getenv('S3_HEDGE', '0').lower() not in ('0', 'false', 'no', '')
+S3_HEDGE_PERCENTILE = float(os.getenv('S3_HEDGE_PERCENTILE', '95'))
+S3_HEDGE_MIN_DELAY_MS = float(os.getenv('S3_HEDGE_MIN_DELAY_MS', '20'))
+S3_HEDGE_BUDGET = float(os.getenv('S3_HEDGE_BUDGET', '0.05'))
+
+def _client_error(code, message, operation, status=400):
+    return ClientError({
+        'Error': {'Code': code, 'Message': message},
+        'ResponseMetadata': {'HTTPStatusCode': status}
+    }, operation)
+
+class LocalS3Client:
+    """The subset of the boto3 S3 client the backend uses, backed by a directory"""
+
+    class exceptions:
+        class NoSuchKey(ClientError):
+            pass
+
+    def __init__(self, root):
+        self.root = os.path.abspath(root)
+
+    def _path(self, bucket, key):
+        path = os.path.abspath(os.path.join(self.root, bucket or 'local', key))
+        if not path.startswith(self.root + os.sep):
+            raise _client_error('InvalidKey', f'Invalid key: {key}', 'GetObject')
+        return path
+
+    def _etag(self, data):
+        return f'"{hashlib.md5(data).hexdigest()}"'
+
+    def _write(self, path, data):
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        fd, tmp = tempfile.mkstemp(dir=os.path.dirname(path), prefix='.tmp-')
+        with os.fdopen(fd, 'wb') as f:
+            f.write(data)
+        os.replace(tmp, path)
+
+    def _read(self, path):
+        """File contents, or None if missing"""
+        try:
+            with open(path, 'rb') as f:
+                return f.read()
+        except (FileNotFoundError, IsADirectoryError):
+            return None
+
+    def _remove(self, path):
+        try:
+            os.remove(path)
+        except FileNotFoundError:
+            pass
+
+    def _list(self, base):
+        """(path, size) of every stored object under base"""
+        for dirpath, dirnames, filenames in os.walk(base):
+            for filename in filenames:
+                if not filename.startswith('.tmp-'):
+                    path = os.path.join(dirpath, filename)
+                    yield path, os.path.getsize(path)
+
+    def get_object(self, Bucket, Key, IfNoneMatch=None, **kwargs):
+        data = self._read(self._path(Bucket, Key))
+        if data is None:
+            raise self.exceptions.NoSuchKey({
+                'Error': {'Code': 'NoSuchKey', 'Message': 'The specified key does not exist.'},
+                'ResponseMetadata': {'HTTPStatusCode': 404}
+            }, 'GetObject')
+        etag = self._etag(data)
+        if IfNoneMatch and IfNoneMatch == etag:
+            raise _client_error('304', 'Not Modified', 'GetObject', status=304)
+        return {'Body': io.BytesIO(data), 'ETag': etag, 'ContentLength': len(data)}
+
+    def head_object(self, Bucket, Key, **kwargs):
+        response = self.get_object(Bucket, Key)
+        del response['Body']
+        return response
+
+    def put_object(self, Bucket, Key, Body, **kwargs):
+        data = Body.encode('utf-8') if isinstance(Body, str) else bytes(Body)
+        self._write(self._path(Bucket, Key), data)
+        return {'ETag': self._etag(data)}
+
+    def upload_fileobj(self, Fileobj, Bucket, Key, ExtraArgs=None, Config=None, **kwargs):
+        self._write(self._path(Bucket, Key), Fileobj.read())
+
+    def copy_object(self, Bucket, Key, CopySource, **kwargs):
+        data = self._read(self._path(CopySource['Bucket'], CopySource['Key']))
+        if data is None:
+            raise self.exceptions.NoSuchKey({
+                'Error': {'Code': 'NoSuchKey', 'Message': 'The specified key does not exist.'},
+                'ResponseMetadata': {'HTTPStatusCode': 404}
+            }, 'CopyObject')
+        self._write(self._path(Bucket, Key), data)
+        return {'CopyObjectResult': {'ETag': self._etag(data)}}
+
+    def delete_object(self, Bucket, Key, **kwargs):
+        self._remove(self._path(Bucket, Key))
+        return {}
+
+    def list_objects_v2(self, Bucket, Prefix='', StartAfter='', ContinuationToken=None, MaxKeys=1000, **kwargs):
+        base = os.path.join(self.root, Bucket or 'local')
+        after = ContinuationToken or StartAfter
+        contents = []
+        for path, size in self._list(base):
+            key = os.path.relpath(path, base).replace(os.sep, '/')
+            if key.startswith(Prefix) and key > after:
+                contents.append({'Key': key, 'Size': size})
+        contents.sort(key=lambda c: c['Key'])
+        response = {'Contents': contents[:MaxKeys], 'KeyCount': min(len(contents), MaxKeys),
+                    'IsTruncated': len(contents) > MaxKeys}
+        if response['IsTruncated']:
+            response['NextContinuationToken'] = contents[MaxKeys - 1]['Key']
+        return response
+
+    def generate_presigned_url(self, ClientMethod, Params=None, ExpiresIn=3600, **kwargs):
+        return 'file://' + quote(self._path(Params['Bucket'], Params['Key']))
+
+class MemoryS3Client(LocalS3Client):
+    """LocalS3Client that keeps objects in a dict (benchmarks, throwaway runs)"""
+
+    def __init__(self, root='/memory'):
+        super().__init__(root)
+        self.objects = {}
+        self.lock = threading.Lock()
+
+    def _write(self, path, data):
+        with self.lock:
+            self.objects[path] = data
+
+    def _read(self, path):
+        return self.objects.get(path)
+
+    def _remove(self, path):
+        with self.lock:
+            self.objects.pop(path, None)
+
+    def _list(self, base):
+        with self.lock:
+            items = list(self.objects.items())
+        for path, data in items:
+            if path.startswith(base + os.sep):
+                yield path, len(data)
+
+def make_client():
+    """Create the storage client selected by STORAGE_BACKEND (with STORAGE_FAULTS injected, if set)"""
+    if STORAGE_BACKEND == 'memory':
+        client = MemoryS3Client()
+    elif STORAGE_BACKEND == 'local':
+        client = LocalS3Client(LOCAL_STORAGE_DIR)
+    else:
+        client = boto3.client(
+            's3',
+            aws_access_key_id=AWS_ACCESS_KEY_ID,
+            aws_secret_access_key=AWS_SECRET_ACCESS_KEY,
+            region_name=AWS_REGION,
+            endpoint_url=S3_ENDPOINT,
+            config=Config(max_pool_connections=S3_MAX_POOL_CONNECTIONS)
+        )
+    return wrap_client(client)
+
+# S3 client
+s3 = make_client()
+
+def _reopen_client():
+    """Give a forked process its own S3 connections
+
+    The parent's pooled sockets (e.g. a gunicorn master that warmed up
+    before forking) must not be shared. botocore caches the service model
+    per session, so the new client is cheap to build. Local and in-memory
+    clients hold no sockets and are kept.
+    """
+    global s3
+    if not isinstance(getattr(s3, 'client', s3), LocalS3Client):
+        s3 = make_client()
+
+os.register_at_fork(after_in_child=_reopen_client)
+
+class SingleFlight:
+    """Coalesce concurrent calls with the same key into one
+
+    The first caller runs the function; callers arriving while it runs
+    wait for it and get the same result (or exception). Nothing is kept
+    once the call returns, so the next caller starts a new one.
+    """
+
+    def __init__(self, name):
+        self.name = name
+        self._lock = threading.Lock()
+        self._calls = {}
+
+    def running(self, key):
+        return key in self._calls
+
+    def do(self, key, func, *args):
+        with self._lock:
+            future = self._calls.get(key)
+            leader = future is None
+            if leader:
+                future = self._calls[key] = Future()
+        if not leader:
+            COALESCED_CALLS.labels(self.name).inc()
+            return future.result()
+        try:
+            future.set_result(func(*args))
+        except BaseException as e:
+            future.set_exception(e)
+        finally:
+            with self._lock:
+                del self._calls[key]
+        return future.result()
+
+_flights = SingleFlight('s3')
+# Bumped by every write from this process, so reads started after it never
+# join a request that was sent before it
+_writes = 0
+_writes_lock = threading.Lock()
+
+def _wrote():
+    """Count a write; upload pool threads call this concurrently"""
+    global _writes
+    with _writes_lock:
+        _writes += 1
+
+def _fetch(params):
+    with timed_s3('get'):
+        response = s3.get_object(**params)
+        return response['Body'].read(), response.get('ETag')
+
+def _hedger(name):
+    return Hedger(name, percentile=S3_HEDGE_PERCENTILE, min_delay=S3_HEDGE_MIN_DELAY_MS / 1000,
+                  budget=S3_HEDGE_BUDGET, workers=S3_MAX_POOL_CONNECTIONS, answers=(ClientError,))
+
+# One hedger per object, so each hedges at its own latency percentile
+_hedgers = {key: _hedger(key) for key in (INDEX_KEY, INDEX_SNAPSHOT_KEY)} if S3_HEDGE else {}
+
+def _get(params):
+    hedger = _hedgers.get(params['Key'])
+    if hedger is None:
+        return _fetch(params)
+    return hedger.run(_fetch, params)
+
+def _head(key):
+    with timed_s3('head'):
+        return s3.head_object(Bucket=S3_BUCKET_NAME, Key=key).get('ETag')
+
+def _get_body(key, etag=None):
+    """(bytes, ETag) of an object; raises ClientError (304 when it still has etag)
+
+    Callers share the bytes, never a parsed object, so each can edit what
+    it decodes.
+    """
+    params = {'Bucket': S3_BUCKET_NAME, 'Key': key}
+    if etag:
+        params['IfNoneMatch'] = etag
+    if not SINGLE_FLIGHT:
+        return _get(params)
+    return _flights.do(('get', key, etag, _writes), _get, params)
+
+def _head_etag(key):
+    """Current ETag of an object; raises ClientError when missing"""
+    if not SINGLE_FLIGHT:
+        return _head(key)
+    return _flights.do(('head', key, _writes), _head, key)
+
+# S3 helpers
+def _observe_index(key, data, size):
+    if key == INDEX_KEY and isinstance(data, dict):
+        INDEX_ITEMS.set(len(data.get('items', [])))
+        INDEX_BYTES.set(size)
+
+def _load_json(key, body):
+    S3_BYTES.labels('in').inc(len(body))
+    with timed_stage('json-parse'):
+        data = json.loads(body.decode('utf-8'))
+    _observe_index(key, data, len(body))
+    return data
+
+def get_s3_object(key):
+    """Get object from S3"""
+    try:
+        body, _ = _get_body(key)
+        return _load_json(key, body)
+    except ClientError as e:
+        if e.response.get('Error', {}).get('Code') != 'NoSuchKey':
+            print(f"S3 get error: {e}")
+        return None
+    except Exception as e:
+        print(f"S3 get error: {e}")
+        return None
+
+def get_s3_object_if_changed(key, etag=None):
+    """Get object from S3 unless it still has the given ETag
+
+    Returns (data, etag). data is None when the object is unchanged or
+    could not be read (etag is kept) or is missing (etag is None).
+    """
+    try:
+        body, new_etag = _get_body(key, etag)
+        return _load_json(key, body), new_etag
+    except ClientError as e:
+        code = e.response.get('Error', {}).get('Code')
+        if code in ('NoSuchKey', '404'):
+            return None, None
+        if code not in ('304', 'NotModified'):
+            print(f"S3 get error: {e}")
+        return None, etag
+    except Exception as e:
+        print(f"S3 get error: {e}")
+        return None, etag
+
+def _dump_json(data):
+    with timed_stage('json-dump'):
+        return json.dumps(data, indent=2).encode('utf-8')
+
+def _put_body(key, body, content_type='application/json'):
+    """Put already-encoded bytes; returns the new ETag (True if S3 sent none), False on failure"""
+    try:
+        with timed_s3('put'):
+            response = s3.put_object(
+                Bucket=S3_BUCKET_NAME,
+                Key=key,
+                Body=body,
+                ContentType=content_type
+            )
+        _wrote()
+        S3_BYTES.labels('out').inc(len(body))
+        return (response or {}).get('ETag') or True
+    except Exception as e:
+        print(f"S3 put error: {e}")
+        return False
+
+def put_s3_object(key, data):
+    """Put object to S3"""
+    try:
+        body = _dump_json(data)
+    except Exception as e:
+        print(f"S3 put error: {e}")
+        return False
+    if not _put_body(key, body):
+        return False
+    _observe_index(key, data, len(body))
+    return True
+
+# Uploaded files are stored once per content under files/sha256/<hash>.
+# Each item using one has a marker files/refs/<hash>/<item id>.json (its
+# reference count is the number of markers); the bytes are deleted with
+# the last marker. Files uploaded before this keep their per-item keys.
+BLOBS_PREFIX = 'files/sha256/'
+FILE_REFS_PREFIX = 'files/refs/'
+HASH_CHUNK_BYTES = 1024 * 1024
+
+def blob_key(sha256):
+    return f"{BLOBS_PREFIX}{sha256}"
+
+def file_hash(key):
+    """SHA-256 of a content-addressed file key, or None for an older per-item key"""
+    if key and key.startswith(BLOBS_PREFIX):
+        return key[len(BLOBS_PREFIX):]
+    return None
+
+def _ref_key(sha256, item_id):
+    return f"{FILE_REFS_PREFIX}{sha256}/{item_id}.json"
+
+def is_sha256(value):
+    return len(value) == 64 and all(c in '0123456789abcdef' for c in value)
+
+def parse_file_hashes(values):
+    """[(sha256, filename)] from form values "<sha256>" or "<sha256>:<filename>"; raises ValueError"""
+    hashes = []
+    for value in values:
+        sha256, _, filename = value.strip().partition(':')
+        sha256 = sha256.lower()
+        if not is_sha256(sha256):
+            raise ValueError(f'Invalid file hash: {value}')
+        hashes.append((sha256, secure_filename(filename)))
+    return hashes
+
+def _sha256(stream):
+    """(hex SHA-256, size) of a seekable stream, read in chunks and rewound"""
+    digest = hashlib.sha256()
+    stream.seek(0)
+    for chunk in iter(lambda: stream.read(HASH_CHUNK_BYTES), b''):
+        digest.update(chunk)
+    size = stream.tell()
+    stream.seek(0)
+    return digest.hexdigest(), size
+
+def object_exists(key):
+    """True when storage has an object at key"""
+    try:
+        _head_etag(key)
+        return True
+    except ClientError as e:
+        if e.response.get('Error', {}).get('Code') not in ('NoSuchKey', '404'):
+            print(f"S3 head error: {e}")
+        return False
+    except Exception as e:
+        print(f"S3 head error: {e}")
+        return False
+
+def file_stored(sha256):
+    """True when storage has the file with this hash"""
+    return object_exists(blob_key(sha256))
+
+def stored_files(hashes, workers=None):
+    """The hashes storage already has, in order"""
+    hashes = list(dict.fromkeys(hashes))
+    found = _in_pool(file_stored, hashes, workers or ITEM_FETCH_WORKERS)
+    return [sha256 for sha256, stored in zip(hashes, found) if stored]
+
+def _add_ref(sha256, item_id, filename, user_name):
+    return put_s3_object(_ref_key(sha256, item_id), {
+        'item_id': item_id,
+        'filename': filename,
+        'created_by': user_name,
+        'created_at': datetime.now().isoformat()
+    })
+
+def attach_stored_file(sha256, item_id, filename, user_name):
+    """Reference a file storage already has from item_id, sending no bytes; returns its key or None"""
+    if not file_stored(sha256) or not _add_ref(sha256, item_id, filename, user_name):
+        return None
+    FILE_UPLOADS.labels('referenced').inc()
+    return blob_key(sha256)
+
+def upload_file_to_s3(file, item_id, user_name):
+    """Store an uploaded file once per content and reference it from item_id
+
+    Returns the file's key. The request parser has already spooled the
+    upload, so it is hashed first; identical bytes that are already
+    stored are not sent again.
+    """
+    try:
+        filename = secure_filename(file.filename)
+        with timed_stage('file-hash'):
+            sha256, size = _sha256(file.stream)
+        key = blob_key(sha256)
+        # The reference goes first, so a release of the last other one keeps the bytes
+        if not _add_ref(sha256, item_id, filename, user_name):
+            return None
+        if file_stored(sha256):
+            FILE_UPLOADS.labels('deduplicated').inc()
+            return key
+
+        # Multipart upload for large files (handles unlimited size)
+        try:
+            with timed_s3('upload'):
+                s3.upload_fileobj(
+                    file,
+                    S3_BUCKET_NAME,
+                    key,
+                    ExtraArgs={'ContentType': file.content_type or 'application/octet-stream'},
+                    Config=TransferConfig(
+                        multipart_threshold=1024 * 25,  # 25MB
+                        max_concurrency=10,
+                        multipart_chunksize=1024 * 25,
+                        use_threads=True
+                    )
+                )
+        except Exception:
+            delete_object(_ref_key(sha256, item_id))
+            raise
+        _wrote()
+        # Bytes over the ytsprint_s3_seconds{operation="upload"} sum gives throughput
+        S3_BYTES.labels('upload').inc(size)
+        FILE_UPLOADS.labels('stored').inc()
+        return key
+    except Exception as e:
+        print(f"S3 upload error: {e}")
+        return None
+
+def release_file(key, item_id):
+    """Drop item_id's reference to a stored file, deleting the bytes with the last reference
+
+    A file referenced again while its last reference is released can
+    lose its bytes; the window is one LIST and one DELETE.
+    """
+    sha256 = file_hash(key)
+    if sha256 is None:
+        return delete_object(key)
+    delete_object(_ref_key(sha256, item_id))
+    try:
+        if list_keys(f"{FILE_REFS_PREFIX}{sha256}/"):
+            return True
+    except Exception as e:
+        print(f"Error listing references of {key}: {e}")
+        return False
+    return delete_object(key)
+
+def item_files(item):
+    """Distinct file keys an item references (attachments and the Re-edit video)"""
+    keys = list(item.get('files') or [])
+    if item.get('videoFile'):
+        keys.append(item['videoFile'])
+    return list(dict.fromkeys(keys))
+
+def file_name(key, item_id):
+    """Name the file had when item_id attached it, or None"""
+    sha256 = file_hash(key)
+    if sha256 is None:
+        return None
+    ref = get_s3_object(_ref_key(sha256, item_id))
+    return ref.get('filename') if ref else None
+
+def delete_object(key):
+    """Delete object from S3"""
+    try:
+        with timed_s3('delete'):
+            s3.delete_object(Bucket=S3_BUCKET_NAME, Key=key)
+        _wrote()
+        return True
+    except Exception as e:
+        print(f"Error deleting {key}: {e}")
+        return False
+
+def copy_object(source, key):
+    """Copy an object within the bucket (server-side); returns True on success"""
+    try:
+        with timed_s3('copy'):
+            s3.copy_object(Bucket=S3_BUCKET_NAME, Key=key, CopySource={'Bucket': S3_BUCKET_NAME, 'Key': source})
+        _wrote()
+        return True
+    except Exception as e:
+        print(f"Error copying {source} to {key}: {e}")
+        return False
+
+def list_keys(prefix, start_after='', end_before=None):
+    """Keys under prefix, in order, from after start_after up to (not including) end_before"""
+    params = {'Bucket': S3_BUCKET_NAME, 'Prefix': prefix}
+    if start_after:
+        params['StartAfter'] = start_after
+    keys = []
+    while True:
+        with timed_s3('list'):
+            response = s3.list_objects_v2(**params)
+        for obj in response.get('Contents', []):
+            if end_before and obj['Key'] >= end_before:
+                return keys
+            keys.append(obj['Key'])
+        if not response.get('IsTruncated'):
+            return keys
+        params['ContinuationToken'] = response['NextContinuationToken']
+
+def _in_pool(func, args, workers):
+    """func(arg) for each arg on a bounded thread pool, in order (keeps request metrics context)"""
+    args = list(args)
+    if not args:
+        return []
+    with ThreadPoolExecutor(max_workers=max(1, min(workers, len(args)))) as pool:
+        futures = [pool.submit(contextvars.copy_context().run, func, arg) for arg in args]
+        return [future.result() for future in futures]
+
+# Item objects
+_item_cache = OrderedDict()
+_item_cache_lock = threading.Lock()
+
+def _get_previous_item(item_id):
+    """The item from its key in KEY_LAYOUT_PREVIOUS, while keys are being migrated"""
+    previous = previous_item_key(item_id)
+    return get_s3_object(previous) if previous else None
+
+def get_item(item_id):
+    """Get one item object
+
+    With ITEM_CACHE_SIZE set, recently read items are kept with their ETag
+    and revalidated with a conditional GET, so an unchanged item skips the
+    download and parse but a change made by another worker is still seen.
+    """
+    if ITEM_CACHE_SIZE <= 0:
+        item = get_s3_object(item_key(item_id))
+        return item if item is not None else _get_previous_item(item_id)
+
+    with _item_cache_lock:
+        cached = _item_cache.get(item_id)
+    data, etag = get_s3_object_if_changed(item_key(item_id), cached[0] if cached else None)
+    if data is None and etag is None:
+        with _item_cache_lock:
+            _item_cache.pop(item_id, None)
+        return _get_previous_item(item_id)
+    with _item_cache_lock:
+        if data is not None:
+            _item_cache[item_id] = (etag, data)
+        elif cached and etag == cached[0]:
+            data = cached[1]
+        else:
+            return None
+        _item_cache.move_to_end(item_id)
+        while len(_item_cache) > ITEM_CACHE_SIZE:
+            _item_cache.popitem(last=False)
+    # Callers edit items in place
+    return copy.deepcopy(data)
+
+def save_item(item):
+    """Write an item object to its key, removing a copy left at its previous key"""
+    if not put_s3_object(item_key(item['id']), item):
+        return False
+    previous = previous_item_key(item['id'])
+    if previous:
+        delete_object(previous)
+    return True
+
+def remove_item(item_id):
+    """Delete an item object (and a copy left at its previous key)"""
+    previous = previous_item_key(item_id)
+    if previous:
+        delete_object(previous)
+    return delete_object(item_key(item_id))
+
+def get_items(ids, workers=None):
+    """Fetch many item objects concurrently; returns {id: item}, leaving out missing ids"""
+    ids = list(dict.fromkeys(ids))
+    items = _in_pool(get_item, ids, workers or ITEM_FETCH_WORKERS)
+    return {item_id: item for item_id, item in zip(ids, items) if item is not None}
+
+def list_item_keys(workers=None):
+    """Keys of every stored item object, in any layout
+
+    The listing is split at the first character after the prefix (hex:
+    item ids are UUIDs, partitions are hashes) and the ranges are listed
+    concurrently; the first and last ranges are open-ended so no key is
+    missed.
+    """
+    bounds = [''] + [ITEMS_PREFIX + c for c in '123456789abcdef'] + [None]
+    ranges = list(zip(bounds, bounds[1:]))
+    shards = _in_pool(lambda r: list_keys(ITEMS_PREFIX, *r), ranges, workers or ITEM_FETCH_WORKERS)
+    return [key for keys in shards for key in keys if item_id_of(key)]
+
+def list_item_ids(workers=None):
+    """Ids of every stored item object (once, if mid-migration it has two keys)"""
+    return list(dict.fromkeys(item_id_of(key) for key in list_item_keys(workers)))
+
+def generate_download_url(key, expires_in=3600, filename=None):
+    """Generate presigned URL for downloading an object (saved as filename, if given)"""
+    params = {'Bucket': S3_BUCKET_NAME, 'Key': key}
+    if filename:
+        params['ResponseContentDisposition'] = f'attachment; filename="{filename}"'
+    return s3.generate_presigned_url(
+        'get_object',
+        Params=params,
+        ExpiresIn=expires_in
+    )
+
+# When this process last found no snapshot (None = look for one)
+_snapshot_missing_at = None
+
+def _snapshot_matches(meta, json_etag):
+    if meta.get('source_etag'):
+        return meta['source_etag'] == json_etag
+    # Snapshots from before source_etag: multipart/SSE-KMS ETags are not an MD5
+    md5 = json_etag.strip('"')
+    return '-' not in md5 and meta.get('source_md5') == md5
+
+def _get_snapshot(json_etag):
+    """The snapshot, if it was made from the JSON index with this ETag
+
+    Writers that only write the JSON delete the snapshot, so after a miss
+    the JSON is read directly for INDEX_SNAPSHOT_RETRY_SECONDS rather than
+    paying for a snapshot GET on every changed read.
+    """
+    global _snapshot_missing_at
+    if not json_etag:
+        return None
+    missing_at = _snapshot_missing_at
+    if missing_at is not None and time.monotonic() - missing_at < INDEX_SNAPSHOT_RETRY_SECONDS:
+        return None
+    try:
+        body, _ = _get_body(INDEX_SNAPSHOT_KEY)
+    except ClientError as e:
+        if e.response.get('Error', {}).get('Code') in ('NoSuchKey', '404'):
+            _snapshot_missing_at = time.monotonic()
+        return None
+    except Exception:
+        return None
+    _snapshot_missing_at = None
+    S3_BYTES.labels('in').inc(len(body))
+    meta = index_snapshot.read_meta(body)
+    if meta is None or not _snapshot_matches(meta, json_etag):
+        return None
+    with timed_stage('snapshot-decode'):
+        index = index_snapshot.decode(body, meta)
+    _observe_index(INDEX_KEY, index, len(body))
+    return index
+
+def get_index_if_changed(etag=None):
+    """Get the index unless it still has the given ETag, like get_s3_object_if_changed
+
+    When a snapshot matching the JSON exists it is read instead. The
+    returned ETag is always the JSON's, so callers can keep comparing it.
+    """
+    if not INDEX_SNAPSHOT:
+        return get_s3_object_if_changed(INDEX_KEY, etag)
+    try:
+        current = _head_etag(INDEX_KEY)
+    except ClientError as e:
+        if e.response.get('Error', {}).get('Code') in ('NoSuchKey', '404'):
+            return None, None
+        return get_s3_object_if_changed(INDEX_KEY, etag)
+    except Exception:
+        return get_s3_object_if_changed(INDEX_KEY, etag)
+    if etag and current == etag:
+        return None, etag
+    index = _get_snapshot(current)
+    if index is not None:
+        return index, current
+    return get_s3_object_if_changed(INDEX_KEY, etag)
+
+def get_index():
+    """Get or create index"""
+    with timed_stage('get-index'):
+        index, _ = get_index_if_changed()
+    if index is None:
+        index = {'items': [], 'updated_at': datetime.now().isoformat()}
+    return index
+
+def update_index(index):
+    """Update index atomically, then the snapshot made from it"""
+    global _snapshot_missing_at
+    index['updated_at'] = datetime.now().isoformat()
+    with timed_stage('update-index'):
+        try:
+            body = _dump_json(index)
+        except Exception as e:
+            print(f"S3 put error: {e}")
+            return False
+        etag = _put_body(INDEX_KEY, body)
+        if not etag:
+            return False
+        _observe_index(INDEX_KEY, index, len(body))
+        if not INDEX_SNAPSHOT:
+            # Leave no snapshot behind for readers that still look for one
+            delete_object(INDEX_SNAPSHOT_KEY)
+            return True
+        # Readers check the source ETag, so a failed or stale snapshot only costs the JSON path
+        with timed_stage('snapshot-encode'):
+            snapshot = index_snapshot.encode(
+                index, hashlib.md5(body).hexdigest(), etag if isinstance(etag, str) else None
+            )
+        if _put_body(INDEX_SNAPSHOT_KEY, snapshot, 'application/octet-stream'):
+            _snapshot_missing_at = None
+        return True
+
+# Serializes this process's rollup updates; other processes are caught by the version check
+_stats_lock = threading.Lock()
+
+def get_stats():
+    """Get the stats rollup, or None before the first write or backfill"""
+    return get_s3_object(STATS_KEY)
+
+def update_stats(stats):
+    """Save stats rollup"""
+    stats['updated_at'] = datetime.now().isoformat()
+    return put_s3_object(STATS_KEY, stats)
+
+def record_stats(index, before, removed=(), added=()):
+    """Bring the rollup up to an index write (index as written, before its previous updated_at)"""
+    with _stats_lock:
+        return put_s3_object(STATS_KEY, advance_stats(get_stats(), index, before, removed, added))
+
+def rebuild_stats(index=None):
+    """Recount the rollup from the index (backfill); returns the item count, or None on failure"""
+    index = index or get_index()
+    stats = build_stats(index.get('items', []))
+    stats['index_updated_at'] = index.get('updated_at')
+    return len(index.get('items', [])) if update_stats(stats) else None
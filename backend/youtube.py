@@ -0,0 +1,67 @@
+"""YouTube link helpers
+
+Links are matched with one precompiled pattern and reduced to the
+11-character video id, so every accepted form maps to the same id and
+canonical URL.
+"""
+import re
+
+# Cap on links accepted in one /api/parse-links request
+MAX_LINKS = 5000
+
+# Item fields returned for links already in the index
+LINK_ITEM_FIELDS = ('id', 'created_by', 'created_at', 'status', 'vertical', 'exam')
+
+_ID = r'[A-Za-z0-9_-]{11}'
+
+# Matches youtu.be/<id>, youtube.com/{shorts,embed,live,v}/<id> and
+# youtube.com/watch?...v=<id> (v may follow other query params), on the
+# www., m. and music. hosts and youtube-nocookie.com, with or without scheme
+_LINK = re.compile(rf'''
+    (?<![\w.-])(?:https?://)?(?:(?:www|m|music)\.)?
+    (?:
+        youtu\.be/(?P<short>{_ID})
+      | youtube(?:-nocookie)?\.com/
+        (?:
+            (?:shorts|embed|live|v)/(?P<path>{_ID})
+          | watch/?\?(?:[^#\s]*?&)?v=(?P<query>{_ID})
+        )
+    )
+    (?![A-Za-z0-9_-])
+''', re.IGNORECASE | re.VERBOSE)
+
+def extract_youtube_id(url):
+    """Extract YouTube video ID from a link (None if it is not a video link)"""
+    match = _LINK.search(url or '')
+    if not match:
+        return None
+    return match.group('short') or match.group('path') or match.group('query')
+
+def canonical_url(video_id):
+    """Canonical watch URL for a video ID"""
+    return f"https://www.youtube.com/watch?v={video_id}"
+
+def split_links(text):
+    """Split pasted text into links (one per line, or comma/space separated)"""
+    return [link for link in re.split(r'[\s,]+', text or '') if link]
+
+def parse_links(links):
+    """Normalise a batch of links
+
+    Returns one result per link in input order. Repeats of an ID earlier in
+    the batch point back at the first occurrence with 'repeat_of'.
+    """
+    results = []
+    first_seen = {}
+    for position, link in enumerate(links):
+        link = str(link or '').strip()
+        video_id = extract_youtube_id(link)
+        result = {'input': link, 'youtube_id': video_id, 'valid': video_id is not None}
+        if video_id:
+            result['url'] = canonical_url(video_id)
+            if video_id in first_seen:
+                result['repeat_of'] = first_seen[video_id]
+            else:
+                first_seen[video_id] = position
+        results.append(result)
+    return results
@@ -0,0 +1,272 @@
+"""Load benchmark for the Flask app and the api/*.py handlers
+
+The core target times get_index, the item replica load and filtering directly.
+
+Usage:
+    python benchmarks/api_benchmark.py [--items 1000,10000] [--requests 200] [--write-requests 20]
+                                       [--concurrency 4] [--target core,flask,vercel] [--output results.json]
+                                       [--faults benchmarks/storage_faults.json]
+
+Storage is an in-memory S3 stand-in (storage.MemoryS3Client), seeded with
+synthetic items spread over the MASTER_DATA verticals. Each scenario is
+fired from a thread pool and reports throughput and p50/p99 latency.
+--faults adds the latency and errors of a fault_injection.py config to
+every storage call after seeding, to see how the routes hold up against
+S3-like tails and throttling.
+Writes rewrite the whole index, so --write-requests is kept small; at
+100k items each write costs seconds.
+
+Results are written as JSON (with the git commit) for comparing commits.
+"""
+import argparse
+import csv
+import io
+import importlib.util
+import json
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+
+ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..')
+sys.path.insert(0, os.path.join(ROOT, 'backend'))
+sys.path.insert(0, ROOT)
+
+import storage
+from storage import MemoryS3Client, put_s3_object, save_item
+from fault_injection import wrap_client
+from master_data import MASTER_DATA
+from synthetic import synthetic_items
+
+USER = 'bench@adda247.com'
+HEADERS = {'X-User-Email': USER}
+
+SCENARIOS = ('get_index', 'index_build', 'filter', 'options', 'metadata', 'check_duplicate', 'check_duplicate_bulk',
+             'create', 'update', 'export', 'bulk_upload', 'delete')
+WRITE_SCENARIOS = {'create', 'update', 'delete', 'bulk_upload'}
+
+def seed(client, items, owned):
+    """Store the index, plus item objects for the first `owned` items (made ours)"""
+    storage.s3 = client
+    for item in items[:owned]:
+        item['created_by'] = USER
+        save_item(item)
+    put_s3_object('metadata/index.json', {'items': items, 'updated_at': datetime.now().isoformat()})
+
+def percentile(sorted_values, p):
+    if not sorted_values:
+        return 0.0
+    return sorted_values[min(len(sorted_values) - 1, int(round(p / 100 * (len(sorted_values) - 1))))]
+
+def run_scenario(call, count, concurrency):
+    """Run call(i) count times; return throughput and latency summary"""
+    latencies = [0.0] * count
+    errors = [0]
+    lock = threading.Lock()
+
+    def one(i):
+        start = time.perf_counter()
+        ok = call(i)
+        latencies[i] = time.perf_counter() - start
+        if not ok:
+            with lock:
+                errors[0] += 1
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        list(pool.map(one, range(count)))
+    wall = time.perf_counter() - start
+
+    latencies.sort()
+    return {
+        'requests': count,
+        'errors': errors[0],
+        'throughput_rps': round(count / wall, 2) if wall else 0.0,
+        'mean_ms': round(sum(latencies) / count * 1000, 3) if count else 0.0,
+        'p50_ms': round(percentile(latencies, 50) * 1000, 3),
+        'p99_ms': round(percentile(latencies, 99) * 1000, 3),
+    }
+
+def bulk_csv(offset, rows=20):
+    out = io.StringIO()
+    writer = csv.writer(out)
+    writer.writerow(['title', 'vertical', 'category', 'subcategory', 'notes', 'links', 'tags'])
+    verticals = list(MASTER_DATA)
+    for i in range(rows):
+        vertical = verticals[(offset + i) % len(verticals)]
+        writer.writerow([f"Bulk {offset}-{i}", vertical, MASTER_DATA[vertical]['exams'][0], '', '', '', 'bench'])
+    return out.getvalue().encode()
+
+def new_video_id(n):
+    return f"new{n:08d}"[-11:].rjust(11, 'x')
+
+# Flask app
+def flask_calls(items, reads, writes):
+    from app import app
+    app.config['TESTING'] = True
+    local = threading.local()
+    verticals = list(MASTER_DATA)
+    video_ids = [item['youtube_id'] for item in items]
+
+    def client():
+        if not hasattr(local, 'client'):
+            local.client = app.test_client()
+        return local.client
+
+    def ok(response, *statuses):
+        return response.status_code in (statuses or (200,))
+
+    return {
+        'options': lambda i: ok(client().get('/api/options', headers=HEADERS)),
+        'metadata': lambda i: ok(client().get(f"/api/metadata?vertical={verticals[i % len(verticals)]}", headers=HEADERS)),
+        'check_duplicate': lambda i: ok(client().get(f"/api/check-duplicate/{video_ids[i % len(video_ids)]}", headers=HEADERS)),
+        'check_duplicate_bulk': lambda i: ok(client().post('/api/check-duplicate', headers=HEADERS,
+                                                           json={'video_ids': video_ids[i * 100 % len(video_ids):][:1000]})),
+        'create': lambda i: ok(client().post('/api/item', headers=HEADERS, data={
+            'email': USER, 'vertical': 'SSC', 'exam': MASTER_DATA['SSC']['exams'][0], 'subject': '',
+            'contentType': 'Content', 'status': 'Draft', 'verificationLink': f"https://youtu.be/{new_video_id(i)}"
+        }), 201),
+        'update': lambda i: ok(client().put(f"/api/item/{items[i]['id']}", headers=HEADERS, data={'vertical': 'SSC'})),
+        'export': lambda i: ok(client().get(f"/api/export?vertical={verticals[i % len(verticals)]}", headers=HEADERS)),
+        'bulk_upload': lambda i: ok(client().post('/api/bulk-upload', headers=HEADERS, content_type='multipart/form-data',
+                                                  data={'file': (io.BytesIO(bulk_csv(i)), 'bench.csv')}), 201),
+        'delete': lambda i: ok(client().delete(f"/api/item/{items[writes + i]['id']}", headers=HEADERS)),
+    }
+
+# Vercel handlers
+def load_handler(name, client):
+    """Import api/<name>.py with its S3 client swapped for the stand-in"""
+    spec = importlib.util.spec_from_file_location(f"api_{name.replace('-', '_')}", os.path.join(ROOT, 'api', f"{name}.py"))
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    module.s3 = client
+    module.S3_BUCKET_NAME = storage.S3_BUCKET_NAME
+
+    class Handler(module.handler):
+        def log_message(self, *args):
+            pass
+    return Handler
+
+def call_handler(handler_cls, method, path, body=None):
+    """Run one request through a BaseHTTPRequestHandler without a socket; returns the status"""
+    data = json.dumps(body).encode() if body is not None else b''
+    handler = handler_cls.__new__(handler_cls)
+    handler.rfile = io.BytesIO(data)
+    handler.wfile = io.BytesIO()
+    handler.headers = {**HEADERS, 'Content-Length': str(len(data)), 'Content-Type': 'application/json'}
+    handler.command = method
+    handler.path = path
+    handler.request_version = 'HTTP/1.1'
+    handler.requestline = f"{method} {path} HTTP/1.1"
+    handler.client_address = ('127.0.0.1', 0)
+    getattr(handler, f"do_{method}")()
+    return int(handler.wfile.getvalue().split(b' ', 2)[1])
+
+def vercel_calls(items, reads, writes):
+    client = storage.s3
+    handlers = {name: load_handler(name, client) for name in ('options', 'metadata', 'check-duplicate', 'item')}
+    verticals = list(MASTER_DATA)
+    video_ids = [item['youtube_id'] for item in items]
+
+    def call(name, method, path, body=None, status=200):
+        return call_handler(handlers[name], method, path, body) == status
+
+    return {
+        'options': lambda i: call('options', 'GET', '/api/options'),
+        'metadata': lambda i: call('metadata', 'GET', f"/api/metadata?vertical={verticals[i % len(verticals)]}"),
+        'check_duplicate': lambda i: call('check-duplicate', 'GET', f"/api/check-duplicate/{video_ids[i % len(video_ids)]}"),
+        'check_duplicate_bulk': lambda i: call('check-duplicate', 'POST', '/api/check-duplicate',
+                                               {'video_ids': video_ids[i * 100 % len(video_ids):][:1000]}),
+        'create': lambda i: call('item', 'POST', '/api/item', {
+            'vertical': 'SSC', 'exam': MASTER_DATA['SSC']['exams'][0], 'contentType': 'Content', 'status': 'Draft',
+            'verificationLink': f"https://youtu.be/{new_video_id(i)}"
+        }, 201),
+        'update': lambda i: call('item', 'PUT', f"/api/item/{items[i]['id']}", {'status': 'Final'}),
+        'delete': lambda i: call('item', 'DELETE', f"/api/item/{items[writes + i]['id']}"),
+    }
+
+# Building blocks behind the routes, without HTTP
+def core_calls(items, reads, writes):
+    from item_replica import ItemReplica
+    from storage import get_index
+    index = get_index()
+    replica = ItemReplica(os.path.join(tempfile.mkdtemp(prefix='ytsprint-bench-'), 'items.sqlite3'))
+    replica.load(index)
+    verticals = list(MASTER_DATA)
+
+    def build(i):
+        replica.load(index)
+        return replica.count() == len(index['items'])
+    return {
+        'get_index': lambda i: bool(get_index()['items']),
+        'index_build': build,
+        'filter': lambda i: replica.select({'vertical': verticals[i % len(verticals)], 'status': 'Published'}) is not None,
+    }
+
+TARGETS = {'core': core_calls, 'flask': flask_calls, 'vercel': vercel_calls}
+
+def git_commit():
+    try:
+        return subprocess.run(['git', 'rev-parse', 'HEAD'], cwd=ROOT, capture_output=True, text=True, check=True).stdout.strip()
+    except Exception:
+        return None
+
+def run(sizes, targets, reads, writes, concurrency, log=print, faults=None):
+    """Run every scenario for every target and index size; returns result rows"""
+    results = []
+    for size in sizes:
+        for target in targets:
+            items = synthetic_items(size)
+            seed(MemoryS3Client(), items, min(size, 2 * writes))
+            if faults:
+                storage.s3 = wrap_client(storage.s3, faults)
+            calls = TARGETS[target](items, reads, writes)
+            for scenario in SCENARIOS:
+                if scenario not in calls:
+                    continue
+                count = writes if scenario in WRITE_SCENARIOS else reads
+                count = min(count, size // 2) if scenario in ('update', 'delete') else count
+                if target == 'core' and scenario != 'filter':
+                    count = max(1, count // 10)
+                row = {'target': target, 'scenario': scenario, 'items': size, 'concurrency': concurrency}
+                row.update(run_scenario(calls[scenario], count, concurrency))
+                results.append(row)
+                log(f"{target:<7} {scenario:<21} {size:>7} items  {row['throughput_rps']:9.1f} req/s  "
+                    f"p50 {row['p50_ms']:9.2f} ms  p99 {row['p99_ms']:9.2f} ms  errors {row['errors']}")
+    return results
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Benchmark API routes against an in-memory S3 stand-in')
+    parser.add_argument('--items', default='1000,10000', help='Comma-separated index sizes (e.g. 1000,10000,100000)')
+    parser.add_argument('--target', default='core,flask,vercel', help='Comma-separated: core (get_index, index build, filter), flask, vercel')
+    parser.add_argument('--requests', type=int, default=200, help='Requests per read scenario')
+    parser.add_argument('--write-requests', type=int, default=20, help='Requests per write scenario')
+    parser.add_argument('--concurrency', type=int, default=4, help='Concurrent requests')
+    parser.add_argument('--output', default='benchmark-results.json', help='JSON results file')
+    parser.add_argument('--faults', help='fault_injection.py config applied to storage calls')
+    args = parser.parse_args(argv)
+
+    sizes = [int(s) for s in args.items.split(',') if s]
+    targets = [t.strip() for t in args.target.split(',') if t.strip()]
+    results = run(sizes, targets, args.requests, args.write_requests, args.concurrency, faults=args.faults)
+
+    report = {
+        'commit': git_commit(),
+        'created_at': datetime.now().isoformat(),
+        'python': platform.python_version(),
+        'cpus': os.cpu_count(),
+        'config': {'items': sizes, 'targets': targets, 'requests': args.requests,
+                   'write_requests': args.write_requests, 'concurrency': args.concurrency, 'faults': args.faults},
+        'results': results
+    }
+    with open(args.output, 'w') as f:
+        json.dump(report, f, indent=2)
+    print(f"✓ Results written to {args.output}")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,178 @@
+"""Throughput benchmark: Flask on one sync worker vs the ASGI app on one process
+
+Usage:
+    python benchmarks/asgi_benchmark.py [--items 1000] [--latency-ms 20] [--requests 400]
+                                        [--concurrency 1,16,64] [--server flask,asgi]
+
+Each server runs in a subprocess against the in-memory S3 stand-in with
+--latency-ms added to every storage call, standing in for S3 round trips.
+Flask is served by a single-threaded WSGI server (one gunicorn sync worker
+behaves the same); the ASGI app runs under uvicorn. An asyncio/httpx client
+keeps --concurrency requests in flight and reports req/s and p50/p99.
+"""
+import argparse
+import asyncio
+import json
+import os
+import socket
+import subprocess
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from api_benchmark import HEADERS, USER, ROOT, percentile, new_video_id
+
+# name -> (method, path or path(i, ids), kwargs(i, ids)); writes hit the index, so keep them few
+SCENARIOS = {
+    'metadata': ('GET', lambda i, ids: f"/api/metadata?vertical=SSC&user_only={'true' if i % 2 else 'false'}", None),
+    'check_duplicate': ('GET', lambda i, ids: f"/api/check-duplicate/{ids[i % len(ids)]}", None),
+    'create': ('POST', lambda i, ids: '/api/item', lambda i, ids: {'data': {
+        'email': USER, 'vertical': 'SSC', 'exam': 'CGL', 'subject': '', 'contentType': 'Content',
+        'status': 'Draft', 'verificationLink': f"https://youtu.be/{new_video_id(i)}"
+    }}),
+}
+
+def serve(args):
+    """Run one server with a seeded, slowed-down in-memory store"""
+    sys.path.insert(0, os.path.join(ROOT, 'backend'))
+    import storage
+    from api_benchmark import seed
+    from synthetic import synthetic_items
+
+    latency = args.latency_ms / 1000
+
+    class SlowS3Client(storage.MemoryS3Client):
+        def _read(self, path):
+            time.sleep(latency)
+            return super()._read(path)
+
+        def _write(self, path, data):
+            time.sleep(latency)
+            super()._write(path, data)
+
+    items = synthetic_items(args.items)
+    seed(storage.MemoryS3Client(), items, 0)
+    slow = SlowS3Client()
+    slow.objects = storage.s3.objects
+    storage.s3 = slow
+    with open(args.ids_file, 'w') as f:
+        json.dump([item['youtube_id'] for item in items], f)
+
+    if args.serve == 'flask':
+        from werkzeug.serving import WSGIRequestHandler, make_server
+        from app import app
+
+        class QuietHandler(WSGIRequestHandler):
+            def log_request(self, *args):
+                pass
+        make_server('127.0.0.1', args.port, app, threaded=False, request_handler=QuietHandler).serve_forever()
+    else:
+        import uvicorn
+        from asgi import app
+        uvicorn.run(app, host='127.0.0.1', port=args.port, log_level='warning')
+
+def free_port():
+    with socket.socket() as s:
+        s.bind(('127.0.0.1', 0))
+        return s.getsockname()[1]
+
+async def wait_ready(client, proc):
+    for _ in range(600):
+        if proc.poll() is not None:
+            raise RuntimeError('Server exited during startup')
+        try:
+            await client.get('/api/options', headers=HEADERS)
+            return
+        except Exception:
+            await asyncio.sleep(0.1)
+    raise RuntimeError('Server did not start')
+
+async def load(client, scenario, ids, count, concurrency, offset=0):
+    method, path, kwargs = SCENARIOS[scenario]
+    latencies = []
+    errors = 0
+    next_i = iter(range(offset, offset + count))
+
+    async def worker():
+        nonlocal errors
+        for i in next_i:
+            start = time.perf_counter()
+            try:
+                response = await client.request(method, path(i, ids), headers=HEADERS, **(kwargs(i, ids) if kwargs else {}))
+                errors += response.status_code >= 400
+            except Exception:
+                errors += 1
+            latencies.append(time.perf_counter() - start)
+
+    start = time.perf_counter()
+    await asyncio.gather(*[worker() for _ in range(concurrency)])
+    wall = time.perf_counter() - start
+
+    latencies.sort()
+    return {
+        'requests': count,
+        'errors': errors,
+        'throughput_rps': round(count / wall, 2),
+        'p50_ms': round(percentile(latencies, 50) * 1000, 3),
+        'p99_ms': round(percentile(latencies, 99) * 1000, 3),
+    }
+
+async def bench_server(server, args, concurrencies):
+    import httpx
+    port = free_port()
+    ids_file = os.path.join(ROOT, f".asgi-bench-ids-{port}.json")
+    proc = subprocess.Popen([sys.executable, os.path.abspath(__file__), '--serve', server, '--port', str(port),
+                             '--items', str(args.items), '--latency-ms', str(args.latency_ms), '--ids-file', ids_file])
+    rows = []
+    try:
+        limits = httpx.Limits(max_connections=max(concurrencies), max_keepalive_connections=max(concurrencies))
+        async with httpx.AsyncClient(base_url=f"http://127.0.0.1:{port}", limits=limits, timeout=300) as client:
+            await wait_ready(client, proc)
+            with open(ids_file) as f:
+                ids = json.load(f)
+            offset = 0
+            for scenario in SCENARIOS:
+                for concurrency in concurrencies:
+                    count = args.requests if scenario != 'create' else max(concurrency, args.requests // 4)
+                    row = {'server': server, 'scenario': scenario, 'items': args.items,
+                           'latency_ms': args.latency_ms, 'concurrency': concurrency}
+                    row.update(await load(client, scenario, ids, count, concurrency, offset))
+                    offset += count
+                    rows.append(row)
+                    print(f"{server:<6} {scenario:<16} c={concurrency:<4} {row['throughput_rps']:9.1f} req/s  "
+                          f"p50 {row['p50_ms']:9.2f} ms  p99 {row['p99_ms']:9.2f} ms  errors {row['errors']}")
+    finally:
+        proc.terminate()
+        proc.wait()
+        if os.path.exists(ids_file):
+            os.remove(ids_file)
+    return rows
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Compare Flask (sync) and ASGI throughput under storage latency')
+    parser.add_argument('--items', type=int, default=1000, help='Index size')
+    parser.add_argument('--latency-ms', type=float, default=20.0, help='Delay added to every storage read and write')
+    parser.add_argument('--requests', type=int, default=400, help='Requests per read scenario')
+    parser.add_argument('--concurrency', default='1,16,64', help='Comma-separated concurrency levels')
+    parser.add_argument('--server', default='flask,asgi', help='Comma-separated: flask, asgi')
+    parser.add_argument('--output', default='benchmark-results-asgi.json', help='JSON results file')
+    parser.add_argument('--serve', help=argparse.SUPPRESS)
+    parser.add_argument('--port', type=int, help=argparse.SUPPRESS)
+    parser.add_argument('--ids-file', help=argparse.SUPPRESS)
+    args = parser.parse_args(argv)
+
+    if args.serve:
+        return serve(args)
+
+    concurrencies = [int(c) for c in args.concurrency.split(',') if c]
+    results = []
+    for server in [s.strip() for s in args.server.split(',') if s.strip()]:
+        results.extend(asyncio.run(bench_server(server, args, concurrencies)))
+
+    with open(args.output, 'w') as f:
+        json.dump({'cpus': os.cpu_count(), 'results': results}, f, indent=2)
+    print(f"✓ Results written to {args.output}")
+
+if __name__ == '__main__':
+    main()
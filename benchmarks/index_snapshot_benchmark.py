@@ -0,0 +1,57 @@
+"""Compare the JSON index with the binary snapshot: bytes, encode and parse time
+
+Usage: python benchmarks/index_snapshot_benchmark.py [--items 10000,100000] [--repeat 5]
+
+Times are the best of --repeat runs. Bytes are what a reader downloads
+(gzip shown for reference, as S3 stores both uncompressed).
+"""
+import argparse
+import gzip
+import hashlib
+import json
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'backend'))
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+import index_snapshot
+from synthetic import synthetic_items
+
+def best(func, repeat):
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        times.append(time.perf_counter() - start)
+    return min(times)
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Benchmark the index snapshot against JSON')
+    parser.add_argument('--items', default='10000,100000', help='Comma-separated index sizes')
+    parser.add_argument('--repeat', type=int, default=5, help='Runs per measurement; the best is kept')
+    args = parser.parse_args(argv)
+
+    print(f"{'items':>7}  {'format':<9} {'bytes':>12} {'gzip':>11} {'encode ms':>10} {'parse ms':>9}")
+    for size in [int(s) for s in args.items.split(',') if s]:
+        index = {'items': synthetic_items(size), 'updated_at': '2025-01-01T00:00:00'}
+
+        body = json.dumps(index, indent=2).encode('utf-8')
+        snapshot = index_snapshot.encode(index, hashlib.md5(body).hexdigest())
+        assert index_snapshot.decode(snapshot) == index
+
+        rows = [
+            ('json', body, lambda: json.dumps(index, indent=2).encode('utf-8'), lambda: json.loads(body)),
+            ('snapshot', snapshot, lambda: index_snapshot.encode(index), lambda: index_snapshot.decode(snapshot)),
+        ]
+        parse_times = {}
+        for name, data, encode, parse in rows:
+            parse_times[name] = best(parse, args.repeat)
+            print(f"{size:>7}  {name:<9} {len(data):>12,} {len(gzip.compress(data, 1)):>11,} "
+                  f"{best(encode, args.repeat) * 1000:>10.1f} {parse_times[name] * 1000:>9.1f}")
+        print(f"{'':>7}  snapshot is {len(body) / len(snapshot):.1f}x smaller, "
+              f"parses {parse_times['json'] / parse_times['snapshot']:.2f}x as fast")
+
+if __name__ == '__main__':
+    main()
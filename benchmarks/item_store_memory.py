@@ -0,0 +1,41 @@
+"""Compare memory of the index as parsed dicts vs the columnar ItemStore
+
+The ItemStore is what the api/metadata.py function keeps between requests.
+
+Usage: python benchmarks/item_store_memory.py [count]
+"""
+import gc
+import json
+import sys
+import tracemalloc
+
+from synthetic import synthetic_items
+from item_store import ItemStore
+
+def measure(build):
+    """Return (result, bytes still allocated by build())"""
+    gc.collect()
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+    result = build()
+    gc.collect()
+    after = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    return result, after - before
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 100_000
+    payload = json.dumps({'items': synthetic_items(count)}, indent=2)
+
+    items, dict_bytes = measure(lambda: json.loads(payload)['items'])
+    del items
+    store, store_bytes = measure(lambda: ItemStore.from_items(json.loads(payload)['items']))
+
+    mb = 1024 * 1024
+    print(f"items:            {count}")
+    print(f"list of dicts:    {dict_bytes / mb:8.1f} MB")
+    print(f"ItemStore:        {store_bytes / mb:8.1f} MB")
+    print(f"ratio:            {dict_bytes / store_bytes:8.1f}x")
+
+if __name__ == '__main__':
+    main()
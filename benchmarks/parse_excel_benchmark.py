@@ -0,0 +1,107 @@
+"""Benchmark streaming Excel ingestion on a generated workbook
+
+Usage: python benchmarks/parse_excel_benchmark.py [rows] [--full] [--sheets N] [--workers N]
+
+--full also times a full-mode load (the old parse_excel behaviour) for comparison.
+--sheets spreads the rows over N data sheets and also times parse_excel_parallel;
+speedup is bounded by the number of cores (os.cpu_count()).
+"""
+import os
+import random
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+
+import openpyxl
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'backend'))
+
+from master_data import MASTER_DATA
+from parse_excel import OptionCollector, iter_sheet_items, parse_excel_parallel, stream_excel, write_outputs
+
+HEADERS = ['Timestamp', 'Email Address', 'Vertical', 'Category', 'Subject', 'Content Type',
+           'Sub Category', 'Video Link', 'Edit Status']
+
+def generate_workbook(path, rows, seed=42, sheets=1):
+    """Write data sheets shaped like the legacy dashboard export (Sheet1, Sheet2, ...)"""
+    rng = random.Random(seed)
+    verticals = list(MASTER_DATA)
+    wb = openpyxl.Workbook(write_only=True)
+    per_sheet = -(-rows // sheets)
+    for i in range(rows):
+        if i % per_sheet == 0:
+            ws = wb.create_sheet(f"Sheet{i // per_sheet + 1}")
+            ws.append(HEADERS)
+        vertical = rng.choice(verticals)
+        ws.append([
+            f"2025-01-{i % 28 + 1:02d} 10:00:00",
+            f"editor{rng.randrange(200)}@adda247.com",
+            vertical,
+            rng.choice(MASTER_DATA[vertical]['exams']),
+            rng.choice(MASTER_DATA[vertical]['subjects']),
+            rng.choice(['Content', 'Exam_Information', 'Motivational_or_Fun']),
+            rng.choice(['Conceptual Insights', 'Tips & Tricks / Shortcuts', '']),
+            f"https://youtube.com/shorts/{i:011d}",
+            rng.choice(['Draft', 'Final', 'Published']),
+        ])
+    wb.save(path)
+
+def run_mode(mode, path, out_dir, workers=None):
+    """Parse in this process and print elapsed time and peak RSS"""
+    start = time.perf_counter()
+    if mode == 'streaming':
+        # One process, every sheet in turn
+        options = OptionCollector()
+        wb = openpyxl.load_workbook(path, read_only=True)
+        sheet_names = wb.sheetnames
+        wb.close()
+        count = write_outputs((item for name in sheet_names for item in stream_excel(path, options, sheet_name=name)), out_dir)
+    elif mode == 'parallel':
+        count = parse_excel_parallel(path, workers=int(workers) if workers else None, out_dir=out_dir)['items']
+    else:
+        wb = openpyxl.load_workbook(path)
+        count = len(list(iter_sheet_items(wb['Sheet1'], OptionCollector())))
+    elapsed = time.perf_counter() - start
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+    if mode == 'parallel':
+        # Workers are separate processes
+        peak = max(peak, resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss / 1024)
+    print(f"{mode:<10} {count:>9} rows  {elapsed:7.2f} s  {count / elapsed:9.0f} rows/s  peak RSS {peak:8.1f} MB")
+
+def main():
+    if sys.argv[1:2] == ['--run']:
+        run_mode(*sys.argv[2:6])
+        return
+
+    argv = sys.argv[1:]
+    options = {}
+    for flag in ('--sheets', '--workers'):
+        if flag in argv:
+            i = argv.index(flag)
+            options[flag] = argv[i + 1]
+            del argv[i:i + 2]
+    args = [a for a in argv if not a.startswith('--')]
+    rows = int(args[0]) if args else 200_000
+    sheets = int(options.get('--sheets', 1))
+    workers = options.get('--workers', '')
+    modes = ['streaming']
+    if sheets > 1:
+        modes.append('parallel')
+    if '--full' in argv:
+        modes.append('full')
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, 'bench.xlsx')
+        generate_workbook(path, rows, sheets=sheets)
+        print(f"workbook: {rows} rows in {sheets} sheet(s), {os.path.getsize(path) / 1024 / 1024:.1f} MB, "
+              f"{os.cpu_count()} CPU(s)")
+
+        # Each mode runs in a fresh process so peak RSS is not shared
+        for mode in modes:
+            subprocess.run([sys.executable, __file__, '--run', mode, path, os.path.join(tmp, 'out'), workers], check=True)
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,210 @@
+"""Performance regression gate
+
+Usage:
+    python benchmarks/perf_gate.py record [--set-baseline]     run the suite and store it under HEAD
+    python benchmarks/perf_gate.py check [--baseline COMMIT]   run, store, compare; exit 1 on regression
+    python benchmarks/perf_gate.py compare OLD NEW             compare two stored runs
+    python benchmarks/perf_gate.py baseline [COMMIT]           show or set the baseline commit
+    python benchmarks/perf_gate.py list                        list stored runs
+
+Runs api_benchmark against the in-memory S3 stand-in, so it needs no
+network. Results are kept in .perf-baselines.json keyed by git commit
+(with a -dirty suffix for uncommitted changes). A row regresses when p50
+or p99 latency grows, or throughput drops, by more than the tolerance and
+by more than --min-ms; new errors always regress. Use --repeat to take
+the median of several runs on noisy machines.
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+from datetime import datetime
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+import api_benchmark
+
+ROOT = api_benchmark.ROOT
+BASELINE_FILE = os.path.join(ROOT, '.perf-baselines.json')
+DEFAULT_TARGETS = 'core,flask'
+METRICS = ('p50_ms', 'p99_ms', 'throughput_rps')
+
+def load(path):
+    if os.path.exists(path):
+        with open(path) as f:
+            return json.load(f)
+    return {'baseline': None, 'runs': {}}
+
+def save(path, data):
+    tmp = f"{path}.tmp"
+    with open(tmp, 'w') as f:
+        json.dump(data, f, indent=2)
+    os.replace(tmp, path)
+
+def commit_key():
+    """HEAD commit, suffixed with -dirty when tracked files have uncommitted changes"""
+    commit = api_benchmark.git_commit() or 'unknown'
+    try:
+        dirty = subprocess.run(['git', 'status', '--porcelain', '--untracked-files=no'], cwd=ROOT,
+                               capture_output=True, text=True, check=True).stdout.strip()
+    except Exception:
+        dirty = ''
+    return f"{commit}-dirty" if dirty else commit
+
+def row_key(row):
+    return (row['target'], row['scenario'], row['items'], row['concurrency'])
+
+def run_suite(args, log=print):
+    """Run the benchmark args.repeat times and keep the median of each metric per row"""
+    sizes = [int(s) for s in args.items.split(',') if s]
+    targets = [t.strip() for t in args.target.split(',') if t.strip()]
+    runs = [api_benchmark.run(sizes, targets, args.requests, args.write_requests, args.concurrency, log=log)
+            for _ in range(args.repeat)]
+
+    results = []
+    for rows in zip(*runs):
+        merged = dict(rows[0])
+        for metric in METRICS + ('mean_ms',):
+            merged[metric] = round(statistics.median(r[metric] for r in rows), 3)
+        merged['errors'] = max(r['errors'] for r in rows)
+        results.append(merged)
+    return {
+        'config': {'items': sizes, 'targets': targets, 'requests': args.requests, 'write_requests': args.write_requests,
+                   'concurrency': args.concurrency, 'repeat': args.repeat},
+        'cpus': os.cpu_count(),
+        'results': results
+    }
+
+def compare(old, new, tolerance, min_ms):
+    """Compare two runs; returns (table rows, regression count)"""
+    old_rows = {row_key(r): r for r in old['results']}
+    table = []
+    regressions = 0
+    for row in new['results']:
+        base = old_rows.get(row_key(row))
+        if base is None:
+            table.append((row, None, {}, 'new'))
+            continue
+        changes = {}
+        regressed = row['errors'] > base['errors']
+        for metric in METRICS:
+            before, after = base[metric], row[metric]
+            changes[metric] = (after - before) / before if before else 0.0
+            if metric == 'throughput_rps':
+                # Throughput is derived from latency, so apply the same noise floor via the mean
+                worse = after < before * (1 - tolerance) and row['mean_ms'] - base['mean_ms'] > min_ms
+            else:
+                worse = after > before * (1 + tolerance) and after - before > min_ms
+            regressed = regressed or worse
+        regressions += regressed
+        table.append((row, base, changes, 'REGRESSED' if regressed else 'ok'))
+    return table, regressions
+
+def format_table(table):
+    lines = [f"{'target':<7} {'scenario':<21} {'items':>7}  {'p50 ms':>17}  {'p99 ms':>17}  {'req/s':>19}  status"]
+    for row, base, changes, status in table:
+        cells = []
+        for metric in METRICS:
+            if base is None:
+                cells.append(f"{row[metric]:>10.2f}" + ' ' * (9 if metric == 'throughput_rps' else 7))
+            else:
+                width = 10 if metric == 'throughput_rps' else 8
+                cells.append(f"{row[metric]:>{width}.2f} {changes[metric]:>+7.1%}")
+        lines.append(f"{row['target']:<7} {row['scenario']:<21} {row['items']:>7}  {cells[0]:>17}  {cells[1]:>17}  "
+                     f"{cells[2]:>19}  {status}")
+    return '\n'.join(lines)
+
+def add_run_args(parser):
+    parser.add_argument('--items', default='1000,10000', help='Comma-separated index sizes')
+    parser.add_argument('--target', default=DEFAULT_TARGETS, help='Comma-separated: core, flask, vercel')
+    parser.add_argument('--requests', type=int, default=200, help='Requests per read scenario')
+    parser.add_argument('--write-requests', type=int, default=20, help='Requests per write scenario')
+    parser.add_argument('--concurrency', type=int, default=4, help='Concurrent requests')
+    parser.add_argument('--repeat', type=int, default=1, help='Runs per row; the median is kept')
+
+def add_compare_args(parser):
+    parser.add_argument('--tolerance', type=float, default=0.25, help='Allowed relative slowdown (0.25 = 25%%)')
+    parser.add_argument('--min-ms', type=float, default=1.0, help='Ignore latency changes smaller than this')
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Benchmark regression gate')
+    parser.add_argument('--file', default=BASELINE_FILE, help='Baseline file')
+    commands = parser.add_subparsers(dest='command', required=True)
+
+    record = commands.add_parser('record', help='Run the suite and store it under the current commit')
+    add_run_args(record)
+    record.add_argument('--set-baseline', action='store_true', help='Also make this run the baseline')
+
+    check = commands.add_parser('check', help='Run the suite and compare it with the baseline')
+    add_run_args(check)
+    add_compare_args(check)
+    check.add_argument('--baseline', help='Commit to compare with (default: the stored baseline)')
+
+    compare_cmd = commands.add_parser('compare', help='Compare two stored runs')
+    compare_cmd.add_argument('old')
+    compare_cmd.add_argument('new')
+    add_compare_args(compare_cmd)
+
+    baseline = commands.add_parser('baseline', help='Show or set the baseline commit')
+    baseline.add_argument('commit', nargs='?')
+
+    commands.add_parser('list', help='List stored runs')
+
+    args = parser.parse_args(argv)
+    data = load(args.file)
+
+    def find(prefix):
+        if prefix in data['runs']:
+            return prefix
+        matches = [key for key in data['runs'] if key.startswith(prefix)]
+        if len(matches) != 1:
+            parser.error(f"{'No' if not matches else 'Ambiguous'} stored run for {prefix}")
+        return matches[0]
+
+    if args.command == 'list':
+        for key, run in data['runs'].items():
+            marker = '*' if key == data['baseline'] else ' '
+            print(f"{marker} {key}  {run['created_at']}  {run['config']}")
+        return 0
+
+    if args.command == 'baseline':
+        if args.commit:
+            data['baseline'] = find(args.commit)
+            save(args.file, data)
+        print(data['baseline'] or 'No baseline set')
+        return 0
+
+    if args.command == 'compare':
+        old, new = data['runs'][find(args.old)], data['runs'][find(args.new)]
+        table, regressions = compare(old, new, args.tolerance, args.min_ms)
+        print(format_table(table))
+        return 1 if regressions else 0
+
+    key = commit_key()
+    run = run_suite(args)
+    run['created_at'] = datetime.now().isoformat()
+    data['runs'][key] = run
+    if args.command == 'record' and (args.set_baseline or not data['baseline']):
+        data['baseline'] = key
+    save(args.file, data)
+    print(f"✓ Stored run for {key}")
+    if args.command == 'record':
+        return 0
+
+    base_key = find(args.baseline) if args.baseline else data['baseline']
+    if not base_key or base_key == key:
+        print("No other baseline to compare with; run 'record --set-baseline' on the reference commit first")
+        return 0
+    table, regressions = compare(data['runs'][base_key], run, args.tolerance, args.min_ms)
+    print(f"\nBaseline {base_key} vs {key} (tolerance {args.tolerance:.0%}, min {args.min_ms} ms)\n")
+    print(format_table(table))
+    if regressions:
+        print(f"\n✗ {regressions} regression(s)")
+        return 1
+    print("\n✓ No regressions")
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,129 @@
+"""S3 requests per second with and without request coalescing
+
+Usage:
+    python benchmarks/single_flight_benchmark.py [--items 10000] [--concurrency 200] [--seconds 5]
+                                                 [--latency-ms 20] [--change-ms 500]
+
+--concurrency threads call into one process for --seconds each, against
+the in-memory S3 stand-in with --latency-ms added to every GET and HEAD.
+Another host rewrites the index every --change-ms, so cached copies keep
+going stale.
+
+- get_index: every call reads the whole index (the write path).
+- replica: every call refreshes the host replica and counts items, as
+  /api/metadata does.
+
+"before" turns SINGLE_FLIGHT off and makes every reader refresh the
+replica itself. "after" is the default: identical GETs/HEADs share one
+request, and readers use the loaded replica while one thread refreshes.
+"""
+import argparse
+import os
+import sys
+import tempfile
+import threading
+import time
+from datetime import datetime
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from api_benchmark import ROOT, seed
+
+sys.path.insert(0, os.path.join(ROOT, 'backend'))
+
+import storage
+import item_replica
+from synthetic import synthetic_items
+
+class SlowS3Client(storage.MemoryS3Client):
+    """In-memory store with a fixed delay per read, counting GETs and HEADs"""
+
+    def __init__(self, latency):
+        super().__init__()
+        self.latency = latency
+        self.calls = {'get': 0, 'head': 0}
+
+    def _count(self, operation):
+        with self.lock:
+            self.calls[operation] += 1
+        time.sleep(self.latency)
+
+    def get_object(self, Bucket, Key, **kwargs):
+        self._count('get')
+        return super().get_object(Bucket, Key, **kwargs)
+
+    def head_object(self, Bucket, Key, **kwargs):
+        self._count('head')
+        response = super().get_object(Bucket, Key)
+        del response['Body']
+        return response
+
+def run(call, args, client, items):
+    """Run call() from --concurrency threads for --seconds; returns (calls/s, GET/s, HEAD/s)"""
+    stop = threading.Event()
+    done = [0] * args.concurrency
+
+    def reader(n):
+        while not stop.is_set():
+            call()
+            done[n] += 1
+
+    def other_host():
+        # Written straight to the bucket, like a write from another host
+        while not stop.wait(args.change_ms / 1000):
+            body = storage._dump_json({'items': items, 'updated_at': datetime.now().isoformat()})
+            storage.MemoryS3Client.put_object(client, Bucket=storage.S3_BUCKET_NAME, Key=storage.INDEX_KEY, Body=body)
+
+    client.calls = {'get': 0, 'head': 0}
+    threads = [threading.Thread(target=reader, args=(n,)) for n in range(args.concurrency)]
+    threads.append(threading.Thread(target=other_host))
+    start = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    time.sleep(args.seconds)
+    stop.set()
+    for thread in threads:
+        thread.join()
+    wall = time.perf_counter() - start
+    return sum(done) / wall, client.calls['get'] / wall, client.calls['head'] / wall
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Measure S3 request rates with and without single-flight')
+    parser.add_argument('--items', type=int, default=10000)
+    parser.add_argument('--concurrency', type=int, default=200)
+    parser.add_argument('--seconds', type=float, default=5)
+    parser.add_argument('--latency-ms', type=float, default=20)
+    parser.add_argument('--change-ms', type=float, default=500)
+    args = parser.parse_args(argv)
+
+    items = synthetic_items(args.items)
+    client = SlowS3Client(args.latency_ms / 1000)
+    seed(client, items, 0)
+    # The snapshot is left out so both modes read the same JSON
+    storage.INDEX_SNAPSHOT = False
+    replica = item_replica.ItemReplica(os.path.join(tempfile.mkdtemp(), 'items.sqlite3'))
+    replica.refresh()
+
+    def replica_before():
+        replica._refresh()
+        replica.count()
+
+    def replica_after():
+        replica.refresh(wait=False)
+        replica.count()
+
+    scenarios = {
+        'get_index': (storage.get_index, storage.get_index),
+        'replica': (replica_before, replica_after),
+    }
+    print(f"{args.items} items, {args.concurrency} threads, {args.latency_ms:g} ms per S3 read, "
+          f"index changes every {args.change_ms:g} ms")
+    print(f"{'scenario':<10} {'mode':<7} {'calls/s':>9} {'GET/s':>8} {'HEAD/s':>8}")
+    for name, (before, after) in scenarios.items():
+        for mode, call in (('before', before), ('after', after)):
+            storage.SINGLE_FLIGHT = mode == 'after'
+            rate, gets, heads = run(call, args, client, items)
+            print(f"{name:<10} {mode:<7} {rate:>9.1f} {gets:>8.1f} {heads:>8.1f}")
+
+if __name__ == '__main__':
+    main()
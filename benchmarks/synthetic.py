@@ -0,0 +1,40 @@
+"""Synthetic items for the benchmarks, shaped like the ones create_item writes"""
+import os
+import random
+import sys
+import uuid
+from datetime import datetime, timedelta
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'backend'))
+
+from master_data import MASTER_DATA, get_content_subcategories
+
+def synthetic_items(count, seed=42):
+    """Generate items shaped like the ones create_item writes"""
+    rng = random.Random(seed)
+    verticals = list(MASTER_DATA)
+    creators = [f"editor{i}@adda247.com" for i in range(200)]
+    start = datetime(2025, 1, 1)
+    items = []
+    for _ in range(count):
+        vertical = rng.choice(verticals)
+        youtube_id = ''.join(rng.choice('abcdefghijklmnopqrstuvwxyzABCDEFGHIJKLMNOPQRSTUVWXYZ0123456789_-') for _ in range(11))
+        creator = rng.choice(creators)
+        created_at = (start + timedelta(seconds=rng.randrange(365 * 86400))).isoformat()
+        items.append({
+            'id': str(uuid.UUID(int=rng.getrandbits(128))),
+            'email': creator,
+            'verificationLink': f"https://youtube.com/shorts/{youtube_id}",
+            'youtube_id': youtube_id,
+            'contentType': rng.choice(['Content', 'Exam_Information', 'Motivational_or_Fun']),
+            'vertical': vertical,
+            'exam': rng.choice(MASTER_DATA[vertical]['exams']),
+            'subject': rng.choice(MASTER_DATA[vertical]['subjects']),
+            'status': rng.choice(['Draft', 'Pending', 'Final', 'Published', 'Re-edit']),
+            'contentSubcategory': rng.choice(['', *get_content_subcategories()]),
+            'files': [],
+            'videoFile': None,
+            'created_by': creator,
+            'created_at': created_at,
+        })
+    return items
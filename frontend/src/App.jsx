@@ -1,4 +1,4 @@
-import React, { useState, useEffect } from 'react'
+import React, { useState, useEffect, useRef } from 'react'
 import axios from 'axios'
 
 // API routes now on same domain - no VITE_API_URL needed!
@@ -39,6 +39,8 @@ function App() {
     exam: '', subject: '', status: '', contentSubcategory: '', driveLink: '', videoFile: null, files: []
   })
   const [linkVerified, setLinkVerified] = useState(false)
+  // One Idempotency-Key per new entry, reused when saving it again after an error or timeout
+  const createKey = useRef(null)
 
   useEffect(() => {
     const initAuth = async () => {
@@ -198,12 +200,15 @@ function App() {
           }
         })
       } else {
+        createKey.current = createKey.current || crypto.randomUUID()
         await axios.post(`${API_BASE}/item`, payload, {
           headers: { 
             'Content-Type': 'application/json',
-            'X-User-Email': userEmail
+            'X-User-Email': userEmail,
+            'Idempotency-Key': createKey.current
           }
         })
+        createKey.current = null
       }
       
       setShowAddModal(false)
@@ -401,7 +406,7 @@ function App() {
           <h1 className="text-4xl font-bold text-white mb-6">Build the Feed</h1>
           <div className="flex flex-wrap justify-center gap-3">
             <button
-              onClick={() => { setEditingItem(null); setShowAddModal(true) }}
+              onClick={() => { setEditingItem(null); createKey.current = null; setShowAddModal(true) }}
               className="px-6 py-3 bg-white text-red-600 rounded-full font-medium hover:bg-gray-50 transition shadow-lg inline-flex items-center gap-2"
             >
               <span className="text-lg">+</span> Add New Entry
@@ -0,0 +1,196 @@
+"""Import legacy dashboard rows straight into storage
+
+Usage:
+    python import_excel.py <workbook.xlsx | items.ndjson> [--workers 16] [--batch-size 1000]
+                           [--checkpoint .import-checkpoint.json] [--dry-run]
+
+Rows are mapped to the item schema create_item writes, deduplicated by
+youtube_id against the live index, and written as item objects (at their
+KEY_LAYOUT key) through a thread pool. The index is committed once at the end,
+then the stats rollup is brought up to it.
+
+Progress is checkpointed after every batch. Written items go to a journal
+next to the checkpoint, so an interrupted import resumes where it stopped.
+Item ids are derived from the source row, so rewriting a batch is harmless.
+Set STORAGE_BACKEND=local to import into a local directory.
+"""
+import argparse
+import json
+import os
+import sys
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from itertools import islice
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), 'backend'))
+
+from parse_excel import stream_excel
+from master_data import normalize_selection, normalize_vertical
+from storage import get_index, update_index, record_stats, save_item
+from youtube import extract_youtube_id
+
+def read_rows(path):
+    """Yield legacy rows from a workbook or from parse_excel's items.ndjson"""
+    if path.endswith('.ndjson'):
+        with open(path) as f:
+            for line in f:
+                if line.strip():
+                    yield json.loads(line)
+    else:
+        yield from stream_excel(path)
+
+def legacy_to_item(row, item_id):
+    """Map a legacy row (category/type/links) to the current item schema"""
+    link = next((l for l in row.get('links', []) if l), '')
+    vertical = row.get('vertical', '')
+    exam = row.get('category', '')
+    subject = row.get('subject', '')
+    try:
+        vertical, exam, subject = normalize_selection(vertical, exam, subject)
+    except ValueError:
+        # Legacy rows may predate master data; keep their values
+        vertical = normalize_vertical(vertical) or vertical
+
+    email = row.get('email', '')
+    return {
+        'id': item_id,
+        'email': email,
+        'verificationLink': link,
+        'youtube_id': extract_youtube_id(link) if link else None,
+        'contentType': row.get('type', ''),
+        'vertical': vertical,
+        'exam': exam,
+        'subject': subject,
+        'status': row.get('status', ''),
+        'contentSubcategory': row.get('subcategory', ''),
+        'files': [],
+        'videoFile': None,
+        'created_by': email,
+        'created_at': row.get('created_at') or datetime.now().isoformat()
+    }
+
+def item_id_for(source, row):
+    """Stable item id for a source row so retries overwrite instead of duplicating"""
+    return str(uuid.uuid5(uuid.NAMESPACE_URL, f"yt-sprint-import:{source}:{row.get('id')}"))
+
+def load_checkpoint(path, source):
+    """Load checkpoint and journalled items for this source (fresh state otherwise)"""
+    checkpoint = {'source': source, 'rows_done': 0, 'done': False}
+    if path and os.path.exists(path):
+        with open(path) as f:
+            saved = json.load(f)
+        if saved.get('source') == source:
+            checkpoint = saved
+    items = []
+    journal = f"{path}.items.ndjson" if path else None
+    if journal and os.path.exists(journal) and checkpoint['rows_done']:
+        with open(journal) as f:
+            items = [json.loads(line) for line in f if line.strip()]
+    elif journal and os.path.exists(journal):
+        os.remove(journal)
+    return checkpoint, items
+
+def save_checkpoint(path, checkpoint, new_items):
+    """Append written items to the journal, then record progress"""
+    if not path:
+        return
+    with open(f"{path}.items.ndjson", 'a') as f:
+        for item in new_items:
+            f.write(json.dumps(item) + '\n')
+    tmp = f"{path}.tmp"
+    with open(tmp, 'w') as f:
+        json.dump(checkpoint, f)
+    os.replace(tmp, path)
+
+def import_rows(rows, source, workers=16, batch_size=1000, checkpoint_path=None, dry_run=False, log=print):
+    """Import legacy rows; returns a summary dict"""
+    checkpoint, imported = load_checkpoint(checkpoint_path, source)
+    summary = {'rows': checkpoint['rows_done'], 'imported': len(imported), 'duplicates': 0, 'committed': 0}
+    if checkpoint['done']:
+        log("Import already completed for this source")
+        return summary
+
+    index = get_index()
+    seen = {i.get('youtube_id') for i in index.get('items', []) if i.get('youtube_id')}
+    seen.update(i['youtube_id'] for i in imported if i.get('youtube_id'))
+
+    rows = iter(rows)
+    # Skip rows finished by a previous run
+    for _ in islice(rows, checkpoint['rows_done']):
+        pass
+
+    processed = 0
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        while True:
+            batch = list(islice(rows, batch_size))
+            if not batch:
+                break
+
+            items = []
+            for row in batch:
+                item = legacy_to_item(row, item_id_for(source, row))
+                if item['youtube_id'] and item['youtube_id'] in seen:
+                    summary['duplicates'] += 1
+                    continue
+                if item['youtube_id']:
+                    seen.add(item['youtube_id'])
+                items.append(item)
+
+            if not dry_run and not all(pool.map(save_item, items)):
+                raise RuntimeError(f"Failed to write items after row {checkpoint['rows_done']}; rerun to resume")
+
+            checkpoint['rows_done'] += len(batch)
+            processed += len(batch)
+            summary['rows'] = checkpoint['rows_done']
+            summary['imported'] += len(items)
+            imported.extend(items)
+            if not dry_run:
+                save_checkpoint(checkpoint_path, checkpoint, items)
+
+            elapsed = time.perf_counter() - start
+            log(f"{summary['rows']} rows, {summary['imported']} items, {summary['duplicates']} duplicates "
+                f"({processed / elapsed:.0f} rows/s)")
+
+    if dry_run:
+        return summary
+
+    # Single index commit; skip items a previous run already committed
+    index = get_index()
+    before = index.get('updated_at')
+    existing_ids = {i.get('id') for i in index.get('items', [])}
+    new_items = [i for i in imported if i['id'] not in existing_ids]
+    if new_items:
+        index['items'].extend(new_items)
+        if not update_index(index):
+            raise RuntimeError("Failed to commit index; rerun to retry the commit")
+    # After the index: a rerun finds its items committed and only brings the rollup up to it
+    if not record_stats(index, before, added=new_items):
+        raise RuntimeError("Failed to update stats; rerun to retry")
+    summary['committed'] = len(new_items)
+
+    checkpoint['done'] = True
+    save_checkpoint(checkpoint_path, checkpoint, [])
+    return summary
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Import legacy dashboard rows into storage')
+    parser.add_argument('source', help='Workbook (.xlsx) or parse_excel items.ndjson')
+    parser.add_argument('--workers', type=int, default=16, help='Parallel object writes')
+    parser.add_argument('--batch-size', type=int, default=1000, help='Rows per checkpoint')
+    parser.add_argument('--checkpoint', default='.import-checkpoint.json', help='Checkpoint file for resuming')
+    parser.add_argument('--dry-run', action='store_true', help='Map and dedupe without writing')
+    args = parser.parse_args(argv)
+
+    source = os.path.basename(args.source)
+    start = time.perf_counter()
+    summary = import_rows(read_rows(args.source), source, args.workers, args.batch_size, args.checkpoint, args.dry_run)
+    elapsed = time.perf_counter() - start
+
+    print(f"✓ {summary['imported']} items imported, {summary['duplicates']} duplicates skipped, "
+          f"{summary['committed']} added to index in {elapsed:.1f}s")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,73 @@
+"""Move item objects to the key layout set by KEY_LAYOUT
+
+Usage:
+    KEY_LAYOUT=hashed python migrate_keys.py [--workers 32] [--dry-run]
+
+Lists metadata/items/ in parallel key ranges and moves every item object
+whose key isn't its key in KEY_LAYOUT (see backend/key_layout.py): a
+server-side copy to the new key, then a delete of the old one. If the
+app already wrote the item at its new key, that copy is newer and the
+old key is only deleted.
+
+The app keeps serving while this runs: deployed with the same KEY_LAYOUT
+it reads an item's old key while the new one is missing, and its writes
+go to the new key and delete the old one. Safe to rerun; once a run has
+nothing left to move, set KEY_LAYOUT_PREVIOUS=none.
+Set STORAGE_BACKEND=local to migrate a local directory.
+"""
+import argparse
+import os
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), 'backend'))
+
+import key_layout
+from key_layout import item_id_of, item_key
+from storage import copy_object, delete_object, list_item_keys, object_exists
+
+def move_key(source, target):
+    """Move one object; returns 'moved', 'superseded' (target already written) or 'failed'"""
+    outcome = 'superseded' if object_exists(target) else 'moved'
+    if outcome == 'moved' and not copy_object(source, target):
+        return 'failed'
+    return outcome if delete_object(source) else 'failed'
+
+def migrate_keys(workers=32, dry_run=False, log=print):
+    """Move item objects to their KEY_LAYOUT keys; returns a summary dict"""
+    start = time.perf_counter()
+    keys = list_item_keys(workers)
+    moves = [(key, item_key(item_id_of(key))) for key in keys]
+    moves = [(source, target) for source, target in moves if source != target]
+    log(f"Listed {len(keys)} item objects, {len(moves)} not at their {key_layout.KEY_LAYOUT} key, "
+        f"in {time.perf_counter() - start:.1f}s")
+
+    summary = {'items': len(keys), 'moved': 0, 'superseded': 0, 'failed': 0}
+    if dry_run:
+        summary['moved'] = len(moves)
+        return summary
+
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        for outcome in pool.map(lambda move: move_key(*move), moves):
+            summary[outcome] += 1
+    return summary
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Move item objects to the KEY_LAYOUT key layout')
+    parser.add_argument('--workers', type=int, default=32, help='Parallel list, copy and delete requests')
+    parser.add_argument('--dry-run', action='store_true', help='Count the keys to move without moving them')
+    args = parser.parse_args(argv)
+
+    start = time.perf_counter()
+    summary = migrate_keys(args.workers, args.dry_run)
+    elapsed = time.perf_counter() - start
+
+    print(f"✓ {summary['items']} item objects, {summary['moved']} "
+          f"{'to move (dry run)' if args.dry_run else 'moved'} to the {key_layout.KEY_LAYOUT} layout: "
+          f"{summary['superseded']} already rewritten by the app, {summary['failed']} failed, in {elapsed:.1f}s")
+    if summary['failed']:
+        sys.exit(1)
+
+if __name__ == '__main__':
+    main()
@@ -1,26 +1,26 @@
 import openpyxl
 import json
 import os
+import time
+import argparse
+from concurrent.futures import ProcessPoolExecutor
 from datetime import datetime
 
-def parse_excel(filepath):
-    """Parse Excel file and extract data model + credentials"""
-    
-    wb = openpyxl.load_workbook(filepath)
-    
-    # Parsing log
-    log = []
-    log.append(f"=== Excel Parse Log - {datetime.now()} ===\n")
-    log.append(f"Sheets found: {wb.sheetnames}\n")
-    
-    # Try to find S3 credentials in sheets
+CREDENTIAL_SHEETS = ['s3', 'credentials', 'config', 'secrets']
+
+def open_workbook(filepath):
+    """Open a workbook in streaming mode (rows are read lazily, cells are not kept)"""
+    return openpyxl.load_workbook(filepath, read_only=True, data_only=True)
+
+def read_credentials(wb, log):
+    """Find S3 credentials in a credential sheet, falling back to environment variables"""
     credentials = {}
     for sheet_name in wb.sheetnames:
-        if sheet_name.lower() in ['s3', 'credentials', 'config', 'secrets']:
+        if sheet_name.lower() in CREDENTIAL_SHEETS:
             ws = wb[sheet_name]
             log.append(f"Found potential credential sheet: {sheet_name}\n")
             for row in ws.iter_rows(values_only=True):
-                if row[0] and len(row) > 1:
+                if row and row[0] and len(row) > 1:
                     key = str(row[0]).lower().strip()
                     value = str(row[1]).strip() if row[1] else ""
                     if 'access' in key and 'key' in key:
@@ -31,7 +31,7 @@ def parse_excel(filepath):
                         credentials['AWS_REGION'] = value
                     elif 'bucket' in key:
                         credentials['S3_BUCKET_NAME'] = value
-    
+
     # Fallback: use environment variables
     if not credentials:
         log.append("No credential sheet found, using environment variables\n")
@@ -41,22 +41,17 @@ def parse_excel(filepath):
             'AWS_REGION': os.getenv('AWS_REGION', 'ap-south-1'),
             'S3_BUCKET_NAME': os.getenv('S3_BUCKET_NAME', 'your-bucket-name')
         }
-    
+
     # Mask secret key in log
     masked_secret = credentials['AWS_SECRET_ACCESS_KEY'][-4:].rjust(len(credentials['AWS_SECRET_ACCESS_KEY']), '*')
     log.append(f"AWS_ACCESS_KEY_ID: {credentials['AWS_ACCESS_KEY_ID']}\n")
     log.append(f"AWS_SECRET_ACCESS_KEY: {masked_secret}\n")
     log.append(f"AWS_REGION: {credentials['AWS_REGION']}\n")
     log.append(f"S3_BUCKET_NAME: {credentials['S3_BUCKET_NAME']}\n\n")
-    
-    # Parse main data sheet
-    ws = wb['Sheet1']
-    headers_raw = [cell.value for cell in ws[1]]
-    headers = [str(h).strip().lower().replace(' ', '_') if h else '' for h in headers_raw]
-    
-    log.append(f"Main sheet headers: {headers[:10]}\n")
-    
-    # Map columns
+    return credentials
+
+def map_columns(headers):
+    """Map item fields to column positions from normalised header names"""
     col_map = {}
     for i, h in enumerate(headers):
         if 'vertical' in h or 'exam' in h:
@@ -77,96 +72,296 @@ def parse_excel(filepath):
             col_map['status'] = i
         if 'videoid' in h:
             col_map['videoid'] = i
-    
-    # Parse rows
-    items = []
-    for row_idx, row in enumerate(ws.iter_rows(min_row=2, values_only=True), 2):
-        if not row[0]:  # Skip empty rows
-            continue
-            
-        item = {
-            'id': f"item_{row_idx}",
-            'vertical': str(row[col_map.get('vertical', 2)] or '').strip(),
-            'category': str(row[col_map.get('category', 3)] or '').strip(),
-            'subject': str(row[col_map.get('subject', 4)] or '').strip(),
-            'type': str(row[col_map.get('type', 5)] or '').strip(),
-            'subcategory': str(row[col_map.get('subcategory', 6)] or '').strip(),
-            'links': [str(row[col_map.get('link', 7)] or '').strip()],
-            'email': str(row[col_map.get('email', 1)] or '').strip(),
-            'status': str(row[col_map.get('status', 8)] or '').strip(),
-            'tags': [],
-            'files': [],
-            'created_at': datetime.now().isoformat()
-        }
-        items.append(item)
-    
-    log.append(f"Total items parsed: {len(items)}\n")
-    
-    # Extract unique values for dropdowns
-    verticals = sorted(list(set(item['vertical'] for item in items if item['vertical'])))
-    categories_by_vertical = {}
-    subcategories_by_category = {}
-    
-    for item in items:
+    return col_map
+
+def _cell(row, i):
+    # Read-only rows drop trailing empty cells
+    value = row[i] if i < len(row) else None
+    return str(value or '').strip()
+
+class OptionCollector:
+    """Collects dropdown options while items stream past"""
+
+    def __init__(self):
+        self.categories_by_vertical = {}
+        self.subcategories_by_category = {}
+
+    def add(self, item):
         v = item['vertical']
         c = item['category']
         s = item['subcategory']
-        
+
         if v:
-            if v not in categories_by_vertical:
-                categories_by_vertical[v] = set()
+            categories = self.categories_by_vertical.setdefault(v, set())
             if c:
-                categories_by_vertical[v].add(c)
-        
+                categories.add(c)
+
         if c:
-            if c not in subcategories_by_category:
-                subcategories_by_category[c] = set()
+            subcategories = self.subcategories_by_category.setdefault(c, set())
             if s:
-                subcategories_by_category[c].add(s)
-    
-    # Convert sets to sorted lists
-    for v in categories_by_vertical:
-        categories_by_vertical[v] = sorted(list(categories_by_vertical[v]))
-    for c in subcategories_by_category:
-        subcategories_by_category[c] = sorted(list(subcategories_by_category[c]))
-    
+                subcategories.add(s)
+
+    def update(self, other):
+        """Merge options collected elsewhere"""
+        for v, categories in other.categories_by_vertical.items():
+            self.categories_by_vertical.setdefault(v, set()).update(categories)
+        for c, subcategories in other.subcategories_by_category.items():
+            self.subcategories_by_category.setdefault(c, set()).update(subcategories)
+
+    def as_dict(self):
+        """Options as sorted lists"""
+        return {
+            'verticals': sorted(self.categories_by_vertical),
+            'categories_by_vertical': {v: sorted(c) for v, c in self.categories_by_vertical.items()},
+            'subcategories_by_category': {c: sorted(s) for c, s in self.subcategories_by_category.items()}
+        }
+
+def read_headers(ws):
+    """Normalised header names from the first row"""
+    header_row = next(ws.iter_rows(min_row=1, max_row=1, values_only=True), ())
+    return [str(h).strip().lower().replace(' ', '_') if h else '' for h in header_row]
+
+def iter_sheet_items(ws, options=None, log=None, min_row=2, max_row=None, id_prefix='item_'):
+    """Yield items from a data sheet one row at a time
+
+    Options are collected into `options` in the same pass.
+    """
+    headers = read_headers(ws)
+    col_map = map_columns(headers)
+    if log is not None:
+        log.append(f"Main sheet headers: {headers[:10]}\n")
+
+    created_at = datetime.now().isoformat()
+    for row_idx, row in enumerate(ws.iter_rows(min_row=min_row, max_row=max_row, values_only=True), min_row):
+        if not row or not row[0]:  # Skip empty rows
+            continue
+
+        item = {
+            'id': f"{id_prefix}{row_idx}",
+            'vertical': _cell(row, col_map.get('vertical', 2)),
+            'category': _cell(row, col_map.get('category', 3)),
+            'subject': _cell(row, col_map.get('subject', 4)),
+            'type': _cell(row, col_map.get('type', 5)),
+            'subcategory': _cell(row, col_map.get('subcategory', 6)),
+            'links': [_cell(row, col_map.get('link', 7))],
+            'email': _cell(row, col_map.get('email', 1)),
+            'status': _cell(row, col_map.get('status', 8)),
+            'tags': [],
+            'files': [],
+            'created_at': created_at
+        }
+        if options is not None:
+            options.add(item)
+        yield item
+
+def stream_excel(filepath, options=None, log=None, sheet_name='Sheet1'):
+    """Yield items from the main data sheet without loading the workbook into memory"""
+    wb = open_workbook(filepath)
+    try:
+        yield from iter_sheet_items(wb[sheet_name], options, log)
+    finally:
+        wb.close()
+
+def find_data_sheets(wb):
+    """Names of sheets whose headers look like dashboard rows (vertical + link columns)"""
+    names = []
+    for sheet_name in wb.sheetnames:
+        if sheet_name.lower() in CREDENTIAL_SHEETS:
+            continue
+        col_map = map_columns(read_headers(wb[sheet_name]))
+        if 'vertical' in col_map and 'link' in col_map:
+            names.append(sheet_name)
+    return names
+
+def plan_tasks(wb, sheet_names, chunk_rows=None):
+    """Split sheets into (sheet, min_row, max_row) tasks
+
+    Sheets longer than chunk_rows are split into row ranges when the sheet
+    reports its size. Read-only mode still scans the XML before min_row, so
+    splitting one sheet helps less than spreading many sheets.
+    """
+    tasks = []
+    for sheet_name in sheet_names:
+        max_row = wb[sheet_name].max_row
+        if not chunk_rows or not max_row or max_row <= chunk_rows + 1:
+            tasks.append((sheet_name, 2, None))
+            continue
+        for start in range(2, max_row + 1, chunk_rows):
+            tasks.append((sheet_name, start, min(start + chunk_rows - 1, max_row)))
+    return tasks
+
+def _parse_task(filepath, sheet_name, min_row, max_row, id_prefix, part_path):
+    """Worker: parse one sheet or row range, writing items to part_path if given"""
+    start = time.perf_counter()
+    options = OptionCollector()
+    wb = open_workbook(filepath)
+    try:
+        items = iter_sheet_items(wb[sheet_name], options, min_row=min_row, max_row=max_row, id_prefix=id_prefix)
+        if part_path:
+            count = 0
+            with open(part_path, 'w') as f:
+                for item in items:
+                    f.write(json.dumps(item) + '\n')
+                    count += 1
+            items = None
+        else:
+            items = list(items)
+            count = len(items)
+    finally:
+        wb.close()
+    return items, count, options, time.perf_counter() - start
+
+def _read_parts(paths):
+    for path in paths:
+        with open(path) as f:
+            for line in f:
+                yield json.loads(line)
+
+def parse_excel_parallel(filepath, sheet_names=None, workers=None, chunk_rows=None, out_dir=None):
+    """Parse data sheets (or row ranges) across processes
+
+    Results are merged in workbook order whatever order workers finish in.
+    Item ids are prefixed with the sheet name when more than one sheet is
+    parsed. With out_dir, workers stream to part files that are then merged
+    into index.json/items.ndjson and 'items' holds the item count instead of
+    the items.
+    """
+    wb = open_workbook(filepath)
+    try:
+        sheet_names = sheet_names or find_data_sheets(wb)
+        tasks = plan_tasks(wb, sheet_names, chunk_rows)
+    finally:
+        wb.close()
+
+    parts_dir = os.path.join(out_dir, 'parts') if out_dir else None
+    if parts_dir:
+        os.makedirs(parts_dir, exist_ok=True)
+
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        futures = []
+        for n, (sheet_name, min_row, max_row) in enumerate(tasks):
+            id_prefix = 'item_' if len(sheet_names) == 1 else f"{sheet_name}/item_"
+            part_path = os.path.join(parts_dir, f"{n:05d}.ndjson") if parts_dir else None
+            futures.append(pool.submit(_parse_task, filepath, sheet_name, min_row, max_row, id_prefix, part_path))
+        results = [future.result() for future in futures]
+
+    options = OptionCollector()
+    timings = []
+    items = []
+    for (sheet_name, min_row, max_row), (task_items, count, task_options, seconds) in zip(tasks, results):
+        options.update(task_options)
+        timings.append({'sheet': sheet_name, 'min_row': min_row, 'max_row': max_row, 'items': count, 'seconds': seconds})
+        if task_items is not None:
+            items.extend(task_items)
+
+    if parts_dir:
+        part_paths = [os.path.join(parts_dir, f"{n:05d}.ndjson") for n in range(len(tasks))]
+        items = write_outputs(_read_parts(part_paths), out_dir)
+        for path in part_paths:
+            os.remove(path)
+        os.rmdir(parts_dir)
+
+    return {'items': items, 'options': options.as_dict(), 'timings': timings}
+
+def write_outputs(items, out_dir):
+    """Write items to index.json and items.ndjson as they arrive; returns the count"""
+    os.makedirs(out_dir, exist_ok=True)
+    count = 0
+    with open(os.path.join(out_dir, 'index.json'), 'w') as index_file, \
+            open(os.path.join(out_dir, 'items.ndjson'), 'w') as ndjson_file:
+        index_file.write('[')
+        for item in items:
+            line = json.dumps(item)
+            index_file.write(',\n' if count else '\n')
+            index_file.write(line)
+            ndjson_file.write(line + '\n')
+            count += 1
+        index_file.write('\n]\n')
+    return count
+
+def parse_excel(filepath):
+    """Parse Excel file and extract data model + credentials"""
+
+    wb = open_workbook(filepath)
+
+    # Parsing log
+    log = []
+    log.append(f"=== Excel Parse Log - {datetime.now()} ===\n")
+    log.append(f"Sheets found: {wb.sheetnames}\n")
+
+    try:
+        credentials = read_credentials(wb, log)
+
+        # Parse main data sheet
+        options = OptionCollector()
+        items = list(iter_sheet_items(wb['Sheet1'], options, log))
+    finally:
+        wb.close()
+
+    log.append(f"Total items parsed: {len(items)}\n")
+
     result = {
         'credentials': credentials,
         'items': items,
-        'options': {
-            'verticals': verticals,
-            'categories_by_vertical': categories_by_vertical,
-            'subcategories_by_category': subcategories_by_category
-        },
+        'options': options.as_dict(),
         'log': ''.join(log)
     }
-    
+
     return result
 
-if __name__ == '__main__':
-    result = parse_excel('Umesh hackathon dashboard.xlsx')
-    
+def main():
+    parser = argparse.ArgumentParser(description='Parse the dashboard workbook into sample-output/')
+    parser.add_argument('filepath', nargs='?', default='Umesh hackathon dashboard.xlsx')
+    parser.add_argument('--parallel', action='store_true', help='Parse data sheets in worker processes')
+    parser.add_argument('--sheets', help='Comma-separated sheets to parse (default: Sheet1, or detected data sheets with --parallel)')
+    parser.add_argument('--workers', type=int, default=None, help='Worker processes (default: CPU count)')
+    parser.add_argument('--chunk-rows', type=int, default=None, help='Split sheets longer than this into row ranges')
+    args = parser.parse_args()
+    filepath = args.filepath
+    sheet_names = [s.strip() for s in args.sheets.split(',')] if args.sheets else None
+
+    log = []
+    log.append(f"=== Excel Parse Log - {datetime.now()} ===\n")
+    wb = open_workbook(filepath)
+    log.append(f"Sheets found: {wb.sheetnames}\n")
+    try:
+        credentials = read_credentials(wb, log)
+    finally:
+        wb.close()
+
     # Write .env file
     with open('.env.local', 'w') as f:
-        for key, value in result['credentials'].items():
+        for key, value in credentials.items():
             f.write(f"{key}={value}\n")
-    
+
     print("✓ Credentials written to .env.local")
-    
+
+    if args.parallel:
+        result = parse_excel_parallel(filepath, sheet_names, args.workers, args.chunk_rows, 'sample-output')
+        count = result['items']
+        options = result['options']
+        for t in result['timings']:
+            rows = f"rows {t['min_row']}-{t['max_row'] or 'end'}"
+            log.append(f"{t['sheet']} ({rows}): {t['items']} items in {t['seconds']:.2f}s\n")
+    else:
+        # Stream items straight to disk
+        collector = OptionCollector()
+        sheet_name = sheet_names[0] if sheet_names else 'Sheet1'
+        count = write_outputs(stream_excel(filepath, collector, log, sheet_name), 'sample-output')
+        options = collector.as_dict()
+    log.append(f"Total items parsed: {count}\n")
+
+    with open('sample-output/options.json', 'w') as f:
+        json.dump(options, f, indent=2)
+
     # Write parse log
     with open('parse-log.txt', 'w') as f:
-        f.write(result['log'])
-    
+        f.write(''.join(log))
+
     print("✓ Parse log written to parse-log.txt")
-    
-    # Write initial data
-    os.makedirs('sample-output', exist_ok=True)
-    with open('sample-output/index.json', 'w') as f:
-        json.dump(result['items'], f, indent=2)
-    
-    with open('sample-output/options.json', 'w') as f:
-        json.dump(result['options'], f, indent=2)
-    
-    print(f"✓ Parsed {len(result['items'])} items to sample-output/")
-    print("\n" + result['log'])
 
+    print(f"✓ Parsed {count} items to sample-output/")
+    print("\n" + ''.join(log))
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,61 @@
+"""Rebuild metadata/index.json from the item objects
+
+Usage:
+    python rebuild_index.py [--workers 32] [--dry-run]
+
+Lists metadata/items/ in parallel key ranges, fetches every item object
+through a thread pool, and writes a fresh index (ordered by created_at)
+and stats rollup. Use it when the index has drifted from the item
+objects, e.g. after an interrupted write or a manual fix in the bucket.
+Set STORAGE_BACKEND=local to rebuild a local directory.
+"""
+import argparse
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), 'backend'))
+
+from storage import get_index, get_items, list_item_ids, rebuild_stats, update_index
+
+def rebuild_index(workers=32, dry_run=False, log=print):
+    """Rebuild the index and stats; returns a summary dict"""
+    start = time.perf_counter()
+    ids = list_item_ids(workers)
+    log(f"Listed {len(ids)} item objects in {time.perf_counter() - start:.1f}s")
+
+    found = get_items(ids, workers)
+    items = sorted(found.values(), key=lambda item: (item.get('created_at') or '', item.get('id') or ''))
+    log(f"Fetched {len(items)} items in {time.perf_counter() - start:.1f}s")
+
+    indexed = {item.get('id') for item in get_index().get('items', [])}
+    summary = {
+        'items': len(items),
+        'unreadable': len(ids) - len(found),
+        'added': len({item['id'] for item in items} - indexed),
+        'dropped': len(indexed - {item['id'] for item in items})
+    }
+    if dry_run:
+        return summary
+
+    index = {'items': items}
+    if not update_index(index) or rebuild_stats(index) is None:
+        raise RuntimeError("Failed to write the rebuilt index")
+    return summary
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Rebuild the item index from metadata/items/')
+    parser.add_argument('--workers', type=int, default=32, help='Parallel list and get requests')
+    parser.add_argument('--dry-run', action='store_true', help='Report differences without writing')
+    args = parser.parse_args(argv)
+
+    start = time.perf_counter()
+    summary = rebuild_index(args.workers, args.dry_run)
+    elapsed = time.perf_counter() - start
+
+    print(f"✓ {summary['items']} items{' (dry run)' if args.dry_run else ' indexed'}: "
+          f"{summary['added']} missing from the old index, {summary['dropped']} no longer stored, "
+          f"{summary['unreadable']} unreadable, in {elapsed:.1f}s")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,43 @@
+import pytest
+import sys
+import os
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'backend'))
+
+@pytest.fixture
+def store(monkeypatch, tmp_path):
+    """Point the backend's storage (and the host's item replica) at a temporary directory"""
+    import storage
+    import item_replica
+    client = storage.LocalS3Client(str(tmp_path / 'storage'))
+    monkeypatch.setattr(storage, 's3', client)
+    monkeypatch.setattr(storage, '_snapshot_missing_at', None)
+    monkeypatch.setattr(item_replica, '_replica', item_replica.ItemReplica(str(tmp_path / 'items.sqlite3')))
+    return client
+
+@pytest.fixture
+def client(store):
+    """Flask test client over the temporary storage"""
+    from app import app
+    app.config['TESTING'] = True
+    with app.test_client() as client:
+        yield client
+
+def create(client, user='test@adda247.com', headers=None, files=(), **fields):
+    """Create an item as user through the Flask or ASGI test client; files are (name, file) pairs"""
+    from flask.testing import FlaskClient
+    data = {
+        'email': user,
+        'vertical': 'SSC',
+        'exam': 'CGL',
+        'subject': 'Maths',
+        'contentType': 'Content',
+        'status': 'Draft'
+    }
+    data.update(fields)
+    headers = dict(headers or {}, **{'X-User-Email': user})
+    if isinstance(client, FlaskClient):
+        if files:
+            data['files'] = [(f, name) for name, f in files]
+        return client.post('/api/item', data=data, content_type='multipart/form-data', headers=headers)
+    return client.post('/api/item', data=data, files=[('files', file) for file in files], headers=headers)
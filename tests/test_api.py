@@ -3,246 +3,180 @@ import sys
 import os
 import json
 from io import BytesIO
+from .conftest import create
 
 sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'backend'))
 
-from app import app
-
-@pytest.fixture
-def client():
-    app.config['TESTING'] = True
-    with app.test_client() as client:
-        yield client
-
-@pytest.fixture
-def auth_token(client):
-    """Create a test user and return auth token"""
-    response = client.post('/api/signup', json={
-        'name': 'Test User',
-        'email': 'test@example.com',
-        'password': 'testpass123'
-    })
-    data = json.loads(response.data)
-    return data['token']
-
-def test_signup(client):
-    """Test user signup"""
-    response = client.post('/api/signup', json={
-        'name': 'New User',
-        'email': 'newuser@example.com',
-        'password': 'password123'
-    })
-    
-    assert response.status_code == 200
-    data = json.loads(response.data)
-    assert 'token' in data
-    assert data['user']['email'] == 'newuser@example.com'
-
-def test_login(client):
-    """Test user login"""
-    # First signup
-    client.post('/api/signup', json={
-        'name': 'Login Test',
-        'email': 'login@example.com',
-        'password': 'pass123'
-    })
-    
-    # Then login
-    response = client.post('/api/login', json={
-        'email': 'login@example.com',
-        'password': 'pass123'
-    })
-    
+
+HEADERS = {'X-User-Email': 'test@adda247.com'}
+
+def test_ready_after_warm_up(client, monkeypatch):
+    """The readiness probe needs no auth and reports ready only once warmed up"""
+    import app as app_module
+    monkeypatch.setattr(app_module, '_warm_state', {'ready': False})
+    from storage import put_s3_object
+    put_s3_object('metadata/index.json', {'items': [], 'updated_at': '2025-01-01T00:00:00'})
+
+    assert client.get('/api/ready').status_code == 503
+    app_module.warm_up()
+
+    response = client.get('/api/ready')
     assert response.status_code == 200
-    data = json.loads(response.data)
-    assert 'token' in data
-
-def test_login_invalid(client):
-    """Test login with invalid credentials"""
-    response = client.post('/api/login', json={
-        'email': 'nonexistent@example.com',
-        'password': 'wrongpass'
-    })
-    
-    assert response.status_code == 401
+    assert json.loads(response.data)['index_updated_at'] == '2025-01-01T00:00:00'
 
-def test_get_options_requires_auth(client):
-    """Test that /api/options requires authentication"""
+def test_requires_email_header(client):
+    """Test that routes require the X-User-Email header"""
     response = client.get('/api/options')
     assert response.status_code == 401
 
-def test_get_options(client, auth_token):
+def test_rejects_other_domains(client):
+    """Test that only company email domains are accepted"""
+    response = client.get('/api/options', headers={'X-User-Email': 'someone@example.com'})
+    assert response.status_code == 401
+
+def test_get_options(client):
     """Test getting dropdown options"""
-    response = client.get('/api/options', headers={
-        'Authorization': f'Bearer {auth_token}'
-    })
-    
+    response = client.get('/api/options', headers=HEADERS)
+
     assert response.status_code == 200
     data = json.loads(response.data)
-    assert 'verticals' in data
-    assert 'categories_by_vertical' in data
-    assert 'subcategories_by_category' in data
+    assert 'SSC' in data['verticals']
+    assert 'CGL' in data['categories_by_vertical']['SSC']
+    assert 'subjects_by_vertical' in data
+    assert 'content_subcategories' in data
 
-def test_create_item(client, auth_token):
+def test_create_item(client):
     """Test creating a new item"""
-    data = {
-        'title': 'Test Item',
-        'vertical': 'Bank',
-        'category': 'IBPS PO',
-        'subcategory': 'Exam Pattern',
-        'notes': 'Test notes',
-        'links': 'https://example.com',
-        'tags': 'test,demo'
-    }
-    
-    response = client.post('/api/item', data=data, headers={
-        'Authorization': f'Bearer {auth_token}'
-    })
-    
-    assert response.status_code == 201
-    result = json.loads(response.data)
-    assert result['item']['title'] == 'Test Item'
-    assert result['item']['vertical'] == 'Bank'
-    
-    return result['item']['id']
+    response = create(client, verificationLink='https://youtube.com/shorts/aaaaaaaaaaa')
 
-def test_create_item_with_file(client, auth_token):
+    assert response.status_code == 201
+    item = json.loads(response.data)['item']
+    assert item['vertical'] == 'SSC'
+    assert item['youtube_id'] == 'aaaaaaaaaaa'
+    assert item['created_by'] == 'test@adda247.com'
+
+def test_create_item_validation(client):
+    """Test create rejects unknown master data, bad links and duplicates"""
+    assert create(client, exam='Not An Exam').status_code == 400
+    assert create(client, verificationLink='https://example.com/video').status_code == 400
+    assert create(client, verificationLink='https://youtu.be/aaaaaaaaaaa').status_code == 201
+    assert create(client, verificationLink='https://youtube.com/watch?v=aaaaaaaaaaa').status_code == 409
+
+def test_create_item_with_file(client):
     """Test creating item with file upload"""
-    data = {
-        'title': 'Test Item with File',
-        'vertical': 'SSC',
-        'category': 'CHSL',
-        'notes': 'Test with file',
-    }
-    
-    # Create a test file
-    file_content = b'Test file content'
-    data['files'] = (BytesIO(file_content), 'test.txt')
-    
-    response = client.post('/api/item', 
-        data=data,
-        content_type='multipart/form-data',
-        headers={'Authorization': f'Bearer {auth_token}'}
-    )
-    
+    response = create(client, files=[('test.txt', BytesIO(b'Test file content'))])
+
     assert response.status_code == 201
     result = json.loads(response.data)
-    assert len(result['item']['files']) > 0
-
-def test_get_metadata(client, auth_token):
-    """Test getting filtered metadata"""
-    # First create an item
-    client.post('/api/item', data={
-        'title': 'Filter Test',
-        'vertical': 'Teaching',
-        'category': 'CTET'
-    }, headers={'Authorization': f'Bearer {auth_token}'})
-    
-    # Get all items
-    response = client.get('/api/metadata', headers={
-        'Authorization': f'Bearer {auth_token}'
-    })
-    
-    assert response.status_code == 200
-    data = json.loads(response.data)
-    assert 'items' in data
-    assert len(data['items']) > 0
+    assert len(result['item']['files']) == 1
 
-def test_get_metadata_filtered(client, auth_token):
+def test_get_metadata_filtered(client):
     """Test getting filtered metadata by vertical"""
-    # Create items
-    client.post('/api/item', data={
-        'title': 'Bank Item',
-        'vertical': 'Bank',
-    }, headers={'Authorization': f'Bearer {auth_token}'})
-    
-    client.post('/api/item', data={
-        'title': 'SSC Item',
-        'vertical': 'SSC',
-    }, headers={'Authorization': f'Bearer {auth_token}'})
-    
-    # Filter by vertical
-    response = client.get('/api/metadata?vertical=Bank', headers={
-        'Authorization': f'Bearer {auth_token}'
-    })
-    
+    create(client)
+    create(client, vertical='Bank Pre', exam='SBI PO', subject='Quants')
+
+    response = client.get('/api/metadata', headers=HEADERS)
+    assert len(json.loads(response.data)['items']) == 2
+
+    response = client.get('/api/metadata?vertical=Bank Pre', headers=HEADERS)
+
+    assert response.status_code == 200
+    items = json.loads(response.data)['items']
+    assert [item['vertical'] for item in items] == ['Bank Pre']
+
+def test_check_duplicate(client):
+    """Test duplicate check by video ID"""
+    create(client, verificationLink='https://youtu.be/aaaaaaaaaaa')
+
+    data = json.loads(client.get('/api/check-duplicate/aaaaaaaaaaa', headers=HEADERS).data)
+    assert data['exists'] is True
+    assert data['item']['created_by'] == 'test@adda247.com'
+
+    data = json.loads(client.get('/api/check-duplicate/bbbbbbbbbbb', headers=HEADERS).data)
+    assert data['exists'] is False
+
+def test_get_items_batch(client):
+    """Test fetching full item records by id"""
+    ids = [json.loads(create(client).data)['item']['id'] for _ in range(3)]
+
+    response = client.post('/api/items/batch', json={'ids': ids[1:] + ['missing', ids[1]]}, headers=HEADERS)
+
     assert response.status_code == 200
     data = json.loads(response.data)
-    assert all(item['vertical'] == 'Bank' for item in data['items'])
+    assert [item['id'] for item in data['items']] == ids[1:]
+    assert data['missing'] == ['missing']
+    assert client.post('/api/items/batch', json={'ids': 'x'}, headers=HEADERS).status_code == 400
 
-def test_update_item(client, auth_token):
+def test_update_item(client):
     """Test updating an item"""
-    # Create item
-    create_response = client.post('/api/item', data={
-        'title': 'Original Title',
-        'vertical': 'Bank',
-    }, headers={'Authorization': f'Bearer {auth_token}'})
-    
-    item_id = json.loads(create_response.data)['item']['id']
-    
-    # Update item
-    update_response = client.put(f'/api/item/{item_id}', data={
-        'title': 'Updated Title'
-    }, headers={'Authorization': f'Bearer {auth_token}'})
-    
-    assert update_response.status_code == 200
-    result = json.loads(update_response.data)
-    assert result['item']['title'] == 'Updated Title'
-
-def test_delete_item(client, auth_token):
+    item_id = json.loads(create(client).data)['item']['id']
+
+    response = client.put(f'/api/item/{item_id}', data={'vertical': 'Teaching'}, headers=HEADERS)
+    assert response.status_code == 400
+    assert 'CGL' in json.loads(response.data)['error']
+
+    response = client.put(f'/api/item/{item_id}', data={'vertical': 'teaching', 'exam': 'ctet'}, headers=HEADERS)
+
+    assert response.status_code == 200
+    item = json.loads(response.data)['item']
+    assert (item['vertical'], item['exam'], item['subject']) == ('Teaching', 'CTET', 'Maths')
+
+    response = client.put(f'/api/item/{item_id}', data={'vertical': 'x'}, headers={'X-User-Email': 'other@adda247.com'})
+    assert response.status_code == 403
+
+def test_update_puts_back_an_item_the_index_lost(client):
+    """Updating an item missing from the index adds it back, counted once"""
+    from storage import put_s3_object
+    item_id = json.loads(create(client).data)['item']['id']
+    put_s3_object('metadata/index.json', {'items': [], 'updated_at': 'lost'})
+
+    assert client.put(f'/api/item/{item_id}', data={'title': 'Back'}, headers=HEADERS).status_code == 200
+    assert [i['id'] for i in json.loads(client.get('/api/metadata', headers=HEADERS).data)['items']] == [item_id]
+    assert json.loads(client.get('/api/stats', headers=HEADERS).data)['total'] == 1
+
+def test_delete_item(client):
     """Test deleting an item"""
-    # Create item
-    create_response = client.post('/api/item', data={
-        'title': 'To Be Deleted',
-        'vertical': 'Bank',
-    }, headers={'Authorization': f'Bearer {auth_token}'})
-    
-    item_id = json.loads(create_response.data)['item']['id']
-    
-    # Delete item
-    delete_response = client.delete(f'/api/item/{item_id}', headers={
-        'Authorization': f'Bearer {auth_token}'
-    })
-    
-    assert delete_response.status_code == 200
-
-def test_export_csv(client, auth_token):
+    item_id = json.loads(create(client).data)['item']['id']
+
+    response = client.delete(f'/api/item/{item_id}', headers=HEADERS)
+
+    assert response.status_code == 200
+    assert json.loads(client.get('/api/metadata', headers=HEADERS).data)['items'] == []
+    assert client.delete(f'/api/item/{item_id}', headers=HEADERS).status_code == 404
+
+def test_export_csv(client):
     """Test CSV export"""
-    # Create an item
-    client.post('/api/item', data={
-        'title': 'Export Test',
-        'vertical': 'Bank',
-    }, headers={'Authorization': f'Bearer {auth_token}'})
-    
-    # Export
-    response = client.get('/api/export', headers={
-        'Authorization': f'Bearer {auth_token}'
-    })
-    
+    create(client)
+
+    response = client.get('/api/export', headers=HEADERS)
+
     assert response.status_code == 200
     assert 'text/csv' in response.content_type
-    assert b'title' in response.data  # CSV header
+    assert b'vertical' in response.data  # CSV header
+    assert b'SSC' in response.data
 
-def test_bulk_upload(client, auth_token):
+def test_bulk_upload(client):
     """Test bulk CSV upload"""
     csv_content = b"""title,vertical,category,subcategory,notes,links,tags
-Item 1,Bank,IBPS PO,Exam Pattern,Notes 1,https://link1.com,tag1
-Item 2,SSC,CHSL,Syllabus,Notes 2,https://link2.com,tag2"""
-    
+Item 1,Bank Pre,IBPS PO,Exam Pattern,Notes 1,https://link1.com,tag1
+Item 2,ssc,CHSL,Syllabus,Notes 2,https://link2.com,tag2
+Item 3,Railway,RRB NTPC,Syllabus,Notes 3,https://link3.com,tag3"""
+
     data = {
         'file': (BytesIO(csv_content), 'test.csv')
     }
-    
+
     response = client.post('/api/bulk-upload',
         data=data,
         content_type='multipart/form-data',
-        headers={'Authorization': f'Bearer {auth_token}'}
+        headers=HEADERS
     )
-    
+
     assert response.status_code == 201
     result = json.loads(response.data)
     assert result['items_created'] == 2
+    assert result['items'][1]['vertical'] == 'SSC'
+    assert result['rejected'] == [{'row': 4, 'error': 'Unknown vertical: Railway'}]
 
 if __name__ == '__main__':
     pytest.main([__file__, '-v'])
-
@@ -0,0 +1,106 @@
+import pytest
+import sys
+import os
+import threading
+from io import BytesIO
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'backend'))
+
+from starlette.testclient import TestClient
+from asgi import app
+from storage import list_keys, put_s3_object
+from .conftest import create
+
+HEADERS = {'X-User-Email': 'test@adda247.com'}
+
+@pytest.fixture
+def client(store):
+    with TestClient(app) as client:
+        yield client
+
+def test_item_lifecycle(client):
+    """Test create, duplicate check, update and delete on the async routes"""
+    assert client.get('/api/options').status_code == 401
+
+    response = create(client, verificationLink='https://youtu.be/aaaaaaaaaaa',
+                      files=[('a.txt', BytesIO(b'a')), ('b.txt', BytesIO(b'b'))])
+    assert response.status_code == 201
+    assert 'Server-Timing' in response.headers
+    item = response.json()['item']
+    assert len(item['files']) == 2
+    assert create(client, verificationLink='https://youtube.com/watch?v=aaaaaaaaaaa').status_code == 409
+
+    assert client.get('/api/check-duplicate/aaaaaaaaaaa', headers=HEADERS).json()['exists'] is True
+    bulk = client.post('/api/check-duplicate', json={'video_ids': ['aaaaaaaaaaa', 'bbbbbbbbbbb']}, headers=HEADERS).json()
+    assert bulk['existing'] == 1
+
+    response = client.put(f"/api/item/{item['id']}", data={'vertical': 'Teaching', 'exam': 'CTET'}, headers=HEADERS)
+    assert response.json()['item']['vertical'] == 'Teaching'
+    assert client.get('/api/metadata?vertical=Teaching', headers=HEADERS).json()['items'][0]['id'] == item['id']
+    assert client.get('/api/stats', headers=HEADERS).json()['total'] == 1
+
+    assert client.delete(f"/api/item/{item['id']}", headers={'X-User-Email': 'other@adda247.com'}).status_code == 403
+    assert client.delete(f"/api/item/{item['id']}", headers=HEADERS).status_code == 200
+    assert client.get('/api/metadata', headers=HEADERS).json()['items'] == []
+    assert client.get('/api/stats', headers=HEADERS).json()['total'] == 0
+    assert list_keys('files/') == []
+
+def test_update_like_the_flask_route(client):
+    """Text fields sent as files don't crash updates; an item the index lost is added back once"""
+    item_id = create(client).json()['item']['id']
+    put_s3_object('metadata/index.json', {'items': [], 'updated_at': 'lost'})
+
+    response = client.put(f'/api/item/{item_id}', data={'exam': 'CHSL'},
+                          files=[('title', ('t.txt', BytesIO(b'x'))), ('tags', ('t.txt', BytesIO(b'x')))], headers=HEADERS)
+    assert response.status_code == 200
+    assert (response.json()['item']['title'], response.json()['item']['exam']) == ('', 'CHSL')
+    assert [i['id'] for i in client.get('/api/metadata', headers=HEADERS).json()['items']] == [item_id]
+    assert client.get('/api/stats', headers=HEADERS).json()['total'] == 1
+
+def test_falls_back_to_flask(client):
+    """Test routes without an async version are served by the Flask app"""
+    create(client)
+
+    response = client.get('/api/export', headers=HEADERS)
+
+    assert response.status_code == 200
+    assert b'SSC' in response.content
+    assert client.get('/metrics').status_code == 200
+
+def test_create_is_idempotent(client):
+    """Test a retried create with the same Idempotency-Key gets the first item back"""
+    headers = {**HEADERS, 'Idempotency-Key': 'retry-1'}
+    data = {'email': 'test@adda247.com', 'vertical': 'SSC', 'exam': 'CGL', 'subject': 'Maths', 'contentType': 'Content', 'status': 'Draft'}
+    first = client.post('/api/item', data=data, headers=headers)
+    retry = client.post('/api/item', data=data, headers=headers)
+
+    assert retry.status_code == 201
+    assert retry.json() == first.json()
+    assert retry.headers['Idempotent-Replayed'] == 'true'
+    assert len(client.get('/api/metadata', headers=HEADERS).json()['items']) == 1
+
+def test_create_during_slow_upload_keeps_both(client, monkeypatch):
+    """Test an item created while another create is still uploading stays in the index and stats"""
+    import asgi
+    upload = asgi.upload_file_to_s3
+    started, release = threading.Event(), threading.Event()
+
+    def slow_upload(*args):
+        started.set()
+        release.wait(5)
+        return upload(*args)
+
+    monkeypatch.setattr(asgi, 'upload_file_to_s3', slow_upload)
+    responses = []
+    first = threading.Thread(target=lambda: responses.append(
+        create(client, files=[('a.txt', BytesIO(b'a'))])))
+    first.start()
+    assert started.wait(5)
+
+    assert create(client).status_code == 201
+    release.set()
+    first.join(5)
+
+    assert responses[0].status_code == 201
+    assert len(client.get('/api/metadata', headers=HEADERS).json()['items']) == 2
+    assert client.get('/api/stats', headers=HEADERS).json()['total'] == 2
@@ -0,0 +1,72 @@
+import io
+import json
+import time
+
+import pytest
+from botocore.exceptions import ClientError
+
+import storage
+from fault_injection import FaultInjectingClient, wrap_client
+
+def faulty(tmp_path, **operations):
+    return FaultInjectingClient(storage.LocalS3Client(str(tmp_path)), {'seed': 1, 'operations': operations})
+
+def test_latency_is_added(tmp_path):
+    client = faulty(tmp_path, **{'*': {'latency_ms': {'dist': 'fixed', 'ms': 50}}})
+
+    start = time.perf_counter()
+    client.put_object(Bucket='b', Key='k', Body=b'x')
+    assert time.perf_counter() - start >= 0.05
+
+def test_errors_and_partial_failures(tmp_path):
+    """Errors replace the call; with after the write still lands"""
+    client = faulty(tmp_path, put_object={'errors': [{'rate': 1, 'code': 'InternalError', 'status': 500, 'after': True}]},
+                    get_object={'prefix': 'hot/', 'errors': [{'rate': 1, 'code': 'SlowDown', 'status': 503}]})
+
+    with pytest.raises(ClientError) as error:
+        client.put_object(Bucket='b', Key='hot/k', Body=b'x')
+    assert error.value.response['Error']['Code'] == 'InternalError'
+    assert client.client.get_object(Bucket='b', Key='hot/k')['Body'].read() == b'x'
+
+    with pytest.raises(ClientError) as error:
+        client.get_object(Bucket='b', Key='hot/k')
+    assert error.value.response['ResponseMetadata']['HTTPStatusCode'] == 503
+    assert client.injected == {('put_object', 'InternalError'): 1, ('get_object', 'SlowDown'): 1}
+
+def test_upload_prefix_matches_positional_key(tmp_path):
+    """upload_fileobj rules see the key storage passes positionally"""
+    client = faulty(tmp_path, upload_fileobj={'prefix': 'files/', 'errors': [{'rate': 1, 'code': 'SlowDown', 'status': 503}]})
+
+    client.upload_fileobj(io.BytesIO(b'x'), 'b', 'metadata/k')
+    with pytest.raises(ClientError):
+        client.upload_fileobj(io.BytesIO(b'x'), 'b', 'files/k')
+    with pytest.raises(ClientError):
+        client.upload_fileobj(Fileobj=io.BytesIO(b'x'), Bucket='b', Key='files/k')
+    assert client.injected == {('upload_fileobj', 'SlowDown'): 2}
+
+def test_calls_over_the_rate_are_throttled(tmp_path):
+    client = faulty(tmp_path, head_object={'max_per_second': 2})
+    client.client.put_object(Bucket='b', Key='k', Body=b'x')
+
+    codes = []
+    for _ in range(3):
+        try:
+            client.head_object(Bucket='b', Key='k')
+            codes.append('ok')
+        except ClientError as e:
+            codes.append(e.response['Error']['Code'])
+    # The window is one wall-clock second, so a boundary may reset it
+    assert codes in (['ok', 'ok', 'SlowDown'], ['ok', 'ok', 'ok'])
+
+def test_backend_client_is_wrapped_from_config(tmp_path, monkeypatch):
+    """STORAGE_FAULTS wraps the backend's client; reads degrade to a miss, as for a real S3 error"""
+    config = tmp_path / 'faults.json'
+    config.write_text(json.dumps({'operations': {'get_object': {'errors': [{'rate': 1, 'code': 'SlowDown', 'status': 503}]}}}))
+    monkeypatch.setenv('STORAGE_FAULTS', str(config))
+    monkeypatch.setattr(storage, 'STORAGE_BACKEND', 'local')
+    monkeypatch.setattr(storage, 'LOCAL_STORAGE_DIR', str(tmp_path / 'storage'))
+    monkeypatch.setattr(storage, 's3', storage.make_client())
+
+    assert storage.put_s3_object('metadata/a.json', {'a': 1})
+    assert storage.get_s3_object('metadata/a.json') is None
+    assert wrap_client(None) is None
@@ -0,0 +1,57 @@
+import hashlib
+import json
+from io import BytesIO
+
+from prometheus_client import REGISTRY
+
+from storage import BLOBS_PREFIX, file_name, list_keys, put_s3_object, release_file
+from .conftest import create
+
+HEADERS = {'X-User-Email': 'test@adda247.com'}
+CONTENT = b'the same reference sheet'
+SHA256 = hashlib.sha256(CONTENT).hexdigest()
+
+def uploads(result):
+    return REGISTRY.get_sample_value('ytsprint_file_uploads_total', {'result': result}) or 0
+
+def test_identical_uploads_are_stored_once(client):
+    """Re-attaching the same bytes references one copy, deleted with its last item"""
+    stored, deduplicated = uploads('stored'), uploads('deduplicated')
+    first = json.loads(create(client, files=[('sheet.pdf', BytesIO(CONTENT))]).data)
+    second = json.loads(create(client, files=[('copy.pdf', BytesIO(CONTENT))]).data)
+
+    key = BLOBS_PREFIX + SHA256
+    assert first['item']['files'] == second['item']['files'] == [key]
+    assert (uploads('stored') - stored, uploads('deduplicated') - deduplicated) == (1, 1)
+    assert file_name(key, second['item']['id']) == 'copy.pdf'
+
+    client.delete(f"/api/item/{first['item']['id']}", headers=HEADERS)
+    assert list_keys(BLOBS_PREFIX) == [key]
+    client.delete(f"/api/item/{second['item']['id']}", headers=HEADERS)
+    assert list_keys('files/') == []
+
+def test_stored_files_are_referenced_by_hash(client):
+    """A client that knows a file is stored sends only its hash"""
+    create(client, files=[('sheet.pdf', BytesIO(CONTENT))])
+    other = hashlib.sha256(b'never uploaded').hexdigest()
+
+    response = client.post('/api/files/check', json={'sha256': [SHA256, other]}, headers=HEADERS)
+    assert json.loads(response.data) == {'stored': [SHA256], 'missing': [other]}
+
+    referenced = uploads('referenced')
+    response = create(client, status='Re-edit', videoFileSha256=SHA256, fileSha256=f'{SHA256}:notes.pdf')
+    status, result = response.status_code, json.loads(response.data)
+    assert status == 201
+    assert result['item']['videoFile'] == BLOBS_PREFIX + SHA256
+    assert file_name(BLOBS_PREFIX + SHA256, result['item']['id']) == 'notes.pdf'
+    assert uploads('referenced') - referenced == 2
+
+    assert create(client, fileSha256=other).status_code == 400
+    assert create(client, fileSha256='not-a-hash').status_code == 400
+    assert client.post('/api/files/check', json={'sha256': 'x'}, headers=HEADERS).status_code == 400
+
+def test_older_per_item_files_are_deleted(store):
+    put_s3_object('files/test@adda247.com/b/1_a.json', {})
+
+    assert release_file('files/test@adda247.com/b/1_a.json', 'b')
+    assert list_keys('files/') == []
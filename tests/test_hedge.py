@@ -0,0 +1,109 @@
+import os
+import threading
+import time
+
+import pytest
+from prometheus_client import REGISTRY
+
+import storage
+from hedge import Hedger
+from storage import INDEX_KEY, get_index, put_s3_object
+
+def hedges(name, outcome):
+    return REGISTRY.get_sample_value('ytsprint_s3_hedges_total', {'object': name, 'outcome': outcome}) or 0
+
+def slow_first(delay):
+    """A call that stalls the first time and answers at once after that"""
+    calls = []
+
+    def call(value):
+        calls.append(value)
+        if len(calls) == 1:
+            time.sleep(delay)
+            return 'slow'
+        return 'fast'
+    return call, calls
+
+def test_slow_call_is_hedged():
+    """A call slower than the hedge delay gets a second copy, and the first answer wins"""
+    hedger = Hedger('test-won', min_delay=0.01, budget=1)
+    call, calls = slow_first(1)
+
+    start = time.perf_counter()
+    assert hedger.run(call, 'x') == 'fast'
+    assert time.perf_counter() - start < 0.5
+    assert calls == ['x', 'x']
+    assert hedges('test-won', 'won') == 1
+
+def test_hedges_stay_within_budget():
+    """Without budget left the call just waits for its only copy"""
+    hedger = Hedger('test-budget', min_delay=0.01, budget=0)
+    hedger._tokens = 0
+    call, calls = slow_first(0.05)
+
+    assert hedger.run(call, 'x') == 'slow'
+    assert calls == ['x']
+    assert hedges('test-budget', 'over_budget') == 1
+
+@pytest.mark.skipif(not hasattr(os, 'fork'), reason='needs fork')
+def test_forked_child_gets_its_own_pool():
+    """A hedger used before fork still runs calls in the child"""
+    hedger = Hedger('test-fork', min_delay=0.01, budget=0)
+    hedger._tokens = 0
+    assert hedger.run(lambda: 'parent') == 'parent'
+
+    pid = os.fork()
+    if pid == 0:
+        # A pool inherited with dead threads never runs the call
+        threading.Timer(5, os._exit, (2,)).start()
+        os._exit(0 if hedger.run(lambda: 'child') == 'child' else 1)
+    _, status = os.waitpid(pid, 0)
+    assert os.waitstatus_to_exitcode(status) == 0
+
+def test_delay_follows_the_latency_percentile():
+    hedger = Hedger('test-delay', percentile=90, min_delay=0.001)
+    for i in range(100):
+        hedger._observe(i / 1000)
+
+    assert hedger.delay == pytest.approx(0.09)
+
+def test_answers_are_not_retried():
+    """An error that is an answer (like a 404) is returned without waiting for the hedge"""
+    hedger = Hedger('test-answer', min_delay=0.01, budget=1, answers=(KeyError,))
+
+    def missing():
+        time.sleep(0.05)
+        raise KeyError('gone')
+
+    with pytest.raises(KeyError):
+        hedger.run(missing)
+    assert hedges('test-answer', 'lost') == 1
+
+class StallingClient(storage.LocalS3Client):
+    """Local storage where the first GET of each key stalls"""
+
+    def __init__(self, root, stall):
+        super().__init__(root)
+        self.stall = stall
+        self.seen = set()
+        self.lock = threading.Lock()
+
+    def get_object(self, Bucket, Key, **kwargs):
+        with self.lock:
+            first = Key not in self.seen
+            self.seen.add(Key)
+        if first:
+            time.sleep(self.stall)
+        return super().get_object(Bucket, Key, **kwargs)
+
+def test_index_reads_are_hedged(tmp_path, monkeypatch):
+    """A stalled GET of the index is overtaken by its hedge"""
+    monkeypatch.setattr(storage, 's3', StallingClient(str(tmp_path), stall=2))
+    monkeypatch.setattr(storage, 'INDEX_SNAPSHOT', False)
+    monkeypatch.setattr(storage, '_hedgers', {INDEX_KEY: Hedger('test-index', min_delay=0.02, budget=1)})
+    put_s3_object(INDEX_KEY, {'items': [{'id': 'a'}]})
+
+    start = time.perf_counter()
+    assert get_index()['items'] == [{'id': 'a'}]
+    assert time.perf_counter() - start < 1
+    assert hedges('test-index', 'won') == 1
@@ -0,0 +1,50 @@
+import json
+from io import BytesIO
+
+from app import idempotency_store
+from storage import get_index, list_keys
+from .conftest import create
+
+def key(value):
+    return {'Idempotency-Key': value}
+
+def test_retry_replays_the_first_response(client):
+    """A retried create returns the same item without uploading or indexing it again"""
+    first = create(client, headers=key('k1'), files=[('a.txt', BytesIO(b'content'))])
+    retry = create(client, headers=key('k1'), files=[('a.txt', BytesIO(b'content'))])
+
+    assert first.status_code == retry.status_code == 201
+    assert json.loads(retry.data) == json.loads(first.data)
+    assert retry.headers['Idempotent-Replayed'] == 'true'
+    assert 'Idempotent-Replayed' not in first.headers
+    assert len(get_index()['items']) == 1
+    assert len(list_keys('files/refs/')) == 1
+
+    # Another key, or the same key from another user, is a new request
+    assert create(client, headers=key('k2')).status_code == 201
+    assert create(client, headers=key('k1'), user='other@adda247.com').status_code == 201
+    assert len(get_index()['items']) == 3
+
+def test_key_reused_for_another_request_is_rejected(client):
+    """The same key with different fields or files gets 422, not the first response"""
+    assert create(client, headers=key('k1'), title='First', files=[('a.txt', BytesIO(b'content'))]).status_code == 201
+
+    assert create(client, headers=key('k1'), title='Second', files=[('a.txt', BytesIO(b'content'))]).status_code == 422
+    assert create(client, headers=key('k1'), title='First', files=[('a.txt', BytesIO(b'longer content'))]).status_code == 422
+    assert create(client, headers=key('k1'), title='First', files=[('a.txt', BytesIO(b'content'))]).status_code == 201
+    assert len(get_index()['items']) == 1
+
+def test_retry_during_first_request_conflicts(client):
+    idempotency_store.begin('test@adda247.com', 'k1')
+
+    response = create(client, headers=key('k1'))
+    assert response.status_code == 409
+    assert get_index()['items'] == []
+
+def test_failed_request_releases_the_key(client):
+    assert create(client, headers=key('k1'), exam='Not An Exam').status_code == 400
+    assert create(client, headers=key('k1')).status_code == 201
+
+def test_invalid_key_is_rejected(client):
+    assert create(client, headers=key('x' * 300)).status_code == 400
+    assert create(client, headers=key(' ')).status_code == 400
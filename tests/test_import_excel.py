@@ -0,0 +1,78 @@
+import pytest
+
+import import_excel
+from import_excel import import_rows, legacy_to_item
+from storage import get_index, get_s3_object, put_s3_object, update_index
+
+def legacy_row(n, link=None, **fields):
+    row = {
+        'id': f"item_{n}", 'vertical': 'ssc', 'category': 'cgl', 'subject': 'Maths', 'type': 'Content',
+        'subcategory': '', 'links': [link if link is not None else f"https://youtu.be/vid{n:08d}"],
+        'email': 'editor@adda247.com', 'status': 'Final', 'tags': [], 'files': [],
+        'created_at': '2025-01-01T00:00:00'
+    }
+    row.update(fields)
+    return row
+
+def test_legacy_to_item_maps_schema():
+    """Legacy category/type/links become exam/contentType/verificationLink"""
+    item = legacy_to_item(legacy_row(1), 'abc')
+
+    assert item['exam'] == 'CGL'
+    assert item['vertical'] == 'SSC'
+    assert item['contentType'] == 'Content'
+    assert item['verificationLink'] == 'https://youtu.be/vid00000001'
+    assert item['youtube_id'] == 'vid00000001'
+    assert item['created_by'] == 'editor@adda247.com'
+
+def test_import_dedupes_and_commits_index_once(store, tmp_path):
+    """Duplicates against the index and within the file are skipped"""
+    put_s3_object('metadata/index.json', {'items': [{'id': 'old', 'youtube_id': 'vid00000001'}]})
+    rows = [legacy_row(n) for n in range(1, 8)] + [legacy_row(99, link='https://youtu.be/vid00000003')]
+
+    summary = import_rows(rows, 'book.xlsx', workers=4, batch_size=3,
+                          checkpoint_path=str(tmp_path / 'cp.json'), log=lambda *a: None)
+
+    assert summary == {'rows': 8, 'imported': 6, 'duplicates': 2, 'committed': 6}
+    index = get_index()
+    assert len(index['items']) == 7
+    assert get_s3_object(f"metadata/items/{index['items'][-1]['id']}.json") == index['items'][-1]
+    assert get_s3_object('metadata/stats.json')['total'] == 7
+
+def test_import_resumes_from_checkpoint(store, tmp_path, monkeypatch):
+    """A failed batch is retried on the next run without duplicating earlier ones"""
+    rows = [legacy_row(n) for n in range(1, 10)]
+    checkpoint = str(tmp_path / 'cp.json')
+    real_write = import_excel.save_item
+    calls = []
+
+    def flaky_write(item):
+        calls.append(item['id'])
+        return len(calls) <= 3 and real_write(item)
+
+    monkeypatch.setattr(import_excel, 'save_item', flaky_write)
+    with pytest.raises(RuntimeError):
+        import_rows(rows, 'book.xlsx', workers=1, batch_size=3, checkpoint_path=checkpoint, log=lambda *a: None)
+    assert get_index()['items'] == []
+
+    monkeypatch.setattr(import_excel, 'save_item', real_write)
+    summary = import_rows(rows, 'book.xlsx', workers=4, batch_size=3, checkpoint_path=checkpoint, log=lambda *a: None)
+
+    assert summary['committed'] == 9
+    assert len({i['id'] for i in get_index()['items']}) == 9
+
+    again = import_rows(rows, 'book.xlsx', checkpoint_path=checkpoint, log=lambda *a: None)
+    assert again['committed'] == 0
+    assert len(get_index()['items']) == 9
+
+def test_failed_commit_is_counted_once(store, tmp_path, monkeypatch):
+    """Items written before a failed index commit are counted once after the rerun"""
+    rows = [legacy_row(n) for n in range(1, 5)]
+    checkpoint = str(tmp_path / 'cp.json')
+    monkeypatch.setattr(import_excel, 'update_index', lambda index: False)
+    with pytest.raises(RuntimeError):
+        import_rows(rows, 'book.xlsx', workers=2, batch_size=2, checkpoint_path=checkpoint, log=lambda *a: None)
+
+    monkeypatch.setattr(import_excel, 'update_index', update_index)
+    assert import_rows(rows, 'book.xlsx', checkpoint_path=checkpoint, log=lambda *a: None)['committed'] == 4
+    assert get_s3_object('metadata/stats.json')['total'] == 4
@@ -0,0 +1,83 @@
+import pytest
+
+import index_snapshot
+from index_snapshot import HEADER, MAGIC, decode, encode, read_meta
+from storage import delete_object, get_index, get_index_if_changed, put_s3_object, update_index
+
+ITEMS = [
+    {'id': 'a', 'vertical': 'SSC', 'status': 'Draft', 'files': ['f/1'], 'videoFile': None, 'views': 3},
+    {'id': 'b', 'vertical': 'SSC', 'status': 'Final', 'files': [], 'videoFile': None, 'views': 1},
+    {'id': 'c', 'vertical': 'SSC', 'status': 'Draft', 'files': [], 'videoFile': 'v', 'views': 0},
+    {'id': 'd', 'vertical': 'Bank Pre', 'title': 'Legacy', 'tags': ['old'], 'extra': {'n': 1.5, 'ok': True}},
+    {'id': 'e', 'vertical': 'SSC', 'status': 'Draft', 'files': [], 'videoFile': None, 'views': 2},
+]
+
+@pytest.mark.parametrize('items', [ITEMS, ITEMS[:3], [], [{}, {}]])
+def test_round_trip(items):
+    """Items come back with exactly their own keys and values"""
+    index = {'items': items, 'updated_at': '2025-01-01T00:00:00', 'version': 2}
+
+    data = encode(index, source_md5='abc')
+
+    assert read_meta(data)['source_md5'] == 'abc'
+    assert decode(data) == index
+
+def test_newer_versions_are_not_read():
+    """A reader ignores snapshots from a newer format version"""
+    data = encode({'items': ITEMS})
+    _, _, meta_length = HEADER.unpack_from(data)
+    newer = HEADER.pack(MAGIC, index_snapshot.VERSION + 1, meta_length) + data[HEADER.size:]
+
+    assert read_meta(newer) is None
+    assert decode(newer) is None
+    assert read_meta(b'{"items": []}') is None
+
+def test_index_reads_prefer_matching_snapshot(store, monkeypatch):
+    """update_index writes a snapshot; readers use it only while it matches the JSON"""
+    decoded = []
+    monkeypatch.setattr(index_snapshot, 'decode', lambda data, meta=None, decode=decode: decoded.append(1) or decode(data, meta))
+    update_index({'items': ITEMS})
+
+    index, etag = get_index_if_changed()
+    assert index['items'] == ITEMS
+    assert decoded == [1]
+    assert get_index_if_changed(etag) == (None, etag)
+
+    # A JSON write without a snapshot makes the old snapshot stale
+    put_s3_object('metadata/index.json', {'items': ITEMS[:1]})
+    assert get_index()['items'] == ITEMS[:1]
+    assert decoded == [1]
+
+    # The JSON stays the source of truth
+    delete_object('metadata/index.json')
+    assert get_index_if_changed() == (None, None)
+
+def test_snapshot_matches_by_etag_when_it_is_not_an_md5(store, monkeypatch):
+    """SSE-KMS and multipart ETags are not an MD5; the snapshot records the ETag itself"""
+    monkeypatch.setattr(store, '_etag', lambda data: f'"{len(data)}-1"')
+    decoded = []
+    monkeypatch.setattr(index_snapshot, 'decode', lambda data, meta=None, decode=decode: decoded.append(1) or decode(data, meta))
+    update_index({'items': ITEMS})
+
+    assert get_index()['items'] == ITEMS
+    assert decoded == [1]
+
+def test_missing_snapshot_is_not_fetched_on_every_read(store, monkeypatch):
+    """After a JSON-only writer deleted the snapshot, changed reads go straight to the JSON"""
+    update_index({'items': ITEMS})
+    gets = []
+    get_object = store.get_object
+    monkeypatch.setattr(store, 'get_object', lambda Bucket, Key, **kw: gets.append(Key) or get_object(Bucket, Key, **kw))
+
+    put_s3_object('metadata/index.json', {'items': ITEMS[:1]})
+    delete_object('metadata/index.snapshot')
+    assert get_index()['items'] == ITEMS[:1]
+    put_s3_object('metadata/index.json', {'items': ITEMS[:2]})
+    assert get_index()['items'] == ITEMS[:2]
+    assert gets.count('metadata/index.snapshot') == 1
+
+    # This process writing a snapshot again ends the wait
+    update_index({'items': ITEMS})
+    del gets[:]
+    assert get_index()['items'] == ITEMS
+    assert gets.count('metadata/index.snapshot') == 1
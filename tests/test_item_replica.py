@@ -0,0 +1,165 @@
+import pytest
+import json
+import threading
+
+import item_replica
+from item_replica import ItemReplica, get_replica
+from stats import build_stats, summarize
+from storage import get_index, put_s3_object
+
+HEADERS = {'X-User-Email': 'editor@adda247.com'}
+
+ITEMS = [
+    {'id': 'a', 'vertical': 'SSC', 'exam': 'CGL', 'subject': 'Maths', 'status': 'Draft', 'contentType': 'Content',
+     'created_by': 'editor@adda247.com', 'created_at': '2025-01-03T10:00:00', 'files': []},
+    {'id': 'b', 'vertical': 'SSC', 'exam': 'CHSL', 'status': 'Final', 'contentType': 'Content',
+     'created_by': 'other@studyiq.com', 'created_at': '2025-01-01T09:00:00', 'title': 'Legacy', 'tags': ['old']},
+    {'id': 'c', 'vertical': 'Bank Pre', 'exam': 'SBI PO', 'status': 'Final', 'contentType': 'Motivational_or_Fun',
+     'created_by': 'editor@adda247.com', 'created_at': '2025-01-02T12:00:00'},
+]
+
+@pytest.fixture
+def replica(tmp_path):
+    replica = ItemReplica(str(tmp_path / 'items.sqlite3'))
+    replica.load({'items': ITEMS, 'updated_at': 'v1'})
+    return replica
+
+def ids(items):
+    return [item['id'] for item in items]
+
+def test_select_filters_sorts_and_ranges(replica):
+    """Queries return the original items, in index order unless sorted"""
+    assert replica.select() == ITEMS
+    assert ids(replica.select({'vertical': 'SSC', 'exam': ''})) == ['a', 'b']
+    assert ids(replica.select({'title': 'Legacy'})) == ['b']
+    assert ids(replica.select(sort='created_at')) == ['b', 'c', 'a']
+    assert ids(replica.select(sort='created_at', descending=True, limit=2, offset=1)) == ['c', 'b']
+    assert ids(replica.select(created_from='2025-01-02', created_to='2025-01-03')) == ['c']
+    assert replica.count({'status': 'Final'}) == 2
+
+@pytest.mark.parametrize('group_by, filters', [
+    ([], {}),
+    (['vertical', 'status'], {}),
+    (['day'], {'status': 'Final'}),
+    ([], {'vertical': 'SSC', 'created_by': 'editor@adda247.com'}),
+])
+def test_summarize_matches_rollup(replica, group_by, filters):
+    """Counts agree with the stats rollup"""
+    expected = summarize(build_stats(ITEMS), group_by, filters)
+    result = replica.summarize(group_by, filters)
+
+    assert result['total'] == expected['total']
+    assert result['by'] == expected['by']
+    assert result.get('groups') == expected.get('groups')
+
+def test_apply_replays_writes_in_place(replica):
+    """Own writes update rows in place, and only on top of the version they were made from"""
+    changed = dict(ITEMS[0], status='Published')
+
+    assert replica.apply('v1', 'v2', removed=[ITEMS[0], ITEMS[2]], added=[changed]) is True
+    assert replica.select() == [changed, ITEMS[1]]
+    assert replica.apply('v1', 'v3', added=[ITEMS[2]]) is False
+    assert replica.updated_at == 'v2'
+
+def test_processes_share_one_copy(replica):
+    """Replicas opened on the same file see each other's loads and writes"""
+    other = ItemReplica(replica.path)
+    generation = other.generation
+    changed = dict(ITEMS[1], status='Draft')
+
+    assert replica.apply('v1', 'v2', removed=[ITEMS[1]], added=[changed]) is True
+    assert other.generation == generation + 1
+    assert other.updated_at == 'v2'
+    assert other.find_many('id', ['b', 'z']) == {'b': changed}
+
+    other.load({'items': ITEMS[:1], 'updated_at': 'v3'})
+    assert ids(replica.select()) == ['a']
+    assert replica.apply('v2', 'v4', added=[ITEMS[2]]) is False
+
+def test_refresh_loads_each_version_once(store, tmp_path, monkeypatch):
+    """The first replica to see a new index loads it; the rest only revalidate"""
+    path = str(tmp_path / 'shared.sqlite3')
+    first, second = ItemReplica(path), ItemReplica(path)
+    loads = []
+    for replica in (first, second):
+        monkeypatch.setattr(replica, '_load', lambda db, index, etag, load=replica._load: loads.append(1) or load(db, index, etag))
+    put_s3_object('metadata/index.json', {'items': ITEMS, 'updated_at': 'v1'})
+
+    first.refresh()
+    second.refresh()
+    assert loads == [1]
+    assert ids(second.select()) == ['a', 'b', 'c']
+
+    put_s3_object('metadata/index.json', {'items': ITEMS[1:], 'updated_at': 'v2'})
+    second.refresh()
+    first.refresh()
+    assert loads == [1, 1]
+    assert ids(first.select()) == ['b', 'c']
+
+def test_readers_keep_the_loaded_version_during_a_refresh(store, replica, monkeypatch):
+    """A reader arriving during a refresh doesn't wait for it; a waiting caller gets the new version"""
+    put_s3_object('metadata/index.json', {'items': ITEMS[:1], 'updated_at': 'v2'})
+    started, release = threading.Event(), threading.Event()
+
+    def blocked(etag, fetch=item_replica.get_index_if_changed):
+        started.set()
+        release.wait(5)
+        return fetch(etag)
+    monkeypatch.setattr(item_replica, 'get_index_if_changed', blocked)
+
+    refreshing = threading.Thread(target=replica.refresh)
+    refreshing.start()
+    started.wait(5)
+    assert ids(replica.refresh(wait=False).select()) == ['a', 'b', 'c']
+    release.set()
+    refreshing.join()
+    assert ids(replica.select()) == ['a']
+
+def test_duplicate_check_reloads_only_when_index_changes(client, store):
+    """The host replica is only reloaded when the index changes"""
+    items = [dict(ITEMS[0], youtube_id='aaaaaaaaaaa'), ITEMS[1]]
+    put_s3_object('metadata/index.json', {'items': items})
+
+    data = json.loads(client.get('/api/check-duplicate/aaaaaaaaaaa', headers=HEADERS).data)
+    assert data['item']['id'] == 'a'
+    generation = get_replica(refresh=False).generation
+
+    client.get('/api/check-duplicate/aaaaaaaaaaa', headers=HEADERS)
+    assert get_replica(refresh=False).generation == generation
+
+    put_s3_object('metadata/index.json', {'items': items[1:]})
+    data = json.loads(client.get('/api/check-duplicate/aaaaaaaaaaa', headers=HEADERS).data)
+    assert data['exists'] is False
+
+def test_routes_follow_the_index(client, store, monkeypatch):
+    """Metadata, export and stats read the replica, which tracks own and outside writes"""
+    put_s3_object('metadata/index.json', {'items': ITEMS, 'updated_at': '2025-01-04T00:00:00'})
+
+    data = json.loads(client.get('/api/metadata?vertical=SSC&sort=created_at&limit=1', headers=HEADERS).data)
+    assert ids(data['items']) == ['b']
+    assert data['total'] == 2
+    assert client.get('/api/metadata?sort=notes', headers=HEADERS).status_code == 400
+    assert b'Legacy' not in client.get('/api/export?status=Draft', headers=HEADERS).data
+    stats = json.loads(client.get('/api/stats?group_by=vertical', headers=HEADERS).data)
+    assert stats['groups'][0] == {'vertical': 'SSC', 'count': 2}
+
+    # An item created here is replayed, not reloaded
+    loads = []
+    replica = item_replica.get_replica(refresh=False)
+    monkeypatch.setattr(replica, '_load', lambda db, index, etag, load=replica._load: loads.append(1) or load(db, index, etag))
+    response = client.post('/api/item', headers=HEADERS, data={
+        'email': 'editor@adda247.com', 'vertical': 'SSC', 'exam': 'CGL', 'subject': 'Maths',
+        'contentType': 'Content', 'status': 'Draft'
+    })
+    assert response.status_code == 201
+    data = json.loads(client.get('/api/metadata?vertical=SSC', headers=HEADERS).data)
+    assert len(data['items']) == 3
+    assert loads == []
+
+    # A write by another process is picked up
+    index = get_index()
+    index['items'] = index['items'][:1]
+    index['updated_at'] = '2025-01-05T00:00:00'
+    put_s3_object('metadata/index.json', index)
+    assert ids(json.loads(client.get('/api/metadata', headers=HEADERS).data)['items']) == ['a']
+    assert loads == [1]
@@ -0,0 +1,48 @@
+from item_store import CachedItemStore, ItemStore
+
+ITEMS = [
+    {
+        'id': 'a', 'email': 'editor@adda247.com', 'verificationLink': 'https://youtu.be/aaaaaaaaaaa',
+        'youtube_id': 'aaaaaaaaaaa', 'contentType': 'Content', 'vertical': 'SSC', 'exam': 'CGL',
+        'subject': 'Maths', 'status': 'Draft', 'contentSubcategory': '', 'files': [], 'videoFile': None,
+        'created_by': 'editor@adda247.com', 'created_at': '2025-11-12T10:00:00'
+    },
+    {
+        'id': 'b', 'vertical': 'Bank Pre', 'exam': 'Made Up Exam', 'files': ['files/x/b/1_a.pdf'],
+        'created_by': 'other@studyiq.com', 'title': 'Legacy item', 'tags': ['old']
+    },
+]
+
+def test_rows_round_trip():
+    """Materialised rows equal the original items"""
+    store = ItemStore.from_items(ITEMS)
+
+    assert len(store) == 2
+    assert store.rows() == ITEMS
+
+def test_select():
+    """Filters on encoded and plain columns"""
+    store = ItemStore.from_items(ITEMS)
+
+    assert store.select(vertical='SSC') == [0]
+    assert store.select(exam='Made Up Exam', created_by='other@studyiq.com') == [1]
+    assert store.select(title='Legacy item') == [1]
+    assert store.select(vertical='Unknown') == []
+    assert store.select(vertical='', category='') == [0, 1]
+
+def test_cached_store_rebuilds_only_when_the_index_changes():
+    """Unchanged (304) keeps the store, a new version replaces it, a deleted index empties it"""
+    responses = [({'items': ITEMS}, 'etag-1'), (None, 'etag-1'), ({'items': ITEMS[1:]}, 'etag-2'), (None, None)]
+    seen = []
+
+    def fetch(etag):
+        seen.append(etag)
+        return responses.pop(0)
+
+    cached = CachedItemStore(fetch)
+    first = cached.get()
+    assert len(first) == 2
+    assert cached.get() is first
+    assert cached.get().rows() == ITEMS[1:]
+    assert len(cached.get()) == 0
+    assert seen == [None, 'etag-1', 'etag-1', 'etag-2']
@@ -0,0 +1,61 @@
+import json
+
+import pytest
+
+import key_layout
+from app import app
+from key_layout import item_id_of, item_key
+from migrate_keys import migrate_keys
+from storage import get_item, list_item_ids, list_keys, put_s3_object, save_item
+
+HEADERS = {'X-User-Email': 'test@adda247.com'}
+
+@pytest.fixture
+def hashed(monkeypatch):
+    """The hashed layout, migrating from flat keys"""
+    monkeypatch.setattr(key_layout, 'KEY_LAYOUT', 'hashed')
+    monkeypatch.setattr(key_layout, 'KEY_LAYOUT_PREVIOUS', 'flat')
+
+def put_flat(item_id):
+    item = {'id': item_id, 'vertical': 'SSC', 'exam': 'CGL', 'status': 'Draft', 'created_by': 'test@adda247.com'}
+    put_s3_object(item_key(item_id, 'flat'), item)
+    return item
+
+def test_keys_in_each_layout(hashed):
+    key = item_key('abc')
+    assert key == f"metadata/items/{key_layout.partition('abc')}/abc.json"
+    assert len(key_layout.partition('abc')) == 2
+    assert item_key('abc', 'flat') == 'metadata/items/abc.json'
+    assert item_id_of(key) == item_id_of('metadata/items/abc.json') == 'abc'
+    assert item_id_of('metadata/index.json') is None
+
+def test_old_keys_stay_readable(store, hashed):
+    """Items at flat keys are read, listed once and moved by their next write"""
+    put_flat('a')
+    save_item(dict(put_flat('b'), status='Final'))
+
+    assert get_item('a')['id'] == 'a'
+    assert sorted(list_item_ids(workers=2)) == ['a', 'b']
+    assert list_keys('metadata/items/') == sorted(['metadata/items/a.json', item_key('b')])
+
+    app.config['TESTING'] = True
+    with app.test_client() as client:
+        response = client.put('/api/item/a', data={'vertical': 'Teaching', 'exam': 'CTET'}, headers=HEADERS)
+        assert json.loads(response.data)['item']['vertical'] == 'Teaching'
+        assert list_keys('metadata/items/') == sorted([item_key('a'), item_key('b')])
+        assert client.delete('/api/item/a', headers=HEADERS).status_code == 200
+    assert get_item('a') is None
+
+def test_migrate_keys(store, hashed):
+    """Every item moves to its hashed key; one the app already rewrote keeps the newer copy"""
+    for item_id in ('a', 'b', 'c'):
+        put_flat(item_id)
+    put_s3_object(item_key('c'), {'id': 'c', 'status': 'Final'})
+
+    assert migrate_keys(workers=2, dry_run=True, log=lambda *a: None)['moved'] == 3
+    summary = migrate_keys(workers=2, log=lambda *a: None)
+
+    assert summary == {'items': 4, 'moved': 2, 'superseded': 1, 'failed': 0}
+    assert list_keys('metadata/items/') == sorted(item_key(item_id) for item_id in 'abc')
+    assert get_item('c')['status'] == 'Final'
+    assert migrate_keys(workers=2, log=lambda *a: None)['moved'] == 0
@@ -0,0 +1,137 @@
+import pytest
+import json
+
+from app import app
+from storage import get_s3_object
+import app as app_module
+from master_data import (
+    MASTER_DATA, MASTER_DATA_KEY, MasterDataReloader, install_document, get_version, get_code_tables, vertical_code, exam_code, subject_code,
+    is_valid_exam, is_valid_subject, normalize_selection, get_all_subjects
+)
+
+HEADERS = {'X-User-Email': 'editor@adda247.com'}
+
+@pytest.fixture
+def builtin_master_data():
+    """Restore the built-in master data after a test replaces it"""
+    yield
+    install_document({'master_data': MASTER_DATA, 'version': 0})
+
+def test_codes_round_trip():
+    """Integer codes map back to the names they were assigned from"""
+    VERTICALS, EXAMS, SUBJECTS = get_code_tables()
+    assert VERTICALS[vertical_code('SSC')] == 'SSC'
+    assert EXAMS[exam_code('CGL')] == 'CGL'
+    assert SUBJECTS[subject_code('Quants')] == 'Quants'
+    assert vertical_code('Nope') is None
+    assert list(VERTICALS) == list(MASTER_DATA)
+
+def test_membership():
+    """Exams and subjects are checked per vertical"""
+    assert is_valid_exam('SSC', 'CGL')
+    assert not is_valid_exam('Bank Pre', 'CGL')
+    assert is_valid_subject('Bank Pre', 'Quants')
+    assert not is_valid_subject('Unknown', 'Quants')
+    assert get_all_subjects() == tuple(sorted(get_all_subjects()))
+
+def test_normalize_selection():
+    """Spelling is normalised and mismatches are rejected"""
+    assert normalize_selection(' ssc ', 'delhi  police', 'gk/gs') == ('SSC', 'Delhi Police', 'GK/GS')
+    assert normalize_selection('SSC', 'CGL') == ('SSC', 'CGL', '')
+
+    with pytest.raises(ValueError, match='vertical'):
+        normalize_selection('Bank', 'SBI PO')
+    with pytest.raises(ValueError, match='Exam'):
+        normalize_selection('Bank Pre', 'CGL')
+    with pytest.raises(ValueError, match='Subject'):
+        normalize_selection('Bank Pre', 'SBI PO', 'Zoology')
+
+def test_create_item_validates_selection(client):
+    """create_item rejects exams outside the vertical and stores canonical names"""
+    data = {
+        'email': 'editor@adda247.com', 'vertical': 'Bank Pre', 'exam': 'CGL',
+        'status': 'Draft', 'contentType': 'Content'
+    }
+    response = client.post('/api/item', data=data, headers=HEADERS)
+    assert response.status_code == 400
+
+    data.update(vertical='bank pre', exam='sbi po')
+    response = client.post('/api/item', data=data, headers=HEADERS)
+    assert response.status_code == 201
+    item = json.loads(response.data)['item']
+    assert (item['vertical'], item['exam']) == ('Bank Pre', 'SBI PO')
+
+def test_reloader_installs_new_versions(builtin_master_data):
+    """New documents are installed, unchanged and invalid ones are ignored"""
+    responses = [
+        ({'version': 2, 'master_data': {'SSC': {'exams': ['CGL', 'Selection Post'], 'subjects': []}}}, 'etag-2'),
+        (None, 'etag-2'),
+        ({'version': 3, 'master_data': {'SSC': {'exams': 'CGL'}}}, 'etag-3'),
+    ]
+    seen = []
+
+    def fetch(etag):
+        seen.append(etag)
+        return responses.pop(0)
+
+    reloader = MasterDataReloader(fetch, interval=0)
+    assert reloader.refresh() is True
+    assert get_version() == 2
+    assert is_valid_exam('SSC', 'Selection Post')
+
+    assert reloader.refresh() is False
+    assert reloader.refresh() is False
+    assert get_version() == 2
+    assert seen == [None, 'etag-2', 'etag-2']
+
+def test_reloader_falls_back_when_deleted(builtin_master_data):
+    """A deleted stored copy puts the built-in dict back"""
+    responses = [({'version': 2, 'master_data': {'SSC': {'exams': ['CGL'], 'subjects': []}}}, 'etag-2'), (None, None)]
+    reloader = MasterDataReloader(lambda etag: responses.pop(0), interval=0)
+
+    assert reloader.refresh() is True
+    assert get_version() == 2
+    assert reloader.refresh() is True
+    assert get_version() == 0
+    assert is_valid_exam('Teaching', 'CTET')
+    assert reloader.etag is None
+
+def test_reloader_fetches_lazily(builtin_master_data):
+    """start() leaves loading to refresh(); refresh_in_background() checks once per interval"""
+    seen = []
+
+    def fetch(etag):
+        seen.append(etag)
+        return None, etag
+
+    reloader = MasterDataReloader(fetch, interval=3600)
+    reloader.start()
+    reloader.stop()
+    assert seen == []
+
+    reloader.refresh_in_background().join()
+    assert reloader.refresh_in_background() is None
+    assert seen == [None]
+
+def test_publish_master_data(client, store, monkeypatch, builtin_master_data):
+    """Admins publish a new version that is stored and used immediately"""
+    monkeypatch.setattr(app_module, 'ADMIN_EMAILS', {'editor@adda247.com'})
+    document = client.get('/api/admin/master-data', headers=HEADERS).get_json()
+    document['master_data']['SSC']['exams'].append('Selection Post')
+
+    response = client.put('/api/admin/master-data', json=document, headers=HEADERS)
+
+    assert response.status_code == 201
+    assert get_s3_object(MASTER_DATA_KEY)['version'] == 1
+    assert get_s3_object('config/master_data/v1.json') is not None
+    options = client.get('/api/options', headers=HEADERS).get_json()
+    assert 'Selection Post' in options['categories_by_vertical']['SSC']
+    assert options['version'] == 1
+
+def test_publish_master_data_requires_admin(client, monkeypatch):
+    """Non-admins cannot publish"""
+    monkeypatch.setattr(app_module, 'ADMIN_EMAILS', set())
+
+    response = client.put('/api/admin/master-data', json={'master_data': MASTER_DATA}, headers=HEADERS)
+
+    assert response.status_code == 403
@@ -0,0 +1,24 @@
+from storage import update_index
+
+HEADERS = {'X-User-Email': 'editor@adda247.com'}
+
+def test_server_timing_header(client):
+    """Responses break down storage and filter time"""
+    update_index({'items': []})
+    response = client.get('/api/metadata', headers=HEADERS)
+
+    timing = response.headers['Server-Timing']
+    assert 's3-get;dur=' in timing
+    assert 'filter;dur=' in timing
+    assert 'total;dur=' in timing
+
+def test_metrics_endpoint(client):
+    """Route and storage histograms are exported in Prometheus format"""
+    client.get('/api/metadata', headers=HEADERS)
+
+    response = client.get('/metrics')
+
+    body = response.data.decode()
+    assert response.status_code == 200
+    assert 'ytsprint_request_seconds_count{method="GET",route="/api/metadata",status="200"}' in body
+    assert 'ytsprint_s3_seconds_count{operation="get"' in body
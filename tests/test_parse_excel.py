@@ -0,0 +1,79 @@
+import json
+import types
+
+import openpyxl
+
+from parse_excel import OptionCollector, stream_excel, write_outputs, parse_excel, parse_excel_parallel
+
+HEADERS = ['Timestamp', 'Email Address', 'Vertical', 'Category', 'Subject', 'Content Type',
+           'Sub Category', 'Video Link', 'Edit Status']
+
+def make_workbook(path, rows, extra_sheets=None):
+    wb = openpyxl.Workbook()
+    ws = wb.active
+    ws.title = 'Sheet1'
+    ws.append(HEADERS)
+    for row in rows:
+        ws.append(row)
+    for name, sheet_rows in (extra_sheets or {}).items():
+        ws = wb.create_sheet(name)
+        for row in sheet_rows:
+            ws.append(row)
+    wb.save(path)
+
+ROWS = [
+    ['t1', 'a@adda247.com', 'SSC', 'CGL', 'Maths', 'Content', 'Tips', 'https://youtu.be/aaaaaaaaaaa', 'Final'],
+    [None, None, None],
+    ['t3', 'b@adda247.com', 'SSC', 'CHSL', 'English', 'Content', '', 'https://youtu.be/bbbbbbbbbbb'],
+]
+
+def test_stream_excel_is_lazy_and_collects_options(tmp_path):
+    """Items are yielded one by one and options are collected in the same pass"""
+    path = tmp_path / 'book.xlsx'
+    make_workbook(path, ROWS)
+    options = OptionCollector()
+
+    items = stream_excel(str(path), options)
+
+    assert isinstance(items, types.GeneratorType)
+    items = list(items)
+    assert [item['id'] for item in items] == ['item_2', 'item_4']
+    assert items[1]['status'] == ''
+    assert options.as_dict() == {
+        'verticals': ['SSC'],
+        'categories_by_vertical': {'SSC': ['CGL', 'CHSL']},
+        'subcategories_by_category': {'CGL': ['Tips'], 'CHSL': []}
+    }
+
+def test_write_outputs(tmp_path):
+    """index.json and items.ndjson hold the same items"""
+    path = tmp_path / 'book.xlsx'
+    make_workbook(path, ROWS)
+
+    count = write_outputs(stream_excel(str(path)), str(tmp_path / 'out'))
+
+    index = json.loads((tmp_path / 'out' / 'index.json').read_text())
+    lines = (tmp_path / 'out' / 'items.ndjson').read_text().splitlines()
+    assert count == 2
+    assert index == [json.loads(line) for line in lines]
+    parsed = parse_excel(str(path))['items']
+    assert [dict(item, created_at='') for item in index] == [dict(item, created_at='') for item in parsed]
+
+def test_parse_excel_parallel_merges_in_sheet_order(tmp_path):
+    """Data sheets are parsed in workers and merged as if read in order"""
+    path = tmp_path / 'book.xlsx'
+    make_workbook(path, ROWS, {
+        'Team Members': [['Name', 'Email'], ['A', 'a@adda247.com']],
+        'Sheet2': [HEADERS, ['t5', 'c@adda247.com', 'Bank Pre', 'SBI PO', 'Quants', 'Content', '', 'https://youtu.be/ccccccccccc']],
+    })
+
+    result = parse_excel_parallel(str(path), workers=2, chunk_rows=1)
+
+    assert [item['id'] for item in result['items']] == ['Sheet1/item_2', 'Sheet1/item_4', 'Sheet2/item_2']
+    assert result['options']['verticals'] == ['Bank Pre', 'SSC']
+    assert [(t['sheet'], t['items']) for t in result['timings']] == [('Sheet1', 1), ('Sheet1', 0), ('Sheet1', 1), ('Sheet2', 1)]
+
+    result = parse_excel_parallel(str(path), workers=2, out_dir=str(tmp_path / 'out'))
+    lines = (tmp_path / 'out' / 'items.ndjson').read_text().splitlines()
+    assert result['items'] == 3
+    assert [json.loads(line)['id'] for line in lines] == ['Sheet1/item_2', 'Sheet1/item_4', 'Sheet2/item_2']
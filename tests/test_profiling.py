@@ -0,0 +1,49 @@
+import pytest
+import json
+import marshal
+
+import app as app_module
+import profiling
+from app import app
+
+ADMIN = {'X-User-Email': 'admin@adda247.com'}
+
+@pytest.fixture
+def client(store, monkeypatch):
+    monkeypatch.setattr(app_module, 'ADMIN_EMAILS', {'admin@adda247.com'})
+    monkeypatch.setattr(profiling, 'PROFILE_KEEP', 2)
+    profiling.clear()
+    app.config['TESTING'] = True
+    with app.test_client() as client:
+        yield client
+    profiling.clear()
+
+def test_profiles_only_for_admin_header(client):
+    """Requests are not profiled unless an admin asks for it"""
+    client.get('/api/metadata', headers={'X-User-Email': 'editor@adda247.com', 'X-Profile': '1'})
+    client.get('/api/metadata', headers=ADMIN)
+    assert profiling.list_profiles() == []
+
+    client.get('/api/metadata?vertical=SSC', headers={**ADMIN, 'X-Profile': '1'})
+
+    profiles = json.loads(client.get('/api/admin/profiles', headers=ADMIN).data)['profiles']
+    assert [(p['route'], p['path']) for p in profiles] == [('/api/metadata', '/api/metadata?vertical=SSC')]
+
+def test_keeps_slowest_and_downloads(client):
+    """The buffer keeps the slowest N profiles in every format"""
+    for _ in range(4):
+        client.get('/api/metadata', headers={**ADMIN, 'X-Profile': '1'})
+
+    profiles = profiling.list_profiles()
+    assert len(profiles) == 2
+    assert profiles[0]['seconds'] >= profiles[1]['seconds']
+
+    profile_id = profiles[0]['id']
+    speedscope = json.loads(client.get(f'/api/admin/profiles/{profile_id}', headers=ADMIN).data)
+    assert speedscope['profiles'][0]['type'] == 'sampled'
+    assert len(speedscope['profiles'][0]['samples']) == len(speedscope['profiles'][0]['weights']) > 0
+
+    raw = client.get(f'/api/admin/profiles/{profile_id}?format=pstats', headers=ADMIN).data
+    assert isinstance(marshal.loads(raw), dict)
+    assert b'cumulative' in client.get(f'/api/admin/profiles/{profile_id}?format=text', headers=ADMIN).data
+    assert client.get('/api/admin/profiles/999', headers=ADMIN).status_code == 404
@@ -0,0 +1,49 @@
+import uuid
+from functools import partial
+
+import storage
+from rebuild_index import rebuild_index
+from storage import get_index, get_item, get_items, get_s3_object, list_item_ids, put_s3_object
+
+def put_item(item_id, created_at='2025-01-01T00:00:00', **fields):
+    item = {'id': item_id, 'vertical': 'SSC', 'exam': 'CGL', 'status': 'Final', 'created_at': created_at}
+    item.update(fields)
+    put_s3_object(f"metadata/items/{item_id}.json", item)
+    return item
+
+def test_list_and_get_items_in_parallel(store, monkeypatch):
+    """Every key range is listed across pages, and missing ids are left out"""
+    monkeypatch.setattr(store, 'list_objects_v2', partial(store.list_objects_v2, MaxKeys=3))
+    ids = [str(uuid.UUID(int=n * (2 ** 128 // 20))) for n in range(20)] + ['item_legacy', '0-first']
+    for item_id in ids:
+        put_item(item_id)
+
+    assert sorted(list_item_ids(workers=4)) == sorted(ids)
+    found = get_items(ids[:5] + ['nope', ids[0]], workers=3)
+    assert list(found) == ids[:5]
+    assert found[ids[2]]['id'] == ids[2]
+
+def test_item_cache_revalidates(store, monkeypatch):
+    """Cached items still see writes and are returned as copies"""
+    monkeypatch.setattr(storage, 'ITEM_CACHE_SIZE', 2)
+    monkeypatch.setattr(storage, '_item_cache', storage.OrderedDict())
+    put_item('a', status='Draft')
+
+    get_item('a')['status'] = 'edited in place'
+    assert get_item('a')['status'] == 'Draft'
+    put_item('a', status='Final')
+    assert get_item('a')['status'] == 'Final'
+    storage.delete_object('metadata/items/a.json')
+    assert get_item('a') is None
+
+def test_rebuild_index_from_items(store):
+    """The index and stats are rebuilt from item objects, oldest first"""
+    newer = put_item('b' * 8, created_at='2025-02-01T00:00:00')
+    older = put_item('a' * 8, created_at='2025-01-01T00:00:00')
+    put_s3_object('metadata/index.json', {'items': [newer, {'id': 'gone'}]})
+
+    summary = rebuild_index(workers=4, log=lambda *a: None)
+
+    assert summary == {'items': 2, 'unreadable': 0, 'added': 1, 'dropped': 1}
+    assert get_index()['items'] == [older, newer]
+    assert get_s3_object('metadata/stats.json')['total'] == 2
@@ -0,0 +1,104 @@
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+from prometheus_client import REGISTRY
+
+import storage
+from storage import SingleFlight, get_index, put_s3_object
+
+def coalesced(flight):
+    return REGISTRY.get_sample_value('ytsprint_coalesced_calls_total', {'flight': flight}) or 0
+
+def wait_for(condition):
+    deadline = time.monotonic() + 5
+    while not condition():
+        assert time.monotonic() < deadline
+        time.sleep(0.001)
+
+def test_concurrent_calls_share_one_run():
+    """Callers arriving while a call runs get its result; later callers run it again"""
+    flight = SingleFlight('test')
+    release = threading.Event()
+    calls = []
+    joined = coalesced('test')
+
+    def slow():
+        calls.append(1)
+        release.wait(5)
+        return {'n': len(calls)}
+
+    with ThreadPoolExecutor(8) as pool:
+        futures = [pool.submit(flight.do, 'key', slow)]
+        wait_for(lambda: flight.running('key'))
+        futures += [pool.submit(flight.do, 'key', slow) for _ in range(7)]
+        wait_for(lambda: coalesced('test') == joined + 7)
+        release.set()
+        results = [f.result() for f in futures]
+
+    assert calls == [1]
+    assert all(r is results[0] for r in results)
+    assert flight.do('key', slow) == {'n': 2}
+
+def test_errors_are_raised_and_cleared():
+    flight = SingleFlight('test')
+
+    def fail():
+        raise ValueError('boom')
+
+    with pytest.raises(ValueError):
+        flight.do('key', fail)
+    assert not flight.running('key')
+
+class CountingClient(storage.LocalS3Client):
+    """Local client that counts GETs and holds them until released"""
+
+    def __init__(self, root):
+        super().__init__(root)
+        self.gets = []
+        self.release = threading.Event()
+        self.release.set()
+
+    def get_object(self, Bucket, Key, **kwargs):
+        self.gets.append(Key)
+        self.release.wait(5)
+        return super().get_object(Bucket, Key, **kwargs)
+
+def test_concurrent_index_reads_share_one_get(tmp_path, monkeypatch):
+    """Concurrent get_index calls send one GET, and each gets its own copy to edit"""
+    client = CountingClient(str(tmp_path))
+    monkeypatch.setattr(storage, 's3', client)
+    monkeypatch.setattr(storage, 'INDEX_SNAPSHOT', False)
+    put_s3_object('metadata/index.json', {'items': [{'id': 'a'}]})
+
+    joined = coalesced('s3')
+    client.release.clear()
+    with ThreadPoolExecutor(20) as pool:
+        futures = [pool.submit(get_index) for _ in range(20)]
+        wait_for(lambda: coalesced('s3') == joined + 19)
+        client.release.set()
+        indexes = [f.result() for f in futures]
+
+    assert client.gets == ['metadata/index.json']
+    indexes[0]['items'].append({'id': 'b'})
+    assert indexes[1]['items'] == [{'id': 'a'}]
+
+def test_reads_after_own_write_do_not_join_older_get(tmp_path, monkeypatch):
+    """A GET sent before this process wrote an object can't answer reads made after"""
+    client = CountingClient(str(tmp_path))
+    monkeypatch.setattr(storage, 's3', client)
+    monkeypatch.setattr(storage, 'INDEX_SNAPSHOT', False)
+    put_s3_object('metadata/index.json', {'items': []})
+
+    client.release.clear()
+    with ThreadPoolExecutor(1) as pool:
+        before = pool.submit(get_index)
+        wait_for(lambda: client.gets)
+        put_s3_object('metadata/index.json', {'items': [{'id': 'a'}]})
+        client.release.set()
+        after = get_index()
+        before.result()
+
+    assert after['items'] == [{'id': 'a'}]
+    assert len(client.gets) == 2
@@ -0,0 +1,103 @@
+import json
+
+from app import app
+from storage import get_index, get_s3_object, put_s3_object
+from stats import advance_stats, build_stats, apply_item, summarize
+from .conftest import create
+
+EDITOR = 'editor@adda247.com'
+HEADERS = {'X-User-Email': EDITOR}
+
+def make_item(**fields):
+    item = {
+        'vertical': 'SSC', 'exam': 'CGL', 'subject': 'Maths', 'status': 'Draft',
+        'contentType': 'Content', 'created_by': 'editor@adda247.com',
+        'created_at': '2025-11-12T10:00:00'
+    }
+    item.update(fields)
+    return item
+
+def test_apply_item_is_reversible():
+    """Adding then removing an item leaves no counters behind"""
+    stats = build_stats([make_item()])
+    apply_item(stats, make_item(status='Published'), 1)
+    apply_item(stats, make_item(status='Published'), -1)
+
+    assert stats == {**build_stats([make_item()]), 'updated_at': stats['updated_at']}
+    assert stats['by']['status'] == {'Draft': 1}
+    assert stats['by']['day'] == {'2025-11-12': 1}
+
+def test_summarize_group_by_and_filter():
+    """Cells can be pivoted and filtered"""
+    stats = build_stats([
+        make_item(),
+        make_item(status='Published'),
+        make_item(vertical='Bank Pre', exam='SBI PO', status='Published'),
+    ])
+
+    summary = summarize(stats, ['vertical'], {'status': 'Published'})
+
+    assert summary['total'] == 2
+    assert summary['groups'] == [
+        {'vertical': 'Bank Pre', 'count': 1},
+        {'vertical': 'SSC', 'count': 1},
+    ]
+
+def test_stats_follow_create_update_delete(client, store):
+    """Counters track writes without rescanning the index"""
+    item = json.loads(create(client, user=EDITOR).data)['item']
+    create(client, user=EDITOR, vertical='Bank Pre', exam='SBI PO', subject='Quants')
+
+    data = json.loads(client.get('/api/stats', headers=HEADERS).data)
+    assert data['total'] == 2
+    assert data['by']['vertical'] == {'SSC': 1, 'Bank Pre': 1}
+
+    client.put(f"/api/item/{item['id']}", data={'vertical': 'Teaching', 'exam': 'CTET'}, headers=HEADERS)
+    data = json.loads(client.get('/api/stats', headers=HEADERS).data)
+    assert data['by']['vertical'] == {'Teaching': 1, 'Bank Pre': 1}
+
+    client.delete(f"/api/item/{item['id']}", headers=HEADERS)
+    data = json.loads(client.get('/api/stats?group_by=vertical', headers=HEADERS).data)
+    assert data['total'] == 1
+    assert data['groups'] == [{'vertical': 'Bank Pre', 'count': 1}]
+
+def test_advance_recounts_after_a_missed_write():
+    """Changes apply to a rollup of the version written over; any other is recounted"""
+    index = {'items': [make_item()] * 5, 'updated_at': 'v2'}
+    counted = lambda: dict(build_stats([make_item()]), index_updated_at='v1')
+
+    stats = advance_stats(counted(), index, 'v1', added=[make_item()])
+    assert (stats['total'], stats['index_updated_at']) == (2, 'v2')
+    assert advance_stats(counted(), index, 'v0', added=[make_item()])['total'] == 5
+    assert advance_stats(None, index, 'v1')['total'] == 5
+
+def test_stats_bootstrap_from_existing_index(client, store):
+    """A missing rollup is built once from the index"""
+    put_s3_object('metadata/index.json', {'items': [make_item(), make_item()]})
+
+    assert create(client, user=EDITOR).status_code == 201
+
+    stats = get_s3_object('metadata/stats.json')
+    assert stats['total'] == 3
+    assert stats['index_updated_at'] == get_index()['updated_at']
+
+def test_rollup_catches_up_with_writes_it_missed(client, store):
+    """A write the rollup didn't see (another process) is counted on the next write"""
+    assert create(client, user=EDITOR).status_code == 201
+    index = get_index()
+    index['items'].append(make_item(id='elsewhere'))
+    put_s3_object('metadata/index.json', dict(index, updated_at='written-elsewhere'))
+
+    assert create(client, user=EDITOR).status_code == 201
+
+    assert get_s3_object('metadata/stats.json')['total'] == 3
+
+def test_rebuild_stats_command(store):
+    """rebuild-stats backfills the rollup from the index"""
+    put_s3_object('metadata/index.json', {'items': [make_item(), make_item(exam='CHSL')]})
+
+    result = app.test_cli_runner().invoke(args=['rebuild-stats'])
+
+    assert result.exit_code == 0
+    stats = get_s3_object('metadata/stats.json')
+    assert stats['by']['exam'] == {'CGL': 1, 'CHSL': 1}
@@ -0,0 +1,68 @@
+import pytest
+import json
+
+from storage import put_s3_object
+from youtube import extract_youtube_id, parse_links
+
+HEADERS = {'X-User-Email': 'editor@adda247.com'}
+
+@pytest.mark.parametrize('url', [
+    'https://youtube.com/shorts/dQw4w9WgXcQ',
+    'https://www.youtube.com/watch?v=dQw4w9WgXcQ',
+    'https://m.youtube.com/watch?feature=share&v=dQw4w9WgXcQ&t=10',
+    'https://www.youtube.com/embed/dQw4w9WgXcQ?autoplay=1',
+    'https://youtube.com/live/dQw4w9WgXcQ?feature=share',
+    'youtu.be/dQw4w9WgXcQ?si=abc',
+    'Watch this: https://youtu.be/dQw4w9WgXcQ',
+])
+def test_extract_youtube_id_accepts_all_link_forms(url):
+    assert extract_youtube_id(url) == 'dQw4w9WgXcQ'
+
+@pytest.mark.parametrize('url', [
+    'https://notyoutube.com/shorts/dQw4w9WgXcQ',
+    'https://youtube.com/dQw4w9WgXcQ',
+    'https://youtube.com/watch?v=dQw4w9WgXcQX',
+    '',
+])
+def test_extract_youtube_id_rejects_other_links(url):
+    assert extract_youtube_id(url) is None
+
+def test_parse_links_marks_repeats():
+    """Repeats in a batch point at the first link with the same video"""
+    results = parse_links(['youtu.be/dQw4w9WgXcQ', 'nope', 'https://youtube.com/shorts/dQw4w9WgXcQ'])
+
+    assert [r['valid'] for r in results] == [True, False, True]
+    assert results[2]['repeat_of'] == 0
+    assert results[2]['url'] == 'https://www.youtube.com/watch?v=dQw4w9WgXcQ'
+
+def test_parse_links_endpoint_flags_existing(client, store):
+    """One request returns ids and duplicate status for the whole batch"""
+    put_s3_object('metadata/index.json', {'items': [
+        {'id': 'a', 'youtube_id': 'aaaaaaaaaaa', 'created_by': 'other@adda247.com', 'vertical': 'SSC'}
+    ]})
+
+    response = client.post('/api/parse-links', json={
+        'text': 'https://m.youtube.com/watch?v=aaaaaaaaaaa\nhttps://youtu.be/bbbbbbbbbbb, junk'
+    }, headers=HEADERS)
+
+    data = json.loads(response.data)
+    assert response.status_code == 200
+    assert [r['exists'] for r in data['results']] == [True, False, False]
+    assert data['results'][0]['item']['created_by'] == 'other@adda247.com'
+    assert (data['total'], data['valid'], data['existing']) == (3, 2, 1)
+
+def test_bulk_check_duplicate(client, store):
+    """Many IDs are answered from one index load"""
+    put_s3_object('metadata/index.json', {'items': [
+        {'id': 'a', 'youtube_id': 'aaaaaaaaaaa', 'created_by': 'other@adda247.com'}
+    ]})
+
+    response = client.post('/api/check-duplicate', json={'video_ids': ['aaaaaaaaaaa', 'bbbbbbbbbbb']}, headers=HEADERS)
+
+    data = json.loads(response.data)
+    assert data['results'] == {
+        'aaaaaaaaaaa': {'exists': True, 'item_id': 'a', 'owner': 'other@adda247.com'},
+        'bbbbbbbbbbb': {'exists': False}
+    }
+    assert data['existing'] == 1
+    assert client.post('/api/check-duplicate', json={'video_ids': 'x'}, headers=HEADERS).status_code == 400